@@ -4,8 +4,9 @@ from .params import Params, read_params
 from .network import Network, pick_connection
 from .network_models import jones_2009_model, law_2021_model, calcium_model
 from .cell import Cell
-from .cell_response import CellResponse, read_spikes
+from .cell_response import CellResponse, RecordingPlan, read_spikes
 from .cells_default import pyramidal, basket
 from .parallel_backends import MPIBackend, JoblibBackend
+from .reducers import register_reducer
 
 __version__ = '0.3.dev0'
@@ -3,7 +3,7 @@
 # Authors: Mainak Jas <mjas@mgh.harvard.edu>
 #          Sam Neymotin <samnemo@gmail.com>
 
-from copy import deepcopy
+from copy import copy, deepcopy
 
 import numpy as np
 from numpy.linalg import norm
@@ -28,6 +28,17 @@ def _get_cos_theta(sections, sec_name_apical):
     return cos_thetas
 
 
+def _get_nseg(L):
+    """Get the number of segments of a section of length L (um)."""
+    nseg = 1
+    if L > 100.:  # 100 um
+        nseg = int(L / 50.)
+        # make dend.nseg odd for all sections
+        if not nseg % 2:
+            nseg += 1
+    return nseg
+
+
 def _calculate_gaussian(x_val, height, lamtha):
     """Return height of gaussian at x_val.
 
@@ -61,10 +72,12 @@ def _get_gaussian_connection(src_pos, target_pos, nc_dict,
 
     Parameters
     ----------
-    src_pos : float
-        Position of source cell.
-    target_pos : float
-        Position of target cell.
+    src_pos : tuple | array, shape (n_pairs, 3)
+        Position of source cell, or positions of the source cells of many
+        connections.
+    target_pos : tuple | array, shape (n_pairs, 3)
+        Position of target cell, or positions of the target cells of many
+        connections.
     nc_dict : dict
         Dictionary with keys: pos_src, A_weight, A_delay, lamtha
         Defines the connection parameters
@@ -74,17 +87,18 @@ def _get_gaussian_connection(src_pos, target_pos, nc_dict,
 
     Returns
     -------
-    weight : float
+    weight : float | array, shape (n_pairs,)
         Weight of the synaptic connection.
-    delay : float
+    delay : float | array, shape (n_pairs,)
         Delay of synaptic connection.
 
     Notes
     -----
     Distance in xy plane is used for gaussian decay.
     """
-    x_dist = target_pos[0] - src_pos[0]
-    y_dist = target_pos[1] - src_pos[1]
+    src_pos, target_pos = np.asarray(src_pos), np.asarray(target_pos)
+    x_dist = target_pos[..., 0] - src_pos[..., 0]
+    y_dist = target_pos[..., 1] - src_pos[..., 1]
     cell_dist = np.sqrt(x_dist**2 + y_dist**2)
     scaled_lamtha = nc_dict['lamtha'] * inplane_distance
 
@@ -100,9 +114,10 @@ class _ArtificialCell:
 
     Parameters
     ----------
-    event_times : list
+    event_times : list | array
         Spike times associated with a single feed source (i.e.,
-        associated with a unique gid).
+        associated with a unique gid). Arrays, e.g., slices of the buffer of
+        the event times of a drive, are copied into the h.Vector directly.
     threshold : float
         Membrane potential threshold that demarks a spike.
     gid : int or None (optional)
@@ -278,6 +293,9 @@ class Cell:
         by synapse type (keys can be soma_gabaa, soma_gabab etc.).
         Must be enabled by running simulate_dipole(net, record_isec=True)
         or simulate_dipole(net, record_isoma=True)
+    varsec : dict
+        Contains recordings of other variables of sections indexed by
+        variable name (see RecordingPlan).
     tonic_biases : list of h.IClamp
         The current clamps inserted at each section of the cell
         for tonic biasing inputs.
@@ -315,6 +333,7 @@ class Cell:
         self.dipole_pp = list()
         self.vsec = dict()
         self.isec = dict()
+        self.varsec = dict()
         # insert iclamp
         self.list_IClamp = list()
         self._gid = None
@@ -341,8 +360,18 @@ class Cell:
         else:
             raise RuntimeError('Global ID for this cell already assigned!')
 
-    def _set_biophysics(self, sections):
-        "Set the biophysics for the cell."
+    def _set_biophysics(self, sections, seg_values=None):
+        """Set the biophysics for the cell.
+
+        Parameters
+        ----------
+        sections : dict of Section
+            The sections whose mechanisms are inserted.
+        seg_values : dict | None
+            Per-segment values of distance-dependent mechanism parameters
+            keyed by (sec_name, attr). If None, they are computed from the
+            distance to the soma.
+        """
 
         # neuron syntax is used to set values for mechanisms
         # sec.gbar_mech = x sets value of gbar for mech to x for all segs
@@ -355,13 +384,18 @@ class Cell:
         # and set attribute depending on h.distance(seg.x), which returns
         # distance from the soma to this point on the CURRENTLY ACCESSED
         # SECTION!!!
-        h.distance(sec=self._nrn_sections['soma'])
+        if seg_values is None:
+            h.distance(sec=self._nrn_sections['soma'])
         for sec_name, section in sections.items():
             sec = self._nrn_sections[sec_name]
             for mech_name, p_mech in section.mechs.items():
                 sec.insert(mech_name)
                 for attr, val in p_mech.items():
-                    if hasattr(val, '__call__'):
+                    if hasattr(val, '__call__') and seg_values is not None:
+                        for seg, seg_val in zip(
+                                sec, seg_values[(sec_name, attr)]):
+                            setattr(seg, attr, seg_val)
+                    elif hasattr(val, '__call__'):
                         sec.push()
                         for seg in sec:
                             setattr(seg, attr, val(h.distance(seg.x)))
@@ -378,9 +412,20 @@ class Cell:
                 self._nrn_synapses[syn_key] = self.syn_create(
                     seg, **synapses[receptor])
 
-    def _create_sections(self, sections, topology):
+    def _create_sections(self, sections, topology, define_shape=True):
         """Create soma and set geometry.
 
+        Parameters
+        ----------
+        sections : dict of Section
+            The sections to create.
+        topology : list of list | None
+            The connections between the sections.
+        define_shape : bool
+            If True, call h.define_shape() once the sections are connected.
+            This applies to all sections that exist in NEURON, so callers
+            creating many cells can defer it and call it once at the end.
+
         Notes
         -----
         By default neuron uses xy plane
@@ -411,11 +456,7 @@ class Cell:
             sec.Ra = sections[sec_name].Ra
             sec.cm = sections[sec_name].cm
 
-            if sec.L > 100.:  # 100 um
-                sec.nseg = int(sec.L / 50.)
-                # make dend.nseg odd for all sections
-                if not sec.nseg % 2:
-                    sec.nseg += 1
+            sec.nseg = _get_nseg(sec.L)
 
         if topology is None:
             topology = list()
@@ -431,7 +472,8 @@ class Cell:
         # be explicit about letting sec.L dominate over the 3d points used by
         # h.pt3dadd(); see
         # https://nrn.readthedocs.io/en/latest/python/modelspec/programmatic/topology/geometry.html?highlight=pt3dadd#pt3dadd  # noqa
-        h.define_shape()
+        if define_shape:
+            h.define_shape()
 
     def build(self, sec_name_apical=None):
         """Build cell in Neuron and insert dipole if applicable.
@@ -453,6 +495,37 @@ class Cell:
                              f'section of the current cell or None. '
                              f'Got {sec_name_apical}.')
 
+    def _build_from_template(self, template, sec_names=None):
+        """Build cell in Neuron with values precomputed for its cell type.
+
+        Parameters
+        ----------
+        template : instance of _CellTemplate
+            The template of this cell type, already holding the values of
+            a cell that was built with Cell.build().
+        sec_names : list of str | None
+            If not None, only these sections are built, e.g., for the piece
+            of a cell that is split across MPI ranks.
+
+        Notes
+        -----
+        h.define_shape() is not called; the caller must call it once all
+        cells have been created.
+        """
+        sections, topology = self.sections, self.topology
+        if sec_names is not None:
+            sections = {sec_name: self.sections[sec_name] for sec_name in
+                        sec_names}
+            if topology is not None:
+                topology = [conn for conn in topology if
+                            conn[0] in sections and conn[2] in sections]
+        self._create_sections(sections, topology, define_shape=False)
+        self._create_synapses(sections, self.synapses)
+        self._set_biophysics(sections, seg_values=template.seg_values)
+        if template.dipole_ri is not None:
+            self._insert_dipole(template.sec_name_apical,
+                                dipole_ri=template.dipole_ri)
+
     def copy(self):
         """Return copy of instance."""
         return deepcopy(self)
@@ -462,29 +535,33 @@ class Cell:
     # 2. a list needs to be created with a Dipole (Point Process) in each
     #    section at position 1
     # In Cell() and not Pyr() for future possibilities
-    def _insert_dipole(self, sec_name_apical):
+    def _insert_dipole(self, sec_name_apical, dipole_ri=None):
         """Insert dipole into each section of this cell.
 
         Parameters
         ----------
         sec_name_apical : str
             The name of the section along which dipole moment is calculated.
+        dipole_ri : dict of list | None
+            The internal resistances keyed by section name: first the one of
+            the point process at the end of the section, then one for each
+            segment. If None, they are computed with h.ri().
         """
         self.dpl_vec = h.Vector(1)
         self.dpl_ref = self.dpl_vec._ref_x[0]
         cos_thetas = _get_cos_theta(self.sections, 'apical_trunk')
 
         # setting pointers and ztan values
-        for sect_name in self.sections:
+        for sect_name in self._nrn_sections:
             sect = self._nrn_sections[sect_name]
             sect.insert('dipole')
 
             dpp = h.Dipole(1, sec=sect)  # defined in dipole_pp.mod
             self.dipole_pp.append(dpp)
-            dpp.ri = h.ri(1, sec=sect)  # assign internal resistance
-            # sets pointers in dipole mod file to the correct locations
-            dpp._ref_pv = sect(0.99)._ref_v
-            dpp._ref_Qtotal = self.dpl_ref
+            if dipole_ri is None:
+                dpp.ri = h.ri(1, sec=sect)  # assign internal resistance
+            else:
+                dpp.ri = dipole_ri[sect_name][0]
             # gives INTERNAL segments of the section, non-endpoints
             # creating this because need multiple values simultaneously
             pos_all = np.array([seg.x for seg in sect.allseg()])
@@ -500,7 +577,32 @@ class Cell:
             for idx, pos in enumerate(pos_all[1:-1]):
                 # assign the ri value to the dipole
                 # ri not defined at 0 and L
-                sect(pos).dipole.ri = h.ri(pos, sec=sect)
+                if dipole_ri is None:
+                    sect(pos).dipole.ri = h.ri(pos, sec=sect)
+                else:
+                    sect(pos).dipole.ri = dipole_ri[sect_name][idx + 1]
+                # add ztan values
+                sect(pos).dipole.ztan = seg_lens_z[idx]
+            # set the pp dipole's ztan value to the last value from seg_lens_z
+            dpp.ztan = seg_lens_z[-1]
+        self._set_dipole_pointers()
+        # dpl_ref is not part of a section, so the recording is associated
+        # with the thread of the cell via one of its point processes
+        self.dipole = h.Vector().record(self.dipole_pp[0], self.dpl_ref)
+
+    def _set_dipole_pointers(self):
+        """Set the pointers of the dipole mechanisms of this cell.
+
+        NB the pointers must be set again if NEURON reorganizes the tree
+        structure afterwards, e.g., for ParallelContext.multisplit().
+        """
+        for sect_name, dpp in zip(self._nrn_sections, self.dipole_pp):
+            sect = self._nrn_sections[sect_name]
+            # sets pointers in dipole mod file to the correct locations
+            dpp._ref_pv = sect(0.99)._ref_v
+            dpp._ref_Qtotal = self.dpl_ref
+            pos_all = np.array([seg.x for seg in sect.allseg()])
+            for idx, pos in enumerate(pos_all[1:-1]):
                 # range variable 'dipole'
                 # set pointers to previous segment's voltage, with
                 # boundary condition
@@ -509,11 +611,6 @@ class Cell:
                 # set aggregate pointers
                 sect(pos).dipole._ref_Qsum = dpp._ref_Qsum
                 sect(pos).dipole._ref_Qtotal = self.dpl_ref
-                # add ztan values
-                sect(pos).dipole.ztan = seg_lens_z[idx]
-            # set the pp dipole's ztan value to the last value from seg_lens_z
-            dpp.ztan = seg_lens_z[-1]
-        self.dipole = h.Vector().record(self.dpl_ref)
 
     def create_tonic_bias(self, amplitude, t0, tstop, loc=0.5):
         """Create tonic bias at the soma.
@@ -548,11 +645,14 @@ class Cell:
             the soma ('soma'). Default: False.
         """
 
-        section_names = list(self.sections.keys())
+        # only the sections built on this rank are recorded
+        section_names = list(self._nrn_sections.keys())
+        soma_names = [sec_name for sec_name in ['soma'] if
+                      sec_name in self._nrn_sections]
 
         # Logic checks if just recording soma, sections, or both
         if record_vsec == 'soma':
-            self.vsec = dict.fromkeys(['soma'])
+            self.vsec = dict.fromkeys(soma_names)
         elif record_vsec == 'all':
             self.vsec = dict.fromkeys(section_names)
 
@@ -563,7 +663,7 @@ class Cell:
                     self._nrn_sections[sec_name](0.5)._ref_v)
 
         if record_isec == 'soma':
-            self.isec = dict.fromkeys(['soma'])
+            self.isec = dict.fromkeys(soma_names)
         elif record_isec == 'all':
             self.isec = dict.fromkeys(section_names)
 
@@ -579,6 +679,48 @@ class Cell:
                     self.isec[sec_name][syn_name].record(
                         self._nrn_synapses[syn_name]._ref_i)
 
+    def _record_variables(self, sec_names, variables, dt=None):
+        """Record variables of sections as specified by a RecordingPlan.
+
+        Parameters
+        ----------
+        sec_names : list of str
+            The names of the sections to record from. Sections that are not
+            built on this rank are skipped.
+        variables : list of str
+            The variables to record: 'v', 'i_syn' or the names of NEURON
+            range variables, which are skipped in sections without them.
+        dt : float | None
+            The sampling interval (ms). If None, each time step is recorded.
+        """
+        # optional sampling interval of Vector.record
+        rec_args = tuple() if dt is None else (dt,)
+        sec_names = [sec_name for sec_name in sec_names if
+                     sec_name in self._nrn_sections]
+        for var in variables:
+            if var not in ('v', 'i_syn') and not h.name_declared(var):
+                raise ValueError(f'{var} is not the name of a NEURON '
+                                 f'range variable')
+            for sec_name in sec_names:
+                seg = self._nrn_sections[sec_name](0.5)
+                if var == 'v':
+                    self.vsec[sec_name] = h.Vector().record(
+                        seg._ref_v, *rec_args, sec=seg.sec)
+                elif var == 'i_syn':
+                    syn_names = [key for key in self._nrn_synapses.keys()
+                                 if key.startswith(f'{sec_name}_')]
+                    self.isec[sec_name] = dict()
+                    for syn_name in syn_names:
+                        syn = self._nrn_synapses[syn_name]
+                        self.isec[sec_name][syn_name] = h.Vector().record(
+                            syn, syn._ref_i, *rec_args)
+                # range variables only exist in the sections with the
+                # mechanism, e.g., cai in sections with calcium channels
+                elif hasattr(seg, f'_ref_{var}'):
+                    self.varsec.setdefault(sec_name, dict())[var] = \
+                        h.Vector().record(getattr(seg, f'_ref_{var}'),
+                                          *rec_args, sec=seg.sec)
+
     def syn_create(self, secloc, e, tau1, tau2):
         """Create an h.Exp2Syn synapse.
 
@@ -729,3 +871,103 @@ class Cell:
             self.sections[sec_name]._Ra = Ra
 
         self._update_end_pts()
+
+
+class _CellTemplate:
+    """Build the cells of one cell type from a single NEURON template.
+
+    The first cell is built with Cell.build(). The values that do not
+    depend on the position of the cell (distance-dependent mechanism
+    parameters and the internal resistances used by the dipole) are then
+    read back from NEURON and reused for all further cells of the type.
+
+    Parameters
+    ----------
+    cell : instance of Cell
+        The (unbuilt) cell type, e.g., ``net.cell_types['L5_pyramidal']``.
+    sec_name_apical : str | None
+        If not None, a dipole is inserted in the cells in alignment with
+        this section.
+
+    Attributes
+    ----------
+    seg_values : dict of list | None
+        Per-segment values of the distance-dependent mechanism parameters
+        keyed by (sec_name, attr). None until the first cell is built.
+    dipole_ri : dict of list | None
+        The internal resistances of the dipole keyed by section name, or
+        None if no dipole is inserted.
+    """
+
+    def __init__(self, cell, sec_name_apical=None):
+        self._cell = cell.copy()
+        self.sec_name_apical = sec_name_apical
+        self.seg_values = None
+        self.dipole_ri = None
+
+    def build_cell(self, gid, pos, define_shape=True, sec_names=None):
+        """Create and build a new cell of this type.
+
+        Parameters
+        ----------
+        gid : int
+            The GID of the new cell.
+        pos : tuple
+            The (x, y, z) coordinates of the new cell.
+        define_shape : bool
+            Whether h.define_shape() is called after building a cell from
+            the stored values. If False, the caller must call it once all
+            cells have been created.
+        sec_names : list of str | None
+            If not None, only these sections of the cell are built.
+
+        Returns
+        -------
+        cell : instance of Cell
+            The cell built in NEURON.
+        """
+        # the section parameters, synapses and topology are only read when
+        # building so they can be shared, but not the NEURON objects
+        cell = copy(self._cell)
+        cell._nrn_sections = dict()
+        cell._nrn_synapses = dict()
+        cell.dipole_pp = list()
+        cell.vsec = dict()
+        cell.isec = dict()
+        cell.varsec = dict()
+        cell.list_IClamp = list()
+        cell.tonic_biases = list()
+        cell.gid = gid
+        cell.pos = pos
+
+        if self.seg_values is None and sec_names is None:
+            cell.build(sec_name_apical=self.sec_name_apical)
+            self._store_values(cell)
+            return cell
+
+        if self.seg_values is None:
+            # the values are read from a complete cell, which is then
+            # deleted from NEURON along with its last reference
+            self.build_cell(gid, pos, define_shape=False)
+        cell._build_from_template(self, sec_names=sec_names)
+        if define_shape:
+            h.define_shape()
+        return cell
+
+    def _store_values(self, cell):
+        """Read the position-independent values back from a built cell."""
+        self.seg_values = dict()
+        for sec_name, section in cell.sections.items():
+            sec = cell._nrn_sections[sec_name]
+            for p_mech in section.mechs.values():
+                for attr, val in p_mech.items():
+                    if hasattr(val, '__call__'):
+                        self.seg_values[(sec_name, attr)] = [
+                            getattr(seg, attr) for seg in sec]
+
+        if len(cell.dipole_pp) > 0:
+            self.dipole_ri = dict()
+            for sec_name, dpp in zip(cell.sections, cell.dipole_pp):
+                sec = cell._nrn_sections[sec_name]
+                self.dipole_ri[sec_name] = [dpp.ri] + [
+                    seg.dipole.ri for seg in sec]
@@ -7,9 +7,135 @@
 from glob import glob
 import numpy as np
 
+from .externals.mne import _validate_type, _check_option
 from .viz import plot_spikes_hist, plot_spikes_raster
 
 
+class RecordingPlan(object):
+    """The RecordingPlan class.
+
+    Specifies the cells, sections and variables that are recorded during a
+    simulation, how often they are sampled and with which precision they are
+    returned. The recordings are stored in :class:`CellResponse`.
+
+    Parameters
+    ----------
+    cell_types : str | list of str | None
+        The types of the cells to record from, e.g., ``'L5_pyramidal'``. If
+        None, cells of all types are recorded. Default: None.
+    gids : int | list of int | range | None
+        The gids of the cells to record from. If None, all cells of
+        ``cell_types`` are recorded. Default: None.
+    sections : 'soma' | 'all' | list of str
+        The names of the sections to record from, each at its center.
+        Sections that a cell does not have are skipped. Default: 'soma'.
+    variables : str | list of str
+        The variables to record. ``'v'`` is the membrane potential (see
+        ``CellResponse.vsec``) and ``'i_syn'`` the currents of the synapses
+        of a section (see ``CellResponse.isec``). Any other name of a NEURON
+        range variable, e.g., an ion concentration (``'cai'``) or a gating
+        state (``'m_hh2'``), is recorded in the sections in which it is
+        defined (see ``CellResponse.varsec``). Default: 'v'.
+    dt : float | None
+        The sampling interval (ms) of the recordings, which must be a multiple
+        of the integration time step. The variables are sampled without
+        filtering at the multiples of ``dt`` before the stop time. With
+        multiple NEURON threads, each step is recorded and the samples are
+        taken after the simulation. If None, the variables are recorded at
+        each integration step. Default: None.
+    dtype : 'float64' | 'float32'
+        The precision of the returned recordings. Default: 'float64'.
+
+    Attributes
+    ----------
+    cell_types : list of str | None
+        The types of the cells to record from.
+    gids : list of int | None
+        The gids of the cells to record from.
+    sections : 'soma' | 'all' | list of str
+        The names of the sections to record from.
+    variables : list of str
+        The variables to record.
+    dt : float | None
+        The sampling interval (ms) of the recordings.
+    dtype : str
+        The precision of the returned recordings.
+    """
+
+    def __init__(self, cell_types=None, gids=None, sections='soma',
+                 variables='v', dt=None, dtype='float64'):
+        _validate_type(cell_types, (str, list, tuple, None), 'cell_types')
+        if isinstance(cell_types, str):
+            cell_types = [cell_types]
+        _validate_type(gids, ('int-like', list, tuple, range, None), 'gids')
+        if isinstance(gids, (int, np.integer)):
+            gids = [gids]
+        if gids is not None:
+            for gid in gids:
+                _validate_type(gid, 'int', 'gid')
+        _validate_type(sections, (str, list, tuple), 'sections')
+        if isinstance(sections, str):
+            _check_option('sections', sections, ['soma', 'all'])
+        _validate_type(variables, (str, list, tuple), 'variables')
+        if isinstance(variables, str):
+            variables = [variables]
+        if len(variables) == 0:
+            raise ValueError('At least one variable must be recorded')
+        _validate_type(dt, ('numeric', None), 'dt')
+        if dt is not None and dt <= 0:
+            raise ValueError(f'dt must be positive, got {dt}')
+        _check_option('dtype', dtype, ['float64', 'float32'])
+
+        self.cell_types = None if cell_types is None else list(cell_types)
+        self.gids = None if gids is None else list(gids)
+        self.sections = sections if isinstance(sections, str) else \
+            list(sections)
+        self.variables = list(variables)
+        self.dt = dt
+        self.dtype = dtype
+
+    def __repr__(self):
+        class_name = self.__class__.__name__
+        cell_types = 'all' if self.cell_types is None else \
+            ', '.join(self.cell_types)
+        n_gids = 'all' if self.gids is None else len(self.gids)
+        return (f'<{class_name} | cell types: {cell_types}, gids: {n_gids}, '
+                f'variables: {", ".join(self.variables)}>')
+
+    def _check(self, net, dt):
+        """Check the plan against a network and the integration time step."""
+        if self.cell_types is not None:
+            for cell_type in self.cell_types:
+                _check_option('cell_types', cell_type,
+                              list(net.cell_types.keys()))
+        if self.gids is not None:
+            cell_gids = [gid for cell_type in net.cell_types for gid in
+                         net.gid_ranges.get(cell_type, range(0))]
+            for gid in self.gids:
+                if gid not in cell_gids:
+                    raise ValueError(f'gid {gid} is not the gid of a cell '
+                                     f'of the network')
+        if self.dt is not None:
+            n_steps = self.dt / dt
+            if not np.isclose(n_steps, round(n_steps)) or n_steps < 1:
+                raise ValueError(f'dt of the recordings must be a multiple '
+                                 f'of the integration time step {dt}, got '
+                                 f'{self.dt}')
+
+    def _get_sec_names(self, cell_type, gid, sec_names):
+        """The names of the sections to record of a cell (may be empty)."""
+        if self.cell_types is not None and cell_type not in self.cell_types:
+            return list()
+        if self.gids is not None and gid not in self.gids:
+            return list()
+        if self.sections == 'all':
+            return list(sec_names)
+        elif self.sections == 'soma':
+            return [sec_name for sec_name in sec_names if sec_name == 'soma']
+        return [sec_name for sec_name in sec_names if
+                sec_name in self.sections]
+
+
 class CellResponse(object):
     """The CellResponse class.
 
@@ -50,10 +176,18 @@ class CellResponse(object):
         Each gid corresponds to a type via Network::gid_ranges.
     vsec : list (n_trials,) of dict, shape
         Each element of the outer list is a trial.
-        Dictionary indexed by gids containing voltages for cell sections.
+        Dictionary indexed by gids containing voltages for cell sections,
+        each an array of shape (n_times,).
     isec : list (n_trials,) of dict, shape
         Each element of the outer list is a trial.
-        Dictionary indexed by gids containing currents for cell sections.
+        Dictionary indexed by gids containing currents for cell sections,
+        each a dictionary of arrays of shape (n_times,) indexed by the
+        receptor.
+    varsec : list (n_trials,) of dict, shape
+        Each element of the outer list is a trial.
+        Dictionary indexed by gids containing the other variables of cell
+        sections recorded with a RecordingPlan, each a dictionary of arrays
+        of shape (n_times,) indexed by the variable name.
     times : array-like, shape (n_times,)
         Array of time points for samples in continuous data.
         This includes vsoma and isoma.
@@ -111,6 +245,7 @@ class CellResponse(object):
         self._spike_types = spike_types
         self._vsec = list()
         self._isec = list()
+        self._varsec = list()
         if times is not None:
             if not isinstance(times, (list, np.ndarray)):
                 raise TypeError("'times' is an np.ndarray of simulation times")
@@ -222,6 +357,10 @@ class CellResponse(object):
     def isec(self):
         return self._isec
 
+    @property
+    def varsec(self):
+        return self._varsec
+
     @property
     def times(self):
         return self._times
@@ -2,6 +2,8 @@
 
 # Authors: Nick Tolley <nicholas_tolley@brown.edu>
 
+import numpy as np
+
 from .params import _long_name
 from .externals.mne import _validate_type, _check_option
 
@@ -23,24 +25,86 @@ def _check_gids(gids, gid_ranges, valid_cells, arg_name, same_type=True):
     if all(isinstance(gid, str) for gid in gids):
         gids = [gid for cell_type in gids for gid in gid_ranges[cell_type]]
 
-    cell_type = _gid_to_type(gids[0], gid_ranges)
-    for gid in gids:
-        _validate_type(gid, int, arg_name)
-        gid_type = _gid_to_type(gid, gid_ranges)
-        if gid_type is None:
-            raise AssertionError(
-                f'{arg_name} {gid} not in net.gid_ranges')
-        if same_type and gid_type != cell_type:
-            raise AssertionError(f'All {arg_name} must be of the same type')
+    # validate all gids at once, falling back to checking them one by one
+    # only to raise the error for the first invalid item
+    if isinstance(gids, range):
+        gids_arr = np.arange(gids.start, gids.stop, gids.step)
+    else:
+        try:
+            gids_arr = np.array(gids)
+        except ValueError:  # ragged nested lists
+            gids_arr = None
+        if gids_arr is None or gids_arr.dtype.kind not in 'iu':
+            for gid in gids:
+                _validate_type(gid, int, arg_name)
+            gids_arr = np.array(gids, dtype=int)
+
+    type_idxs = _gids_to_type_idx(gids_arr, _get_gid_bounds(gid_ranges))
+    if np.any(type_idxs < 0):
+        gid = gids_arr[np.flatnonzero(type_idxs < 0)[0]]
+        raise AssertionError(
+            f'{arg_name} {gid} not in net.gid_ranges')
+    if same_type and np.any(type_idxs != type_idxs[0]):
+        raise AssertionError(f'All {arg_name} must be of the same type')
 
     return gids
 
 
-def _gid_to_type(gid, gid_ranges):
+def _get_gid_bounds(gid_ranges):
+    """Lookup table of the gid ranges for _gids_to_type_idx.
+
+    Parameters
+    ----------
+    gid_ranges : dict of range
+        The gid ranges of each cell type, e.g., Network.gid_ranges.
+
+    Returns
+    -------
+    gid_bounds : tuple of (list, array, array)
+        The cell types, and the starts and stops of their ranges, all
+        sorted by start.
+    """
+    gid_types = sorted(gid_ranges, key=lambda gid_type: (
+        gid_ranges[gid_type].start, gid_ranges[gid_type].stop))
+    starts = np.array([gid_ranges[gid_type].start for gid_type in gid_types],
+                      dtype=int)
+    stops = np.array([gid_ranges[gid_type].stop for gid_type in gid_types],
+                     dtype=int)
+    return gid_types, starts, stops
+
+
+def _gids_to_type_idx(gids, gid_bounds):
+    """Vectorized reverse lookup of gids to types.
+
+    Parameters
+    ----------
+    gids : array of int
+        The gids to look up.
+    gid_bounds : tuple of (list, array, array)
+        The lookup table returned by _get_gid_bounds.
+
+    Returns
+    -------
+    type_idxs : array of int
+        Index in gid_bounds[0] of the type of each gid, or -1 for gids
+        not in any range.
+    """
+    _, starts, stops = gid_bounds
+    gids = np.asarray(gids, dtype=int)
+    type_idxs = np.searchsorted(starts, gids, side='right') - 1
+    valid = type_idxs >= 0
+    valid[valid] = gids[valid] < stops[type_idxs[valid]]
+    type_idxs[~valid] = -1
+    return type_idxs
+
+
+def _gid_to_type(gid, gid_ranges, gid_bounds=None):
     """Reverse lookup of gid to type."""
-    for gidtype, gids in gid_ranges.items():
-        if gid in gids:
-            return gidtype
+    if gid_bounds is None:
+        gid_bounds = _get_gid_bounds(gid_ranges)
+    type_idx = _gids_to_type_idx([gid], gid_bounds)[0]
+    if type_idx >= 0:
+        return gid_bounds[0][type_idx]
 
 
 def _string_input_to_list(input_str, valid_str, arg_name):
@@ -3,16 +3,22 @@
 # Authors: Mainak Jas <mjas@mgh.harvard.edu>
 #          Sam Neymotin <samnemo@gmail.com>
 
+import os.path as op
 import warnings
 import numpy as np
 from copy import deepcopy
-from .externals.mne import _check_option
+from .cell_response import RecordingPlan
+from .reducers import _get_reducer
+from .externals.mne import _check_option, _validate_type
 
 from .viz import plot_dipole, plot_psd, plot_tfr_morlet
 
 
 def simulate_dipole(net, tstop, dt=0.025, n_trials=None, record_vsec=False,
-                    record_isec=False, postproc=False):
+                    record_isec=False, postproc=False, recording=None,
+                    reduce=None, event_rng='legacy', lazy_events=False,
+                    pattern_stim=False, burn_in=None, checkpoint_every=None,
+                    checkpoint_dir=None):
     """Simulate a dipole given the experiment parameters.
 
     Parameters
@@ -41,11 +47,79 @@ def simulate_dipole(net, tstop, dt=0.025, n_trials=None, record_vsec=False,
         extracellular recordings etc. The preferred way is to use the
         :meth:`~hnn_core.dipole.Dipole.smooth` and
         :meth:`~hnn_core.dipole.Dipole.scale` methods instead. Default: False.
+    recording : instance of RecordingPlan | None
+        The cells, sections and variables to record, as well as the sampling
+        interval and precision of the recordings, which are stored in
+        ``net.cell_response``. Cannot be combined with ``record_vsec`` or
+        ``record_isec``. Default: None.
+    reduce : str | callable | None
+        If not None, the results of each trial are reduced to summary
+        features by the worker that simulated it, and only these features are
+        returned, which saves the transfer of the raw traces. Either the name
+        of a reducer registered with :func:`~hnn_core.register_reducer`
+        (e.g., ``'spike_rates'``, ``'dipole_peak'`` or ``'band_power'``), or a
+        function with the signature ``reduce(dpl, cell_response, net)``, where
+        ``dpl`` is the Dipole and ``cell_response`` the CellResponse of the
+        trial. With MPIBackend, the function must be importable by the MPI
+        processes. ``net.cell_response`` is not set. Default: None.
+    event_rng : 'legacy' | 'philox'
+        The random number generator of the event times of the drives. With
+        'legacy', the times of each drive cell and trial are drawn one at a
+        time from a ``numpy.random.RandomState`` seeded with the sum of the
+        seed of the drive, the trial index and the gid of the drive cell,
+        which reproduces the results of previous versions. With 'philox', the
+        times of all drive cells are drawn at once from counter-based Philox
+        streams keyed by the seed of the drive and indexed by drive cell and
+        trial, which is much faster for many drive cells and events, and
+        does not reuse numbers across trials. Default: 'legacy'.
+    lazy_events : bool
+        If True, the event times of the drives are not created for all trials
+        before the simulation, but by the process simulating each trial, only
+        for the trial and the drive cells it simulates. This saves sending all
+        event times to each process. The event times are the same as with
+        False, but ``net.external_drives[drive_name]['events']`` is left
+        empty. Default: False.
+    pattern_stim : bool
+        If True, the events of all drive cells connected to the cells of a
+        process are delivered by a single ``PatternStim`` of NEURON, rather
+        than by a ``VecStim`` per drive cell. The drive cells are then not
+        created nor distributed over the processes, which saves memory and
+        build time with many drive cells, e.g., with Poisson drives or
+        replayed spikes (see :meth:`~hnn_core.Network.add_replay_drive`).
+        The results are the same, except that the spikes of the drive cells in
+        ``net.cell_response`` may be in a different order. Default: False.
+    burn_in : float | None
+        If not None, the cells start each trial from the steady state that a
+        cell of their cell type reaches when simulated for ``burn_in`` ms
+        without any inputs but the tonic biases active from the start, rather
+        than from fixed membrane potentials. The burn-in is run once and
+        cached for each configuration of the cell types and biases, so that
+        it is not paid again by later trials and simulations, and the dipole
+        does not need to settle at the start of a trial. The baseline of the
+        dipole is then renormalized as at ``burn_in`` ms after the fixed
+        membrane potentials. Default: None.
+    checkpoint_every : float | None
+        If not None, the state of each trial is saved in ``checkpoint_dir``
+        every ``checkpoint_every`` ms of simulated time, in addition to
+        ``tstop``. Requires ``checkpoint_dir``. Default: None.
+    checkpoint_dir : str | path-like | None
+        If not None, the directory where the state of the solver, the
+        recordings and the pending events of each trial are saved at
+        ``tstop`` (and every ``checkpoint_every`` ms). Only the latest
+        checkpoint of a trial is kept, along with the later checkpoints of a
+        simulation with a longer ``tstop``. A trial with a checkpoint in the
+        directory continues from its latest checkpoint until ``tstop``, e.g.,
+        to resume a simulation that crashed or was preempted, or to extend a
+        finished simulation with a longer ``tstop``. The network, ``dt``,
+        ``event_rng`` and the numbers of processes and threads must be the
+        same as when the checkpoints were saved, otherwise a ValueError is
+        raised. Not supported with ``pattern_stim=True``. Default: None.
 
     Returns
     -------
     dpls: list
-        List of dipole objects for each trials
+        List of dipole objects for each trials, or of the outputs of
+        ``reduce`` if it is not None.
     """
 
     from .parallel_backends import _BACKEND, JoblibBackend
@@ -58,6 +132,39 @@ def simulate_dipole(net, tstop, dt=0.025, n_trials=None, record_vsec=False,
     if n_trials < 1:
         raise ValueError("Invalid number of simulations: %d" % n_trials)
 
+    _check_option('event_rng', event_rng, ['legacy', 'philox'])
+    _validate_type(lazy_events, bool, 'lazy_events')
+    _validate_type(pattern_stim, bool, 'pattern_stim')
+
+    _validate_type(burn_in, ('numeric', None), 'burn_in')
+    if burn_in is not None and burn_in <= 0:
+        raise ValueError(f'burn_in must be positive, got {burn_in}')
+
+    _validate_type(checkpoint_every, ('numeric', None), 'checkpoint_every')
+    _validate_type(checkpoint_dir, (str, 'path-like', None), 'checkpoint_dir')
+    if checkpoint_every is not None:
+        if checkpoint_every <= 0:
+            raise ValueError(f'checkpoint_every must be positive, got '
+                             f'{checkpoint_every}')
+        if checkpoint_dir is None:
+            raise ValueError('checkpoint_dir must be specified to save '
+                             'checkpoints')
+    if checkpoint_dir is not None and pattern_stim:
+        raise ValueError('Checkpoints are not supported with '
+                         'pattern_stim=True')
+
+    _check_option('record_vsec', record_vsec, ['all', 'soma', False])
+    _check_option('record_isec', record_isec, ['all', 'soma', False])
+
+    _validate_type(recording, (RecordingPlan, None), 'recording',
+                   'RecordingPlan or None')
+    if recording is not None:
+        if record_vsec or record_isec:
+            raise ValueError('record_vsec and record_isec cannot be used '
+                             'together with a RecordingPlan')
+        recording._check(net, dt)
+    reduce = _get_reducer(reduce)
+
     if not net.connectivity:
         warnings.warn('No connections instantiated in network. Consider using '
                       'net = jones_2009_model() or net = law_2021_model() to '
@@ -81,23 +188,34 @@ def simulate_dipole(net, tstop, dt=0.025, n_trials=None, record_vsec=False,
             if duration < 0.:
                 raise ValueError('Duration of tonic input cannot be negative')
 
-    net._instantiate_drives(n_trials=n_trials, tstop=tstop)
-    net._reset_rec_arrays()
-
-    _check_option('record_vsec', record_vsec, ['all', 'soma', False])
-
+    # the arguments are valid, so the network can be set up for the
+    # simulation, starting with the burn-in (if any)
+    net._pattern_stim = pattern_stim
+    net._burn_in = burn_in
+    net._checkpoint = None
+    if checkpoint_dir is not None:
+        net._checkpoint = dict(every=checkpoint_every,
+                               dir=op.abspath(str(checkpoint_dir)))
     net._params['record_vsec'] = record_vsec
+    net._params['record_isec'] = record_isec
+    net._recording_plan = recording
 
-    _check_option('record_isec', record_isec, ['all', 'soma', False])
+    net._steady_states = None
+    if burn_in is not None:
+        from .network_builder import _get_steady_states
+        net._steady_states = _get_steady_states(net, burn_in, dt)
 
-    net._params['record_isec'] = record_isec
+    net._instantiate_drives(n_trials=n_trials, tstop=tstop,
+                            event_rng=event_rng, lazy=lazy_events)
+    net._reset_rec_arrays()
 
     if postproc:
         warnings.warn('The postproc-argument is deprecated and will be removed'
                       ' in a future release of hnn-core. Please define '
                       'smoothing and scaling explicitly using Dipole methods.',
                       DeprecationWarning)
-    dpls = _BACKEND.simulate(net, tstop, dt, n_trials, postproc)
+    dpls = _BACKEND.simulate(net, tstop, dt, n_trials, postproc,
+                             reduce=reduce)
 
     return dpls
 
@@ -525,7 +643,7 @@ class Dipole(object):
             colormap=colormap, colorbar=colorbar,
             colorbar_inside=colorbar_inside, show=show)
 
-    def _baseline_renormalize(self, N_pyr_x, N_pyr_y):
+    def _baseline_renormalize(self, N_pyr_x, N_pyr_y, t0=0.):
         """Only baseline renormalize if the units are fAm.
 
         Parameters
@@ -534,7 +652,12 @@ class Dipole(object):
             Nr of cells (x)
         N_pyr_y : int
             Nr of cells (y)
+        t0 : float
+            The time (ms) since the cells were at their initial membrane
+            potentials at the start of the simulation, e.g., after a burn-in.
+            Default: 0.
         """
+        times = self.times + t0
         # N_pyr cells in grid. This is PER LAYER
         N_pyr = N_pyr_x * N_pyr_y
         # dipole offset calculation: increasing number of pyr
@@ -568,11 +691,11 @@ class Dipole(object):
         m1 = 1.01e-4
         b1 = -48.412078
         # piecewise normalization
-        self.data['L5'][self.times <= 37.] -= dpl_offset['L5']
-        self.data['L5'][(self.times > 37.) & (self.times < t1)] -= N_pyr * \
-            (m * self.times[(self.times > 37.) & (self.times < t1)] + b)
-        self.data['L5'][self.times >= t1] -= N_pyr * \
-            (m1 * self.times[self.times >= t1] + b1)
+        self.data['L5'][times <= 37.] -= dpl_offset['L5']
+        self.data['L5'][(times > 37.) & (times < t1)] -= N_pyr * \
+            (m * times[(times > 37.) & (times < t1)] + b)
+        self.data['L5'][times >= t1] -= N_pyr * \
+            (m1 * times[times >= t1] + b1)
         # recalculate the aggregate dipole based on the baseline
         # normalized ones
         self.data['agg'] = self.data['L2'] + self.data['L5']
@@ -232,6 +232,225 @@ def _get_prng(seed, gid, sync_evinput=False):
     return prng, prng2
 
 
+# constants of the Philox4x32 generator, see Salmon et al. (2011). Parallel
+# random numbers: As easy as 1, 2, 3. Proceedings of SC11
+_PHILOX_M = (np.uint64(0xD2511F53), np.uint64(0xCD9E8D57))
+_PHILOX_W = (np.uint64(0x9E3779B9), np.uint64(0xBB67AE85))
+_MASK_32 = np.uint64(0xFFFFFFFF)
+
+
+def _philox4x32(counters, key, n_rounds=10):
+    """Philox4x32 counter-based random number generator.
+
+    Parameters
+    ----------
+    counters : array of int, shape (..., 4)
+        The 128-bit counters, as four 32-bit words.
+    key : tuple of int
+        The 64-bit key, as two 32-bit words.
+    n_rounds : int
+        The number of rounds. Default: 10.
+
+    Returns
+    -------
+    words : array of uint32, shape (..., 4)
+        The random 32-bit words of each counter.
+    """
+    counters = np.asarray(counters, dtype=np.uint64)
+    c0, c1, c2, c3 = (counters[..., idx] for idx in range(4))
+    k0, k1 = np.uint64(key[0]), np.uint64(key[1])
+    shift = np.uint64(32)
+    for round_idx in range(n_rounds):
+        if round_idx > 0:
+            k0 = (k0 + _PHILOX_W[0]) & _MASK_32
+            k1 = (k1 + _PHILOX_W[1]) & _MASK_32
+        # the product of two 32-bit words fits in 64 bits
+        prod0 = _PHILOX_M[0] * c0
+        prod1 = _PHILOX_M[1] * c2
+        c0, c1, c2, c3 = ((prod1 >> shift) ^ c1 ^ k0, prod1 & _MASK_32,
+                          (prod0 >> shift) ^ c3 ^ k1, prod0 & _MASK_32)
+    return np.stack([c0, c1, c2, c3], axis=-1).astype(np.uint32)
+
+
+def _philox_uniform(seed, gids, trial_idxs, block_idxs, stream=0):
+    """Uniform random numbers in [0, 1) of counter-based streams.
+
+    The stream of each drive cell gid and trial uses the counters
+    ``(block_idx, gid, trial_idx, stream)`` with ``seed`` as key, such that
+    its numbers do not depend on the other streams generated alongside nor
+    on the order of generation.
+
+    Parameters
+    ----------
+    seed : int
+        The seed of the drive.
+    gids : array of int, shape (n_streams,)
+        The gid of the drive cell of each stream.
+    trial_idxs : array of int, shape (n_streams,)
+        The trial of each stream.
+    block_idxs : array of int, shape (n_blocks,)
+        The blocks to draw, each of which yields two numbers.
+    stream : int
+        Index separating streams used for different purposes. Default: 0.
+
+    Returns
+    -------
+    uniform : array, shape (n_streams, 2 * n_blocks)
+        The random numbers of each stream.
+    """
+    gids, trial_idxs = np.asarray(gids), np.asarray(trial_idxs)
+    counters = np.empty((len(gids), len(block_idxs), 4), dtype=np.uint64)
+    counters[..., 0] = block_idxs
+    counters[..., 1] = gids[:, np.newaxis]
+    counters[..., 2] = trial_idxs[:, np.newaxis]
+    counters[..., 3] = stream
+    seed = int(seed)
+    key = (seed & 0xFFFFFFFF, (seed >> 32) & 0xFFFFFFFF)
+    words = _philox4x32(counters, key).astype(np.uint64)
+    # 53-bit floats from 27 and 26 bits of two words, as in numpy
+    uniform = ((words[..., 0::2] >> np.uint64(5)) * 67108864. +
+               (words[..., 1::2] >> np.uint64(6))) / 9007199254740992.
+    return uniform.reshape(len(gids), -1)
+
+
+def _philox_normal(seed, gids, trial_idxs, block_idxs, stream=0):
+    """Standard normal random numbers of counter-based streams.
+
+    Uses the Box-Muller transform of the numbers of _philox_uniform, which
+    takes the same parameters.
+    """
+    uniform = _philox_uniform(seed, gids, trial_idxs, block_idxs,
+                              stream=stream)
+    radius = np.sqrt(-2. * np.log1p(-uniform[:, 0::2]))
+    angle = 2. * np.pi * uniform[:, 1::2]
+    normal = np.empty_like(uniform)
+    normal[:, 0::2] = radius * np.cos(angle)
+    normal[:, 1::2] = radius * np.sin(angle)
+    return normal
+
+
+def _drive_events_philox(drive_type, dynamics, tstop, target_types,
+                         drive_cell_gids, trial_idxs, event_seed=0):
+    """Generate the event times of many drive cells and trials at once.
+
+    Counterpart of _drive_cell_event_times with counter-based random numbers
+    (see _philox_uniform), which are drawn for all event trains with array
+    operations.
+
+    Parameters
+    ----------
+    drive_type : str
+        The drive type, which is one of 'poisson', 'gaussian', 'evoked' or
+        'bursty' (see _drive_cell_event_times).
+    dynamics : dict
+        Parameters of the event time dynamics to simulate
+    tstop : float
+        The simulation stop time (ms).
+    target_types : list of str
+        Type of cell each event train targets, or 'any'.
+    drive_cell_gids : array of int
+        The gid of the drive cell of each event train, relative to the first
+        drive cell.
+    trial_idxs : array of int
+        The trial of each event train.
+    event_seed : int
+        The seed of the drive. Default: 0.
+
+    Returns
+    -------
+    values : array of float, shape (n_events,)
+        The sorted event times of all event trains, one train after the
+        other.
+    n_events : array of int, shape (n_trains,)
+        The number of events of each event train.
+    """
+    gids = np.asarray(drive_cell_gids, dtype=int)
+    trial_idxs = np.asarray(trial_idxs, dtype=int)
+    n_trains = len(gids)
+
+    if drive_type == 'poisson':
+        t0, T = dynamics['tstart'], dynamics['tstop']
+        # XXX as in legacy mode, the trains of cell types without a rate
+        # constant are empty
+        target_types = np.asarray(target_types)
+        rates = np.zeros(n_trains)
+        for target_type in np.unique(target_types):
+            if target_type == 'any':
+                rate_constant = dynamics['rate_constant']
+            elif target_type in dynamics['rate_constant']:
+                rate_constant = dynamics['rate_constant'][target_type]
+            else:
+                continue
+            _check_extpois(t0=t0, T=T, lamtha=rate_constant)
+            rates[target_types == target_type] = rate_constant
+
+        # draw the inter-event intervals in chunks of the expected number
+        # of events until all trains have reached T
+        n_expected = rates.max(initial=0.) * (T - t0) / 1000.
+        n_blocks = int(n_expected + 5 * np.sqrt(n_expected)) // 2 + 1
+        event_times = np.full((n_trains, 0), np.nan)
+        last_times = np.full(n_trains, float(t0))
+        active = rates > 0.
+        block_start = 0
+        while active.any():
+            rows = np.flatnonzero(active)
+            uniform = _philox_uniform(
+                event_seed, gids[rows], trial_idxs[rows],
+                np.arange(block_start, block_start + n_blocks))
+            intervals = -np.log1p(-uniform) / rates[rows, np.newaxis] * 1000.
+            chunk = np.full((n_trains, intervals.shape[1]), np.nan)
+            chunk[rows] = np.cumsum(
+                np.c_[last_times[rows], intervals], axis=1)[:, 1:]
+            event_times = np.c_[event_times, chunk]
+            last_times[rows] = chunk[rows, -1]
+            active[rows] = last_times[rows] < T
+            block_start += n_blocks
+        event_times[event_times >= T] = np.nan
+    elif drive_type == 'evoked' or drive_type == 'gaussian':
+        numspikes = dynamics['numspikes']
+        normal = _philox_normal(event_seed, gids, trial_idxs,
+                                np.arange((numspikes + 1) // 2))
+        event_times = (dynamics['mu'] +
+                       dynamics['sigma'] * normal[:, :numspikes])
+    elif drive_type == 'bursty':
+        t0 = np.full(n_trains, float(dynamics['tstart']))
+        if dynamics['tstart_std'] > 0.:
+            # as in legacy mode, the start time varies across trials but is
+            # shared by the cells of a drive
+            jitter = _philox_normal(event_seed, np.zeros_like(gids),
+                                    trial_idxs, [0], stream=1)[:, 0]
+            t0 += dynamics['tstart_std'] * jitter
+        burst_period = _get_burst_period(
+            f_input=dynamics['burst_rate'],
+            events_per_cycle=dynamics['numspikes'],
+            cycle_events_isi=dynamics['spike_isi'])
+
+        # mean times of the bursts, starting at t0
+        n_bursts = max(int(np.ceil(
+            (dynamics['tstop'] - t0.min(initial=np.inf)) / burst_period)), 0)
+        burst_times = (t0[:, np.newaxis] +
+                       burst_period * np.arange(n_bursts)[np.newaxis])
+        burst_times[burst_times >= dynamics['tstop']] = np.nan
+        normal = _philox_normal(event_seed, gids, trial_idxs,
+                                np.arange((n_bursts + 1) // 2))
+        burst_times += dynamics['burst_std'] * normal[:, :n_bursts]
+
+        events_per_cycle = dynamics['numspikes']
+        cycle = np.arange(events_per_cycle) - (events_per_cycle - 1) / 2
+        event_times = (burst_times[:, np.newaxis, :] +
+                       dynamics['spike_isi'] * cycle[:, np.newaxis])
+        event_times = event_times.reshape(n_trains, -1)
+    else:
+        raise ValueError('Invalid external drive: %s' % drive_type)
+
+    # as in _drive_cell_event_times, keep the times in (0, tstop], sorted for
+    # VecStim(). NaN, i.e., no event, is sorted last
+    event_times[~((event_times > 0) & (event_times <= tstop))] = np.nan
+    event_times.sort(axis=1)
+    is_event = ~np.isnan(event_times)
+    return event_times[is_event], is_event.sum(axis=1)
+
+
 def _drive_cell_event_times(drive_type, dynamics, tstop, target_type='any',
                             trial_idx=0, drive_cell_gid=0, event_seed=0):
     """Generate event times for one artificial drive cell based on dynamics.
@@ -449,14 +668,7 @@ def _create_extpois(*, t0, T, lamtha, prng):
         The event times.
     """
     # see: http://www.cns.nyu.edu/~david/handouts/poisson.pdf
-    if t0 < 0:
-        raise ValueError('The start time for Poisson inputs must be'
-                         f'greater than 0. Got {t0}')
-    if T < t0:
-        raise ValueError('The end time for Poisson inputs must be'
-                         f'greater than start time. Got ({t0}, {T})')
-    if lamtha <= 0.:
-        raise ValueError(f'Rate must be > 0. Got {lamtha}')
+    _check_extpois(t0=t0, T=T, lamtha=lamtha)
 
     event_times = list()
     t_gen = t0
@@ -468,6 +680,18 @@ def _create_extpois(*, t0, T, lamtha, prng):
     return np.array(event_times)
 
 
+def _check_extpois(*, t0, T, lamtha):
+    """Check the parameters of poisson inputs"""
+    if t0 < 0:
+        raise ValueError('The start time for Poisson inputs must be'
+                         f'greater than 0. Got {t0}')
+    if T < t0:
+        raise ValueError('The end time for Poisson inputs must be'
+                         f'greater than start time. Got ({t0}, {T})')
+    if lamtha <= 0.:
+        raise ValueError(f'Rate must be > 0. Got {lamtha}')
+
+
 def _create_gauss(*, mu, sigma, numspikes, prng):
     """Create gaussian inputs (used by extgauss and evoked).
 
@@ -530,12 +754,9 @@ def _create_bursty_input(*, t0, t0_stdev, tstop, f_input,
     if t0_stdev > 0.0:
         t0 = prng2.normal(t0, t0_stdev)
 
-    burst_period = 1000. / f_input
-    burst_duration = (events_per_cycle - 1) * cycle_events_isi
-    if burst_duration > burst_period:
-        raise ValueError(f'Burst duration ({burst_duration}s) cannot'
-                         f' be greater than burst period ({burst_period}s)'
-                         'Consider increasing the spike ISI or burst rate')
+    burst_period = _get_burst_period(f_input=f_input,
+                                     events_per_cycle=events_per_cycle,
+                                     cycle_events_isi=cycle_events_isi)
 
     # array of mean stimulus times, starts at t0
     isi_array = np.arange(t0, tstop, burst_period)
@@ -547,3 +768,14 @@ def _create_bursty_input(*, t0, t0_stdev, tstop, f_input,
         t_array = np.ravel([t_array + cycle_events_isi * cyc for cyc in cycle])
 
     return t_array
+
+
+def _get_burst_period(*, f_input, events_per_cycle, cycle_events_isi):
+    """Get the period of bursty inputs, checking that bursts fit in it"""
+    burst_period = 1000. / f_input
+    burst_duration = (events_per_cycle - 1) * cycle_events_isi
+    if burst_duration > burst_period:
+        raise ValueError(f'Burst duration ({burst_duration}s) cannot'
+                         f' be greater than burst period ({burst_period}s)'
+                         'Consider increasing the spike ISI or burst rate')
+    return burst_period
@@ -554,8 +554,12 @@ class _ExtracellularArrayBuilder(object):
 
         Parameters
         ----------
-        cvode : instance of h.CVode
-            Multi order variable time step integration method.
+        cvode : instance of h.CVode | None
+            Multi order variable time step integration method. If None, the
+            recording callback is not registered and
+            ``_gather_nrn_voltages`` must be called after each integration
+            step instead, e.g., when integrating with multiple threads, which
+            ``extra_scatter_gather`` does not support.
         include_celltypes : str
             String to match against the cell type of each section. Defaults to
             ``'all'``: calculate extracellular potential generated by all
@@ -621,10 +625,18 @@ class _ExtracellularArrayBuilder(object):
         # NB we must make a copy of the function reference, and keep it for
         # later decoupling using extra_scatter_gather_remove
         # (instead of a new function reference)
-        self._recording_callback = self._gather_nrn_voltages
-        # Nb extra_scatter_gather is called _after_ the solver takes a step,
-        # so the initial state is not recorded (initialised to zero above)
-        cvode.extra_scatter_gather(0, self._recording_callback)
+        self._recording_callback = None
+        if cvode is not None:
+            self._recording_callback = self._gather_nrn_voltages
+            # Nb extra_scatter_gather is called _after_ the solver takes a
+            # step, so the initial state is not recorded (initialised to zero
+            # above)
+            cvode.extra_scatter_gather(0, self._recording_callback)
+
+    def _reset(self):
+        """Clear the potentials calculated in a previous simulation."""
+        # NB the potential at time 0.0 ms is defined to be zero (see _build)
+        self._nrn_voltages = h.Vector(self.n_contacts, 0.)
 
     def _gather_nrn_voltages(self):
         """Callback function for _CVODE.extra_scatter_gather
@@ -632,7 +644,8 @@ class _ExtracellularArrayBuilder(object):
         Enables fast calculation of transmembrane current (nA) at each
         segment. Note that this will run on each rank, so it is safe to use
         the extra_scatter_gather-method, which docs say doesn't support
-        'multiple threads'.
+        'multiple threads'. Without the callback, e.g., with multiple threads,
+        it is called between integration steps instead.
         """
         # keep all data in Neuron objects for efficiency
 
@@ -662,19 +675,17 @@ class _ExtracellularArrayBuilder(object):
             assert (self._nrn_voltages.size() ==
                     self.n_contacts * self._nrn_n_samples)
 
-            # first reshape to a Neuron Matrix object
-            extmat = h.Matrix(self.n_contacts, self._nrn_n_samples)
-            extmat.from_vector(self._nrn_voltages)
-
-            # then unpack into 2D python list and return
-            return [extmat.getrow(ii).to_python() for
-                    ii in range(extmat.nrow())]
+            # the potentials of all contacts were appended at each sample. NB
+            # copy the transposed view, as the h.Vector is reused
+            voltages = self._nrn_voltages.as_numpy().reshape(
+                self._nrn_n_samples, self.n_contacts)
+            return voltages.T.copy()
         else:
             raise RuntimeError('Simulation not yet run!')
 
     def _get_nrn_times(self):
         """The sampling time points."""
         if self._nrn_times.size() > 0:
-            return self._nrn_times.to_python()
+            return self._nrn_times.as_numpy().copy()
         else:
             raise RuntimeError('Simulation not yet run!')
@@ -94,7 +94,8 @@ class HNNGUI:
         Widget that specify the mpi command to use when the backend is
         MPIBackend.
     widget_n_jobs : Widget
-        Widget that specify the cores in multi-trial simulations.
+        Widget that specify the cores in multi-trial simulations, or the
+        threads in single-trial simulations.
     widget_drive_type_selection : Widget
         Widget that is used to select the drive to be added to the network.
     widget_location_selection : Widget.
@@ -1299,6 +1300,10 @@ def run_button_clicked(widget_simulation_name, log_out, drive_widgets,
         if backend_selection.value == "MPI":
             backend = MPIBackend(
                 n_procs=multiprocessing.cpu_count() - 1, mpi_cmd=mpi_cmd.value)
+        elif ntrials.value == 1:
+            # the cells of a single trial are distributed over threads
+            backend = JoblibBackend(n_jobs=1, n_threads=n_jobs.value)
+            print(f"Using Joblib with {n_jobs.value} thread(s).")
         else:
             backend = JoblibBackend(n_jobs=n_jobs.value)
             print(f"Using Joblib with {n_jobs.value} core(s).")
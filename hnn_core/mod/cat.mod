@@ -15,6 +15,7 @@ NEURON {
     SUFFIX cat
     NONSPECIFIC_CURRENT i   : not causing [Ca2+] influx
     RANGE gbar, i
+    THREADSAFE
 }
 
 PARAMETER {
@@ -6,6 +6,9 @@
 
 NEURON {
     SUFFIX dipole
+    : the POINTERs only refer to variables of the same cell, and a cell
+    : is never split across threads
+    THREADSAFE
     RANGE ri, ia, Q, ztan
     POINTER pv
 
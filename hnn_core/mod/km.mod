@@ -23,6 +23,7 @@ NEURON {
     RANGE ninf, ntau
     GLOBAL Ra, Rb
     GLOBAL q10, temp, tadj, vmin, vmax, tshift
+    THREADSAFE
 }
 
 UNITS {
@@ -82,6 +83,9 @@ STATE {
 }
 
 INITIAL {
+    : the table may be filled on another thread, so tadj, which is per
+    : thread, is set here rather than only in rates()
+    tadj = q10^((celsius - temp - tshift) / 10)
     trates(v)
     n = ninf
 }
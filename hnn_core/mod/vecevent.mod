@@ -2,6 +2,7 @@
 
 NEURON {
     ARTIFICIAL_CELL VecStim
+    THREADSAFE
 }
 
 ASSIGNED {
@@ -25,6 +26,14 @@ NET_RECEIVE (w) {
         if (index > 0) {
             net_send(etime - t, 1)
         }
+    } else if (flag == 0 && index < 0) {
+        : an external event restarts a stream that ended at element w,
+        : e.g., after the vector was extended
+        index = w
+        element()
+        if (index > 0) {
+            net_send(etime - t, 1)
+        }
     }
 }
 
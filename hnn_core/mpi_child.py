@@ -1,41 +1,35 @@
 """Script for running parallel simulations with MPI when called with mpiexec.
-This script is called directly from MPIBackend.simulate()
+This script is called directly from MPIBackend.simulate(). It simulates the
+networks sent by MPIBackend until it receives the exit signal, such that
+persistent MPI processes can keep NEURON loaded between simulations.
 """
 
 # Authors: Blake Caldwell <blake_caldwell@brown.edu>
 
 import sys
-import pickle
-import base64
+import os.path as op
 import re
 
-from hnn_core.parallel_backends import _extract_data, _extract_data_length
+import numpy as np
 
+from hnn_core.parallel_backends import (_read_frames, _write_frames,
+                                        _NET_FNAME, _DATA_FNAME)
 
-def _pickle_data(sim_data):
-    # pickle the data and encode as base64 before sending to stderr
-    pickled_str = pickle.dumps(sim_data)
-    pickled_bytes = base64.b64encode(pickled_str)
 
-    return pickled_bytes
+def _read_transport_dir(stream):
+    """Read the directory of the files exchanged with MPIBackend
 
-
-def _str_to_net(input_str):
-    net = None
-
-    data_str = _extract_data(input_str, 'net')
-    if len(data_str) > 0:
-        # get the size, but start the search after data
-        net_size = _extract_data_length(input_str[len(data_str):],
-                                        'net')
-        # check the size
-        if len(data_str) != net_size:
-            raise ValueError("Got incorrect network size: %d bytes " %
-                             len(data_str) + "expected length: %d" % net_size)
-        # unpickle the net
-        net = pickle.loads(base64.b64decode(data_str.encode(),
-                                            validate=True))
-    return net
+    Returns None once MPIBackend signals that no more simulations follow.
+    """
+    while True:
+        line = stream.readline()
+        if len(line) == 0:
+            raise EOFError('Did not receive the transport directory')
+        if '@data_received@' in line:
+            return None
+        dir_match = re.search(r'@transport_dir:(.+)@', line)
+        if dir_match is not None:
+            return dir_match.group(1)
 
 
 class MPISimulation(object):
@@ -51,9 +45,12 @@ class MPISimulation(object):
         The handle used for communicating among MPI processes
     rank : int
         The rank for each processor part of the MPI communicator
+    transport_dir : str | None
+        The directory of the files exchanged with MPIBackend (rank 0 only)
     """
     def __init__(self, skip_mpi_import=False):
         self.skip_mpi_import = skip_mpi_import
+        self.transport_dir = None
         if skip_mpi_import:
             self.rank = 0
         else:
@@ -72,67 +69,79 @@ class MPISimulation(object):
             MPI.Finalize()
 
     def _read_net(self):
-        """Read net broadcasted to all ranks on stdin"""
+        """Read net broadcasted to all ranks from the file named on stdin
 
-        # read Network from stdin
-        if self.rank == 0:
-            input_str = ''
-            while True:
-                line = sys.stdin.readline()
-                line = line.rstrip('\n')
-                input_str += line
-                end_match = re.search(r'@end_of_net:\d+@', input_str)
-                if end_match is not None:
-                    break
+        None is broadcasted instead once the exit signal is received.
+        """
 
-            net = _str_to_net(input_str)
-        else:
-            net = None
+        # read Network from the file in the directory given on stdin
+        net = None
+        if self.rank == 0:
+            self.transport_dir = _read_transport_dir(sys.stdin)
+            if self.transport_dir is not None:
+                net = _read_frames(op.join(self.transport_dir, _NET_FNAME))
 
         net = self.comm.bcast(net, root=0)
         return net
 
-    def _wait_for_exit_signal(self):
-        # read from stdin
-        if self.rank == 0:
-            input_str = ''
-            while True:
-                line = sys.stdin.readline()
-                line = line.rstrip('\n')
-                input_str += line
-                if '@data_received@' in input_str:
-                    break
-
-    def _write_data_stderr(self, sim_data):
-        """write base64 encoded data to stderr"""
+    def _write_data(self, sim_data, compress=False):
+        """write data to a file and signal its size on stderr"""
 
         # only have rank 0 write to stdout/stderr
         if self.rank > 0:
             return
 
-        sys.stderr.write('@start_of_data@')
-        pickled_bytes = _pickle_data(sim_data)
-        sys.stderr.write(pickled_bytes.decode())
+        n_bytes = _write_frames(op.join(self.transport_dir, _DATA_FNAME),
+                                sim_data, compress=compress)
 
         # the parent process is waiting for "@end_of_data:[#bytes]@" with the
-        # length of data. The '@' is not found in base64 encoding, so we can
-        # be certain it is the border of the signal
-        sys.stderr.write('@end_of_data:%d@\n' % len(pickled_bytes))
+        # size of the file, which is complete once the signal is sent
+        sys.stderr.write('@end_of_data:%d@\n' % n_bytes)
         sys.stderr.flush()  # flush to ensure signal is not buffered
 
-    def run(self, net, tstop, dt, n_trials):
-        """Run MPI simulation(s) and write results to stderr"""
+    def run(self, net, tstop, dt, n_trials, multisplit=False, n_threads=1,
+            n_subworlds=1, postproc=False, reduce=None):
+        """Run MPI simulation(s) and return the data of rank 0
+
+        If ``reduce`` is not None, rank 0 of each subworld replaces the data
+        of each trial by its output.
+        """
 
-        from hnn_core.network_builder import _simulate_single_trial
+        from hnn_core.network_builder import (_simulate_single_trial,
+                                              _create_subworlds, _get_rank)
+        from hnn_core.parallel_backends import _reduce_trial_data
+
+        # with subworlds, each group of ranks simulates a block of trials
+        trial_idxs = list(range(n_trials))
+        if n_subworlds > 1:
+            subworld_idx = _create_subworlds(n_subworlds)
+            trial_idxs = np.array_split(
+                trial_idxs, n_subworlds)[subworld_idx].tolist()
 
         sim_data = list()
-        for trial_idx in range(n_trials):
-            single_sim_data = _simulate_single_trial(net, tstop, dt, trial_idx)
+        for trial_idx in trial_idxs:
+            # the NEURON model built for the first trial is reused
+            single_sim_data = _simulate_single_trial(
+                net, tstop, dt, trial_idx,
+                reuse_network=trial_idx != trial_idxs[0],
+                multisplit=multisplit, n_threads=n_threads)
+            if reduce is not None and _get_rank() == 0:
+                single_sim_data = _reduce_trial_data(single_sim_data, net,
+                                                     postproc, reduce)
 
             # go ahead and append trial data for each rank, though
             # only rank 0 has data that should be sent back to MPIBackend
             sim_data.append(single_sim_data)
 
+        if n_subworlds > 1:
+            # collect the trials from rank 0 of each subworld, in order
+            if _get_rank() > 0:
+                sim_data = list()
+            sim_data = self.comm.gather(sim_data, root=0)
+            if self.rank == 0:
+                sim_data = [trial_data for subworld_data in sim_data
+                            for trial_data in subworld_data]
+
         # flush output buffers from all ranks (any errors or status mesages)
         sys.stdout.flush()
         sys.stderr.flush()
@@ -148,11 +157,21 @@ if __name__ == '__main__':
 
     try:
         with MPISimulation() as mpi_sim:
-            # XXX: _read_net -> _read_obj, fix later
-            net, tstop, dt, n_trials = mpi_sim._read_net()
-            sim_data = mpi_sim.run(net, tstop, dt, n_trials)
-            mpi_sim._write_data_stderr(sim_data)
-            mpi_sim._wait_for_exit_signal()
+            # simulate until the exit signal is received, which directly
+            # follows the data unless MPIBackend(persistent=True) is used
+            while True:
+                # XXX: _read_net -> _read_obj, fix later
+                obj = mpi_sim._read_net()
+                if obj is None:
+                    break
+                (net, tstop, dt, n_trials, multisplit, n_threads, n_subworlds,
+                 compress, postproc, reduce) = obj
+                sim_data = mpi_sim.run(net, tstop, dt, n_trials,
+                                       multisplit=multisplit,
+                                       n_threads=n_threads,
+                                       n_subworlds=n_subworlds,
+                                       postproc=postproc, reduce=reduce)
+                mpi_sim._write_data(sim_data, compress=compress)
     except Exception:
         # This can be useful to indicate the problem to the
         # caller (in parallel_backends.py)
@@ -8,11 +8,12 @@
 #          Ryan Thorpe <ryan_thorpe@brown.edu>
 
 import itertools as it
+from collections.abc import Mapping, Sequence
 from copy import deepcopy
 
 import numpy as np
 
-from .drives import _drive_cell_event_times
+from .drives import _drive_cell_event_times, _drive_events_philox
 from .drives import _get_target_properties, _add_drives_from_params
 from .drives import _check_drive_parameter_values, _check_poisson_rates
 from .cells_default import pyramidal, basket
@@ -20,7 +21,8 @@ from .params import _long_name, _short_name
 from .viz import plot_cells
 from .externals.mne import _validate_type, _check_option
 from .extracellular import ExtracellularArray
-from .check import _check_gids, _gid_to_type, _string_input_to_list
+from .check import (_check_gids, _gid_to_type, _get_gid_bounds,
+                    _gids_to_type_idx, _string_input_to_list)
 
 
 def _create_cell_coords(n_pyr_x, n_pyr_y, zdiff, inplane_distance):
@@ -104,15 +106,19 @@ def _connection_probability(conn, probability, conn_seed=None):
 
     Parameters
     ----------
-    conn : Instance of _Connectivity object
+    conn : Instance of _Connectivity object | list of _Connectivity
         Object specifying the biophysical parameters and src target pairs
         of a specific connection class. Function modifies conn in place.
-    probability : float
+        If a list, each connection is pruned as if the function was called
+        on it separately.
+    probability : float | list of float
         Probability of connection between any src-target pair.
-        Defaults to 1.0 producing an all-to-all pattern.
-    conn_seed : int
+        Defaults to 1.0 producing an all-to-all pattern. If a list, one
+        probability for each connection in conn.
+    conn_seed : int | list of int
         Optional initial seed for random number generator (default: None).
-        Used to randomly remove connections when probablity < 1.0.
+        Used to randomly remove connections when probablity < 1.0. If a
+        list, one seed for each connection in conn.
 
     Notes
     -----
@@ -123,39 +129,187 @@ def _connection_probability(conn, probability, conn_seed=None):
     The probability attribute will store the most recent value passed to
     this function. As such, this number does not accurately describe the
     connections probability of the original set after successive calls.
+
+    Connections of the same size pruned with the same probability and the
+    same (not None) seed keep the same pairs, so their selection is only
+    drawn once.
     """
-    # Random number generator for random connection selection
-    rng = np.random.default_rng(conn_seed)
+    conns = conn if isinstance(conn, list) else [conn]
+    probabilities = probability if isinstance(probability, list) else \
+        [probability] * len(conns)
+    conn_seeds = conn_seed if isinstance(conn_seed, list) else \
+        [conn_seed] * len(conns)
+    if not len(conns) == len(probabilities) == len(conn_seeds):
+        raise ValueError('probability and conn_seed must have one value for '
+                         'each connection')
+    for probability in probabilities:
+        _check_connection_probability(probability)
+
+    masks = dict()
+    for conn, probability, conn_seed in zip(conns, probabilities,
+                                            conn_seeds):
+        # Connections are numbered in the order of the flattened target
+        # lists
+        n_all_connections = len(conn['gid_pairs'].indices)
+        key = (conn_seed, n_all_connections, probability)
+        if conn_seed is None or key not in masks:
+            new_connections = _draw_connections(n_all_connections,
+                                                probability, conn_seed)
+            masks[key] = np.zeros(n_all_connections, dtype=bool)
+            masks[key][new_connections] = True
+        # Remove src_gids with no targets
+        conn['gid_pairs'] = conn['gid_pairs']._select(masks[key],
+                                                      drop_empty=True)
+
+
+def _check_connection_probability(probability):
+    """Check a probability < 1.0 of keeping each connection."""
     _validate_type(probability, float, 'probability')
     if probability <= 0.0 or probability >= 1.0:
         raise ValueError('probability must be in the range (0,1)')
-    # Flatten connections into a list of targets.
-    all_connections = np.concatenate(
-        [target_src_pair for
-            target_src_pair in conn['gid_pairs'].values()])
-    n_connections = np.round(
-        len(all_connections) * probability).astype(int)
 
+
+def _draw_connections(n_all_connections, probability, conn_seed=None):
+    """Draw the indices of the connections kept with a probability."""
+    # Random number generator for random connection selection
+    rng = np.random.default_rng(conn_seed)
+    n_connections = np.round(n_all_connections * probability).astype(int)
     # Select a random subset of connections to retain.
-    new_connections = rng.choice(
-        range(len(all_connections)), n_connections, replace=False)
-    remove_srcs = list()
-    connection_idx = 0
-    for src_gid, target_src_pair in conn['gid_pairs'].items():
-        target_new = list()
-        for target_gid in target_src_pair:
-            if connection_idx in new_connections:
-                target_new.append(target_gid)
-            connection_idx += 1
-
-        # Update targets for src_gid
-        if target_new:
-            conn['gid_pairs'][src_gid] = target_new
-        else:
-            remove_srcs.append(src_gid)
+    return rng.choice(n_all_connections, n_connections, replace=False)
+
+
+def _get_near_gid_pairs(src_gids, target_gids, gid_pos, max_distance,
+                        allow_autapses=True, probability=1.0,
+                        conn_seed=None):
+    """Create the src-target pairs of cells that are close to each other.
+
+    The pairs are the same as when connecting all src_gids to all
+    target_gids, removing the autapses if not allow_autapses, keeping a
+    random subset of the connections with _connection_probability, and
+    removing the pairs beyond max_distance with _connection_distance_cutoff.
+    However, only the pairs within max_distance are created.
+
+    Parameters
+    ----------
+    src_gids : list of int
+        The source gids, without repetitions.
+    target_gids : list of int
+        The target gids of each source gid.
+    gid_pos : array, shape (n_gids, 3)
+        The position of each gid of the network.
+    max_distance : float
+        The distance in the xy plane beyond which src-target pairs are
+        not created.
+    allow_autapses : bool
+        If True, a gid can be connected to itself.
+    probability : float
+        Probability of connection between any src-target pair.
+    conn_seed : int | None
+        Seed of the random selection of the connections if probability is
+        less than 1.0.
+
+    Returns
+    -------
+    gid_pairs : instance of _GidPairs
+        The pairs, without the source gids that have no targets.
+
+    Notes
+    -----
+    With probability < 1.0, the indices of the kept connections are still
+    drawn among all src-target pairs, so that they do not depend on
+    max_distance.
+    """
+    from scipy.spatial import cKDTree
+
+    src_gids = np.asarray(src_gids, dtype=int)
+    target_gids = np.asarray(target_gids, dtype=int)
+    n_targets = len(target_gids)
+
+    # the targets within max_distance of each source, in the order of all
+    # src-target pairs
+    target_tree = cKDTree(gid_pos[target_gids, :2])
+    neighbors = target_tree.query_ball_point(gid_pos[src_gids, :2],
+                                             r=max_distance)
+    n_neighbors = [len(src_neighbors) for src_neighbors in neighbors]
+    rows = np.repeat(np.arange(len(src_gids)), n_neighbors)
+    cols = np.fromiter(it.chain.from_iterable(neighbors), dtype=int,
+                       count=sum(n_neighbors))
+    order = np.lexsort((cols, rows))
+    rows, cols = rows[order], cols[order]
+    # index of each pair among all the src-target pairs
+    pair_idxs = rows * n_targets + cols
+
+    keep = np.ones(len(pair_idxs), dtype=bool)
+    n_all_connections = len(src_gids) * n_targets
+    if not allow_autapses:
+        # autapses are at distance 0, hence all among the near pairs
+        is_autapse = target_gids[cols] == src_gids[rows]
+        autapse_idxs = pair_idxs[is_autapse]
+        keep &= ~is_autapse
+        # the pairs are numbered without the autapses
+        pair_idxs = pair_idxs - np.searchsorted(autapse_idxs, pair_idxs)
+        n_all_connections -= len(autapse_idxs)
+    if probability != 1.0:
+        new_connections = np.sort(_draw_connections(n_all_connections,
+                                                    probability, conn_seed))
+        keep &= np.isin(pair_idxs, new_connections, assume_unique=True)
+    rows, cols = rows[keep], cols[keep]
+
     # Remove src_gids with no targets
-    for src_gid in remove_srcs:
-        conn['gid_pairs'].pop(src_gid)
+    n_src_targets = np.bincount(rows, minlength=len(src_gids))
+    indptr = np.zeros(np.count_nonzero(n_src_targets) + 1, dtype=int)
+    indptr[1:] = np.cumsum(n_src_targets[n_src_targets > 0])
+    return _GidPairs(src_gids[n_src_targets > 0], indptr, target_gids[cols])
+
+
+def _connection_distance_cutoff(conn, gid_pos, max_distance):
+    """Remove the connections between cells that are far apart.
+
+    Parameters
+    ----------
+    conn : Instance of _Connectivity object
+        Object specifying the biophysical parameters and src target pairs
+        of a specific connection class. Function modifies conn in place.
+    gid_pos : array, shape (n_gids, 3)
+        The position of each gid of the network.
+    max_distance : float
+        The distance in the xy plane beyond which src-target pairs are
+        removed.
+
+    Notes
+    -----
+    The pairs within max_distance are found with a KD-tree over the target
+    positions. If all sources have the same targets, _get_near_gid_pairs
+    creates these pairs without creating the others first.
+    """
+    from scipy.spatial import cKDTree
+
+    gid_pairs = conn['gid_pairs']
+    src_gids, target_gids = gid_pairs.src_gids, np.unique(gid_pairs.indices)
+    if len(target_gids) == 0:
+        return
+
+    target_tree = cKDTree(gid_pos[target_gids, :2])
+    neighbors = target_tree.query_ball_point(gid_pos[src_gids, :2],
+                                             r=max_distance)
+    n_neighbors = [len(src_neighbors) for src_neighbors in neighbors]
+    near_rows = np.repeat(np.arange(len(src_gids)), n_neighbors)
+    near_targets = target_gids[np.fromiter(
+        it.chain.from_iterable(neighbors), dtype=int,
+        count=sum(n_neighbors))]
+
+    # keep the pairs found in the tree, identified by (row, target gid)
+    n_keys = len(gid_pos)
+    pair_rows = np.repeat(np.arange(len(src_gids)), np.diff(gid_pairs.indptr))
+    keep = np.isin(pair_rows * n_keys + gid_pairs.indices,
+                   near_rows * n_keys + near_targets)
+    conn['gid_pairs'] = gid_pairs._select(keep, drop_empty=True)
+
+
+def _get_indexed_fields(conn):
+    """Copy the fields of a connection looked up by pick_connection."""
+    return (list(conn['src_gids']), list(conn['target_gids']), conn['loc'],
+            conn['receptor'])
 
 
 def pick_connection(net, src_gids=None, target_gids=None,
@@ -224,37 +378,15 @@ def pick_connection(net, src_gids=None, target_gids=None,
     loc = _string_input_to_list(loc, valid_loc, 'loc')
     receptor = _string_input_to_list(receptor, valid_receptor, 'receptor')
 
-    # Create lookup dictionaries
-    src_dict, target_dict = dict(), dict()
-    loc_dict, receptor_dict = dict(), dict()
-    for conn_idx, conn in enumerate(net.connectivity):
-        # Store connections matching each src_gid
-        for src_gid in conn['src_gids']:
-            if src_gid in src_dict:
-                src_dict[src_gid].append(conn_idx)
-            else:
-                src_dict[src_gid] = [conn_idx]
-        # Store connections matching each target_gid
-        for target_gid in conn['target_gids']:
-            if target_gid in target_dict:
-                target_dict[target_gid].append(conn_idx)
-            else:
-                target_dict[target_gid] = [conn_idx]
-        # Store connections matching each location
-        if conn['loc'] in loc_dict:
-            loc_dict[conn['loc']].append(conn_idx)
-        else:
-            loc_dict[conn['loc']] = [conn_idx]
-        # Store connections matching each receptor
-        if conn['receptor'] in receptor_dict:
-            receptor_dict[conn['receptor']].append(conn_idx)
-        else:
-            receptor_dict[conn['receptor']] = [conn_idx]
+    # Lookup dictionaries maintained by the Network
+    conn_index = net._get_connection_index()
 
     # Look up conn indeces that match search terms and add to set.
     conn_set = set()
-    search_pairs = [(src_gids, src_dict), (target_gids, target_dict),
-                    (loc, loc_dict), (receptor, receptor_dict)]
+    search_pairs = [(src_gids, conn_index['src_gids']),
+                    (target_gids, conn_index['target_gids']),
+                    (loc, conn_index['loc']),
+                    (receptor, conn_index['receptor'])]
     for search_terms, search_dict in search_pairs:
         inner_set = set()
         # Union of indices which match inputs for single parameter
@@ -348,6 +480,7 @@ class Network(object):
         # attached to a Network during simulation---Network is the natural
         # place to keep this information
         self.gid_ranges = dict()
+        self._gid_bounds = _get_gid_bounds(self.gid_ranges)
         self._n_gids = 0  # utility: keep track of last GID
 
         # XXX this can be removed once tests are made independent of HNN GUI
@@ -369,11 +502,27 @@ class Network(object):
 
         # network connectivity
         self.connectivity = list()
+        self._reindex_connectivity()
         self.threshold = self._params['threshold']
         self.delay = 1.0
 
         # extracellular recordings (if applicable)
         self.rec_arrays = dict()
+        # the RecordingPlan passed to simulate_dipole (if any)
+        self._recording_plan = None
+        # how to create the drive events of each trial in the workers, if
+        # they are not instantiated upfront (see _instantiate_drives)
+        self._lazy_drive_events = None
+        # whether the drive events are delivered by one PatternStim per
+        # process instead of the VecStims of the drive cells
+        self._pattern_stim = False
+        # the states of the cell types to start trials from, after a burn-in
+        # (see simulate_dipole)
+        self._steady_states = None
+        self._burn_in = None
+        # how often and where to save checkpoints of the trials to resume
+        # them from (see simulate_dipole)
+        self._checkpoint = None
 
         # contents of pos_dict determines all downstream inferences of
         # cell counts, real and artificial
@@ -568,7 +717,7 @@ class Network(object):
         drive['event_seed'] = event_seed
         drive['conn_seed'] = conn_seed
         drive['dynamics'] = dict(mu=mu, sigma=sigma, numspikes=numspikes)
-        drive['events'] = list()
+        drive['events'] = _DriveEvents()
 
         self._attach_drive(name, drive, weights_ampa, weights_nmda, location,
                            space_constant, synaptic_delays,
@@ -677,7 +826,7 @@ class Network(object):
         drive['conn_seed'] = conn_seed
         drive['dynamics'] = dict(tstart=tstart, tstop=tstop,
                                  rate_constant=rate_constant)
-        drive['events'] = list()
+        drive['events'] = _DriveEvents()
 
         self._attach_drive(name, drive, weights_ampa, weights_nmda, location,
                            space_constant, synaptic_delays,
@@ -783,12 +932,125 @@ class Network(object):
                                  tstart_std=tstart_std, tstop=tstop,
                                  burst_rate=burst_rate, burst_std=burst_std,
                                  numspikes=numspikes, spike_isi=spike_isi)
-        drive['events'] = list()
+        drive['events'] = _DriveEvents()
 
         self._attach_drive(name, drive, weights_ampa, weights_nmda, location,
                            space_constant, synaptic_delays,
                            n_drive_cells, cell_specific, probability)
 
+    def add_replay_drive(self, name, cell_response, *, location,
+                         cell_types=None, weights_ampa=None,
+                         weights_nmda=None, synaptic_delays=0.1,
+                         space_constant=100., probability=1.0, conn_seed=3):
+        """Add an external drive replaying recorded spikes
+
+        Each drive cell replays the spikes of one cell of a recorded
+        CellResponse, e.g., of a previous simulation: trial ``trial_idx`` of
+        the simulation replays the spikes of trial ``trial_idx`` of the
+        recording.
+
+        Parameters
+        ----------
+        name : str
+            Unique name for the drive
+        cell_response : instance of CellResponse
+            The recorded spikes, with as many trials as will be simulated or
+            more.
+        location : str
+            Target location of synapses. Must be an element of
+            `Cell.sect_loc` such as 'proximal' or 'distal', which defines a
+            group of sections, or an existing section such as 'soma' or
+            'apical_tuft' (defined in `Cell.sections` for all targeted cells).
+            The parameter `legacy_mode` of the `Network` must be set to `False`
+            to target specific sections.
+        cell_types : str | list of str | None
+            The types of the recorded cells whose spikes are replayed. If None
+            (default), the spikes of all recorded cells are replayed.
+        weights_ampa : dict or None
+            Synaptic weights (in uS) of AMPA receptors on each targeted cell
+            type (dict keys). Cell types omitted from the dict are set to zero.
+        weights_nmda : dict or None
+            Synaptic weights (in uS) of NMDA receptors on each targeted cell
+            type (dict keys). Cell types omitted from the dict are set to zero.
+        synaptic_delays : dict or float
+            Synaptic delay (in ms) at the column origin, dispersed laterally as
+            a function of the space_constant. If float, applies to all target
+            cell types. Use dict to create delay->cell mapping.
+        space_constant : float
+            Describes lateral dispersion (from the column origin) of synaptic
+            weights and delays within the simulated column. The constant is
+            measured in the units of ``inplane_distance`` of
+            :class:`~hnn_core.Network`. For example, for ``space_constant=3``,
+            the weights and delays are modulated by the factor
+            ``exp(-(x / (3 * inplane_distance)) ** 2)``, where ``x`` is the
+            physical distance (in um) between the connected cells in the xy
+            plane.
+        probability : dict or float (default: 1.0)
+            Probability of connection between any src-target pair.
+            Use dict to create probability->cell mapping. If float, applies to
+            all target cell types.
+        conn_seed : int
+            Optional initial seed for random number generator (default: 3).
+            Used to randomly remove connections when probablity < 1.0.
+
+        Notes
+        -----
+        The drive has a drive cell for each recorded cell of ``cell_types``
+        that spiked in any trial, connected to all target cells. Recorded
+        spikes outside of the simulated time interval are not replayed.
+        """
+        from .cell_response import CellResponse
+
+        _validate_type(cell_response, CellResponse, 'cell_response')
+        n_trials = len(cell_response.spike_times)
+        recorded_types = set(it.chain.from_iterable(
+            cell_response.spike_types))
+        if cell_types is None:
+            cell_types = sorted(recorded_types)
+        cell_types = _string_input_to_list(cell_types, recorded_types,
+                                           'cell_types')
+        if n_trials == 0:
+            raise ValueError('cell_response must contain at least one trial')
+
+        trials = list()
+        for trial_idx in range(n_trials):
+            spike_times = np.array(cell_response.spike_times[trial_idx],
+                                   dtype=float)
+            spike_gids = np.array(cell_response.spike_gids[trial_idx],
+                                  dtype=int)
+            is_replayed = np.isin(cell_response.spike_types[trial_idx],
+                                  cell_types)
+            trials.append((spike_times[is_replayed],
+                           spike_gids[is_replayed]))
+        gids = np.unique(np.concatenate([trial[1] for trial in trials]))
+        if len(gids) == 0:
+            raise ValueError(f'No spikes of {cell_types} to replay in '
+                             'cell_response')
+
+        # one event train per recorded cell, sorted by gid and time
+        drive_events = list()
+        for spike_times, spike_gids in trials:
+            train_idxs = np.searchsorted(gids, spike_gids)
+            order = np.lexsort((spike_times, train_idxs))
+            drive_events.append((spike_times[order],
+                                 np.bincount(train_idxs,
+                                             minlength=len(gids))))
+
+        drive = _NetworkDrive()
+        drive['type'] = 'replay'
+        drive['location'] = location
+        drive['n_drive_cells'] = len(gids)
+        drive['event_seed'] = None
+        drive['conn_seed'] = conn_seed
+        drive['dynamics'] = dict(cell_types=cell_types, gids=gids,
+                                 events=_DriveEvents.from_trials(
+                                     drive_events))
+        drive['events'] = _DriveEvents()
+
+        self._attach_drive(name, drive, weights_ampa, weights_nmda, location,
+                           space_constant, synaptic_delays,
+                           len(gids), False, probability)
+
     def _attach_drive(self, name, drive, weights_ampa, weights_nmda, location,
                       space_constant, synaptic_delays, n_drive_cells,
                       cell_specific, probability):
@@ -932,6 +1194,10 @@ class Network(object):
             target_gids = list(self.gid_ranges[target_cell_type])
             delays = delays_by_type[target_cell_type]
             probability = probability_by_type[target_cell_type]
+            if probability != 1.0:
+                _check_connection_probability(probability)
+            # the connections of all receptors are pruned below, in one call
+            conn_start = len(self.connectivity)
             if cell_specific:
                 target_gids_nested = [[target_gid] for
                                       target_gid in target_gids]
@@ -945,9 +1211,7 @@ class Network(object):
                     self.add_connection(
                         src_gids=src_gids, target_gids=target_gids_nested,
                         loc=location, receptor=receptor, weight=weights,
-                        delay=delays, lamtha=space_constant,
-                        probability=probability,
-                        conn_seed=drive['conn_seed'] + seed_increment)
+                        delay=delays, lamtha=space_constant)
                     # Ensure that AMPA/NMDA connections target the same gids
                     if receptor_idx > 0:
                         self.connectivity[-1]['src_gids'] = \
@@ -960,27 +1224,41 @@ class Network(object):
                     self.add_connection(
                         src_gids=name, target_gids=target_gids, loc=location,
                         receptor=receptor, weight=weights, delay=delays,
-                        lamtha=space_constant, probability=probability,
-                        conn_seed=drive['conn_seed'] + seed_increment)
+                        lamtha=space_constant)
                     # Ensure that AMPA/NMDA connections target the same gids
                     # when probability < 1
                     if receptor_idx > 0:
                         self.connectivity[-1]['src_gids'] = \
                             self.connectivity[-2]['src_gids']
 
+            # the connections of the receptors have the same pairs, so the
+            # pairs they keep are drawn once (see _connection_probability)
+            conns = self.connectivity[conn_start:]
+            if probability != 1.0:
+                _connection_probability(
+                    conns, probability,
+                    conn_seed=drive['conn_seed'] + seed_increment)
+            for conn in conns:
+                conn['probability'] = probability
+
             seed_increment += 1
 
+        # the src_gids of the connections were replaced after indexing
+        self._reindex_connectivity()
+
     def _reset_drives(self):
         # reset every time called again, e.g., from dipole.py or in self.copy()
         for drive_name in self.external_drives.keys():
-            self.external_drives[drive_name]['events'] = list()
+            self.external_drives[drive_name]['events'] = _DriveEvents()
+        self._lazy_drive_events = None
 
     def _reset_rec_arrays(self):
         # clear the data in rec_arrays
         for arr in self.rec_arrays.values():
             arr._reset()
 
-    def _instantiate_drives(self, tstop, n_trials=1):
+    def _instantiate_drives(self, tstop, n_trials=1, event_rng='legacy',
+                            lazy=False):
         """Creates drive_event_times vectors for all drives and all trials
 
         Parameters
@@ -989,52 +1267,128 @@ class Network(object):
             The simulation stop time (ms)
         n_trials : int
             Number of trials to create events for (default: 1)
+        event_rng : 'legacy' | 'philox'
+            The random number generator of the event times (see
+            simulate_dipole). Default: 'legacy'.
+        lazy : bool
+            If True, the events are not created here but by NetworkBuilder,
+            for the trial it simulates and the drive cells it builds (see
+            _get_drive_events). Default: False.
 
         NB this must be a separate method because dipole.py:simulate_dipole
         accepts an n_trials-argument, which overrides the N_trials-parameter
         used at intialisation time. The good news is that only the event_times
         need to be recalculated, all the GIDs etc remain the same.
         """
+        _check_option('event_rng', event_rng, ['legacy', 'philox'])
+        for drive in self.external_drives.values():
+            if (drive['type'] == 'replay' and
+                    n_trials > len(drive['dynamics']['events'])):
+                raise ValueError(
+                    f"Cannot simulate {n_trials} trials with the replay "
+                    f"drive {drive['name']} of "
+                    f"{len(drive['dynamics']['events'])} recorded trials")
         self._reset_drives()
+        if lazy:
+            self._lazy_drive_events = dict(tstop=tstop, n_trials=n_trials,
+                                           event_rng=event_rng)
+            return
+
+        for drive in self.external_drives.values():
+            trains = self._get_drive_trains(drive['name'])
+            # each trial needs unique event time vectors
+            # 'events': behaves like a nested list (n_trials x n_drive_cells x
+            # n_events)
+            drive['events'] = _DriveEvents.from_trials([
+                self._get_drive_events(drive['name'], trains, trial_idx,
+                                       tstop=tstop, event_rng=event_rng)
+                for trial_idx in range(n_trials)])
+
+    def _get_drive_trains(self, drive_name):
+        """Get the event trains of a drive.
 
-        # each trial needs unique event time vectors
-        for trial_idx in range(n_trials):
-            for drive in self.external_drives.values():
-                event_times = list()  # new list for each trial and drive
-                for drive_cell_gid in self.gid_ranges[drive['name']]:
-                    drive_cell_gid_offset = (drive_cell_gid -
-                                             self.gid_ranges[drive['name']][0])
-                    if drive['cell_specific']:
-                        # loop over drives (one for each target cell
-                        # population) and create event times
-                        conn_idxs = pick_connection(self,
-                                                    src_gids=drive_cell_gid)
-                        target_types = set([self.connectivity[conn_idx]
-                                            ['target_type'] for conn_idx in
-                                            conn_idxs])
-                        for target_type in target_types:
-                            event_times.append(_drive_cell_event_times(
-                                drive['type'],
-                                drive['dynamics'],
-                                target_type=target_type,
-                                trial_idx=trial_idx,
-                                drive_cell_gid=drive_cell_gid_offset,
-                                event_seed=drive['event_seed'],
-                                tstop=tstop)
-                            )
-                    else:
-                        src_event_times = _drive_cell_event_times(
-                            drive['type'],
-                            drive['dynamics'],
-                            tstop=tstop,
-                            target_type='any',
-                            trial_idx=trial_idx,
-                            drive_cell_gid=drive_cell_gid_offset,
-                            event_seed=drive['event_seed'])
-                        event_times.append(src_event_times)
-                # 'events': nested list (n_trials x n_drive_cells x n_events)
-                self.external_drives[
-                    drive['name']]['events'].append(event_times)
+        Parameters
+        ----------
+        drive_name : str
+            The name of the drive.
+
+        Returns
+        -------
+        trains : list of tuple
+            The gid of the drive cell, relative to the first drive cell, and
+            the target cell type of each event train. There is one event train
+            for each drive cell, or for each drive cell and target population
+            if the drive is cell specific, whose target type is 'any'
+            otherwise.
+        """
+        drive = self.external_drives[drive_name]
+        trains = list()
+        for drive_cell_gid in self.gid_ranges[drive_name]:
+            drive_cell_gid_offset = (drive_cell_gid -
+                                     self.gid_ranges[drive_name][0])
+            if drive['cell_specific']:
+                conn_idxs = pick_connection(self, src_gids=drive_cell_gid)
+                target_types = set([self.connectivity[conn_idx]
+                                    ['target_type'] for conn_idx in
+                                    conn_idxs])
+                for target_type in target_types:
+                    trains.append((drive_cell_gid_offset, target_type))
+            else:
+                trains.append((drive_cell_gid_offset, 'any'))
+        return trains
+
+    def _get_drive_events(self, drive_name, trains, trial_idx, tstop,
+                          event_rng='legacy'):
+        """Create the event times of event trains of a drive for one trial.
+
+        Parameters
+        ----------
+        drive_name : str
+            The name of the drive.
+        trains : list of tuple
+            The event trains (see _get_drive_trains), e.g., only those of the
+            drive cells simulated by an MPI process.
+        trial_idx : int
+            The index of the trial.
+        tstop : float
+            The simulation stop time (ms)
+        event_rng : 'legacy' | 'philox'
+            The random number generator of the event times. Default: 'legacy'.
+
+        Returns
+        -------
+        values : array of float, shape (n_events,)
+            The event times of all event trains, one train after the other.
+        n_events : array of int, shape (n_trains,)
+            The number of events of each event train.
+        """
+        drive = self.external_drives[drive_name]
+        if drive['type'] == 'replay':
+            recorded_events = drive['dynamics']['events']
+            event_times = list()
+            for drive_cell_gid_offset, _ in trains:
+                times = recorded_events._get_train(trial_idx,
+                                                   drive_cell_gid_offset)
+                event_times.append(times[(times > 0) & (times <= tstop)])
+            return _flatten_event_times(event_times)
+        if event_rng == 'philox':
+            return _drive_events_philox(
+                drive['type'],
+                drive['dynamics'],
+                tstop=tstop,
+                target_types=[train[1] for train in trains],
+                drive_cell_gids=[train[0] for train in trains],
+                trial_idxs=np.full(len(trains), trial_idx),
+                event_seed=drive['event_seed'])
+        return _flatten_event_times([_drive_cell_event_times(
+            drive['type'],
+            drive['dynamics'],
+            tstop=tstop,
+            target_type=target_type,
+            trial_idx=trial_idx,
+            drive_cell_gid=drive_cell_gid_offset,
+            event_seed=drive['event_seed'])
+            for drive_cell_gid_offset, target_type in trains])
 
     def add_tonic_bias(self, *, cell_type=None, amplitude=None,
                        t0=None, tstop=None):
@@ -1078,6 +1432,7 @@ class Network(object):
         ll = self._n_gids
         self._n_gids += len(pos)
         self.gid_ranges[cell_name] = range(ll, self._n_gids)
+        self._gid_bounds = _get_gid_bounds(self.gid_ranges)
 
         self.pos_dict[cell_name] = pos
         if cell_template is not None:
@@ -1086,11 +1441,12 @@ class Network(object):
 
     def gid_to_type(self, gid):
         """Reverse lookup of gid to type."""
-        return _gid_to_type(gid, self.gid_ranges)
+        return _gid_to_type(gid, self.gid_ranges, self._gid_bounds)
 
     def add_connection(self, src_gids, target_gids, loc, receptor,
                        weight, delay, lamtha, allow_autapses=True,
-                       probability=1.0, conn_seed=None):
+                       probability=1.0, conn_seed=None,
+                       distance_cutoff=None):
         """Appends connections to connectivity list
 
         Parameters
@@ -1129,13 +1485,25 @@ class Network(object):
         conn_seed : int
             Optional initial seed for random number generator (default: None).
             Used to randomly remove connections when probablity < 1.0.
+        distance_cutoff : float | None
+            If not None, src-target pairs further apart than
+            ``distance_cutoff * lamtha`` in the xy plane (scaled by the
+            in-plane distance between cells, as for the decay of weight and
+            delay) are not connected. The dropped connections have weights
+            below ``weight * exp(-distance_cutoff ** 2)``, e.g., about 1e-4 of
+            ``weight`` for distance_cutoff=3. The cutoff is applied after
+            connections are removed for probability < 1.0, so that the
+            remaining pairs do not depend on it. If all src gids have the
+            same targets, only the pairs within the cutoff are created.
+            Default: None.
 
         Notes
         -----
         Connections are stored in ``net.connectivity[idx]['gid_pairs']``, a
-        dictionary indexed by src gids with the format:
+        read-only dictionary-like object indexed by src gids with the format:
         {src_gid: [target_gids, ...], ...} where each src_gid indexes a list of
-        all its targets.
+        all its targets. The pairs are stored as arrays in compressed sparse
+        row (CSR) format, see ``gid_pairs.indptr`` and ``gid_pairs.indices``.
         """
         conn = _Connectivity()
         threshold = self.threshold
@@ -1149,39 +1517,56 @@ class Network(object):
         src_gids = _check_gids(src_gids, self.gid_ranges,
                                valid_source_cells, 'src_gids')
 
-        # Convert target_gids to list of list, one element for each src_gid
+        _validate_type(distance_cutoff, (int, float, None), 'distance_cutoff',
+                       'int, float, or None')
+        if distance_cutoff is not None and distance_cutoff <= 0:
+            raise ValueError('distance_cutoff must be positive, got '
+                             f'{distance_cutoff}')
+
+        # Convert target_gids to list of list, one element for each src_gid.
+        # If all src_gids have the same targets, the elements are the same
+        # list.
         valid_target_cells = list(self.cell_types.keys())
+        all_target_gids = None
         if isinstance(target_gids, int):
-            target_gids = [[target_gids] for _ in range(len(src_gids))]
+            all_target_gids = [target_gids]
         elif isinstance(target_gids, str):
             _check_option('target_gids', target_gids, valid_target_cells)
-            target_gids = [list(self.gid_ranges[_long_name(target_gids)])
-                           for _ in range(len(src_gids))]
+            all_target_gids = list(self.gid_ranges[_long_name(target_gids)])
         elif isinstance(target_gids, range):
-            target_gids = [list(target_gids) for _ in range(len(src_gids))]
+            all_target_gids = list(target_gids)
         elif isinstance(target_gids, list) and all(isinstance(t_gid, int)
                                                    for t_gid in target_gids):
-            target_gids = [target_gids for _ in range(len(src_gids))]
+            all_target_gids = target_gids
+        if all_target_gids is not None:
+            target_gids = [all_target_gids for _ in range(len(src_gids))]
 
         # Validate each target list - src pairs.
         # set() used to avoid redundant checks.
         target_set = set()
+        target_list_ids = set()
         for target_src_pair in target_gids:
             _validate_type(target_src_pair, list, 'target_gids[idx]',
                            'list or range')
+            if id(target_src_pair) in target_list_ids:
+                continue
+            target_list_ids.add(id(target_src_pair))
             for target_gid in target_src_pair:
                 target_set.add(target_gid)
         target_type = self.gid_to_type(target_gids[0][0])
         for target_gid in target_set:
-            _validate_type(target_gid, int, 'target_gid', 'int')
-            # Ensure gids in range of Network.gid_ranges
-            gid_type = self.gid_to_type(target_gid)
-            if gid_type is None:
-                raise AssertionError(
-                    f'target_gid {target_gid}''not in net.gid_ranges')
-            elif gid_type != target_type:
-                raise AssertionError(
-                    'All target_gids must be of the same type')
+            if not isinstance(target_gid, int):
+                _validate_type(target_gid, int, 'target_gid', 'int')
+        # Ensure gids in range of Network.gid_ranges
+        target_arr = np.fromiter(target_set, dtype=int, count=len(target_set))
+        type_idxs = _gids_to_type_idx(target_arr, self._gid_bounds)
+        if np.any(type_idxs < 0):
+            target_gid = target_arr[np.flatnonzero(type_idxs < 0)[0]]
+            raise AssertionError(
+                f'target_gid {target_gid}''not in net.gid_ranges')
+        elif np.any(type_idxs != type_idxs[0]):
+            raise AssertionError(
+                'All target_gids must be of the same type')
         conn['target_type'] = target_type
         conn['target_gids'] = list(target_set)
         conn['num_targets'] = len(target_set)
@@ -1189,13 +1574,29 @@ class Network(object):
         if len(target_gids) != len(src_gids):
             raise AssertionError('target_gids must have a list for each src.')
 
-        # Format gid_pairs and add to conn dictionary
-        gid_pairs = dict()
-        for src_gid, target_src_pair in zip(src_gids, target_gids):
+        # Format gid_pairs and add to conn dictionary. As for a dict, the
+        # last target list of a repeated src_gid is kept
+        src_rows = {src_gid: idx for idx, src_gid in enumerate(src_gids)}
+        if distance_cutoff is not None:
+            gid_pos = np.zeros((self._n_gids, 3))
+            for gid_type, gid_range in self.gid_ranges.items():
+                gid_pos[gid_range] = self.pos_dict[gid_type]
+            max_distance = distance_cutoff * lamtha * self._inplane_distance
+        if distance_cutoff is not None and all_target_gids is not None:
+            # only the pairs within the cutoff are created
+            if probability != 1.0:
+                _check_connection_probability(probability)
+            gid_pairs = _get_near_gid_pairs(
+                list(src_rows.keys()), all_target_gids, gid_pos,
+                max_distance, allow_autapses=allow_autapses,
+                probability=probability, conn_seed=conn_seed)
+        else:
+            gid_pairs = _GidPairs.from_lists(
+                list(src_rows.keys()),
+                [target_gids[idx] for idx in src_rows.values()])
             if not allow_autapses:
-                mask = np.in1d(target_src_pair, src_gid, invert=True)
-                target_src_pair = np.array(target_src_pair)[mask].tolist()
-            gid_pairs[src_gid] = target_src_pair
+                gid_pairs = gid_pairs._select(
+                    gid_pairs.indices != gid_pairs._pair_src_gids())
 
         conn['src_type'] = self.gid_to_type(src_gids[0])
         conn['src_gids'] = list(set(src_gids))
@@ -1245,13 +1646,21 @@ class Network(object):
             _validate_type(item, (int, float), arg_name, 'int or float')
             conn['nc_dict'][key] = item
 
-        # Probabilistically define connections
-        if probability != 1.0:
-            _connection_probability(conn, probability, conn_seed)
+        if distance_cutoff is None or all_target_gids is None:
+            # Probabilistically define connections
+            if probability != 1.0:
+                _connection_probability(conn, probability, conn_seed)
+
+            # Remove connections between distant cells
+            if distance_cutoff is not None:
+                _connection_distance_cutoff(conn, gid_pos, max_distance)
 
         conn['probability'] = probability
+        conn['distance_cutoff'] = distance_cutoff
 
-        self.connectivity.append(deepcopy(conn))
+        conn_index = self._get_connection_index()
+        self.connectivity.append(conn)
+        self._index_connection(len(self.connectivity) - 1, conn_index)
 
     def clear_connectivity(self):
         """Remove all connections defined in Network.connectivity
@@ -1261,6 +1670,7 @@ class Network(object):
             if conn['src_type'] in self.external_drives.keys():
                 connectivity.append(conn)
         self.connectivity = connectivity
+        self._reindex_connectivity()
 
     def clear_drives(self):
         """Remove all drives defined in Network.connectivity"""
@@ -1270,6 +1680,62 @@ class Network(object):
                 connectivity.append(conn)
         self.external_drives = dict()
         self.connectivity = connectivity
+        self._reindex_connectivity()
+
+    def _index_connection(self, conn_idx, conn_index):
+        """Add a connection to the lookup dictionaries of pick_connection.
+
+        Parameters
+        ----------
+        conn_idx : int
+            Index of the connection in Network.connectivity.
+        conn_index : dict
+            The lookup dictionaries, see Network._get_connection_index().
+        """
+        conn = self.connectivity[conn_idx]
+        for key in ('src_gids', 'target_gids'):
+            for gid in conn[key]:
+                conn_index[key].setdefault(gid, list()).append(conn_idx)
+        for key in ('loc', 'receptor'):
+            conn_index[key].setdefault(conn[key], list()).append(conn_idx)
+        conn_index['conns'].append((conn, _get_indexed_fields(conn)))
+
+    def _reindex_connectivity(self):
+        """Rebuild the lookup dictionaries from Network.connectivity."""
+        self._conn_index = {'src_gids': dict(), 'target_gids': dict(),
+                            'loc': dict(), 'receptor': dict(),
+                            'connectivity': self.connectivity,
+                            'conns': list()}
+        for conn_idx in range(len(self.connectivity)):
+            self._index_connection(conn_idx, self._conn_index)
+
+    def _get_connection_index(self):
+        """Return the lookup dictionaries of pick_connection.
+
+        Returns
+        -------
+        conn_index : dict
+            Maps each of 'src_gids', 'target_gids', 'loc' and 'receptor' to
+            a dict from values to the indices of the connections in
+            Network.connectivity that hold them.
+
+        Notes
+        -----
+        The dictionaries are updated by add_connection, clear_connectivity
+        and clear_drives. They are rebuilt if Network.connectivity has been
+        replaced or edited otherwise, i.e., if it does not hold the indexed
+        connections in the same order, or if the indexed fields of a
+        connection were changed in place.
+        """
+        conns = self._conn_index['conns']
+        if (self._conn_index['connectivity'] is not self.connectivity or
+                len(conns) != len(self.connectivity) or
+                any(conn is not indexed_conn or
+                    _get_indexed_fields(conn) != indexed_fields for
+                    conn, (indexed_conn, indexed_fields) in
+                    zip(self.connectivity, conns))):
+            self._reindex_connectivity()
+        return self._conn_index
 
     def add_electrode_array(self, name, electrode_pos, *, conductivity=0.3,
                             method='psa', min_distance=0.5):
@@ -1340,8 +1806,8 @@ class _Connectivity(dict):
         Cell type of source gids.
     target_type : str
         Cell type of target gids.
-    gid_pairs : dict
-        dict indexed by src gids with the format:
+    gid_pairs : instance of _GidPairs
+        Read-only dict-like object indexed by src gids with the format:
         {src_gid: [target_gids, ...], ...}
         where each src_gid indexes a list of all its targets.
     num_srcs : int
@@ -1372,6 +1838,9 @@ class _Connectivity(dict):
     probability : float
         Probability of connection between any src-target pair.
         Defaults to 1.0 producing an all-to-all pattern.
+    distance_cutoff : float | None
+        Distance in multiples of lamtha beyond which src-target pairs are
+        not connected, or None if all pairs are kept.
 
     Notes
     -----
@@ -1393,6 +1862,248 @@ class _Connectivity(dict):
         return entr
 
 
+class _GidPairs(Mapping):
+    """Source and target gids of a connection in CSR format.
+
+    Instances behave like a read-only dict of the format:
+    {src_gid: [target_gids, ...], ...}, where the target gids of a source gid
+    are a read-only view of indices.
+
+    Parameters
+    ----------
+    src_gids : array of int, shape (n_srcs,)
+        The source gids, in order.
+    indptr : array of int, shape (n_srcs + 1,)
+        The targets of src_gids[idx] are indices[indptr[idx]:indptr[idx + 1]].
+    indices : array of int, shape (n_pairs,)
+        The target gids of all src-target pairs.
+    weights : array of float, shape (n_pairs,) | None
+        Synaptic weight of each pair. If None (default), the weights are
+        computed from the nc_dict of the connection.
+    delays : array of float, shape (n_pairs,) | None
+        Synaptic delay of each pair (in ms). If None (default), the delays are
+        computed from the nc_dict of the connection.
+    """
+
+    def __init__(self, src_gids, indptr, indices, weights=None,
+                 delays=None):
+        self.src_gids = np.asarray(src_gids, dtype=int)
+        self.indptr = np.asarray(indptr, dtype=int)
+        self.indices = np.asarray(indices, dtype=int)
+        self.weights = weights
+        self.delays = delays
+        self._rows = {src_gid: row for row, src_gid in
+                      enumerate(self.src_gids.tolist())}
+
+    @property
+    def weights(self):
+        return self._weights
+
+    @weights.setter
+    def weights(self, weights):
+        self._weights = self._check_pair_values(weights, 'weights')
+
+    @property
+    def delays(self):
+        return self._delays
+
+    @delays.setter
+    def delays(self, delays):
+        self._delays = self._check_pair_values(delays, 'delays')
+
+    def _check_pair_values(self, values, name):
+        """Convert values of each pair to an array and check its shape."""
+        if values is None:
+            return None
+        values = np.asarray(values, dtype=float)
+        if values.shape != self.indices.shape:
+            raise ValueError(f'{name} must have one value for each of the '
+                             f'{len(self.indices)} src-target pairs, got '
+                             f'shape {values.shape}')
+        return values
+
+    @classmethod
+    def from_lists(cls, src_gids, target_gids):
+        """Create from a list of target gids for each source gid."""
+        n_targets = [len(target_src_pair) for target_src_pair in target_gids]
+        indptr = np.zeros(len(n_targets) + 1, dtype=int)
+        indptr[1:] = np.cumsum(n_targets)
+        indices = np.fromiter(it.chain.from_iterable(target_gids),
+                              dtype=int, count=indptr[-1])
+        return cls(src_gids, indptr, indices)
+
+    def __getitem__(self, src_gid):
+        row = self._rows[src_gid]
+        target_gids = self.indices[self.indptr[row]:self.indptr[row + 1]]
+        target_gids.flags.writeable = False
+        return target_gids
+
+    def __contains__(self, src_gid):
+        return src_gid in self._rows
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __len__(self):
+        return len(self.src_gids)
+
+    def __eq__(self, other):
+        if isinstance(other, _GidPairs):
+            other = other._to_dict()
+        elif not isinstance(other, Mapping):
+            return NotImplemented
+        return self._to_dict() == dict(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self._to_dict())
+
+    def _to_dict(self):
+        """The pairs as a dict of lists of target gids."""
+        return {src_gid: target_gids.tolist() for src_gid, target_gids in
+                self.items()}
+
+    def _pair_src_gids(self):
+        """Source gid of each pair, aligned with indices."""
+        return np.repeat(self.src_gids, np.diff(self.indptr))
+
+    def _select(self, mask, drop_empty=False):
+        """Return the pairs where mask is True.
+
+        Parameters
+        ----------
+        mask : array of bool, shape (n_pairs,)
+            Whether to keep each pair.
+        drop_empty : bool
+            If True, source gids left without targets are removed.
+
+        Returns
+        -------
+        gid_pairs : instance of _GidPairs
+            The selected pairs, in the same order.
+        """
+        rows = np.repeat(np.arange(len(self.src_gids)), np.diff(self.indptr))
+        n_targets = np.bincount(rows[mask], minlength=len(self.src_gids))
+        src_gids = self.src_gids
+        if drop_empty:
+            src_gids = src_gids[n_targets > 0]
+            n_targets = n_targets[n_targets > 0]
+        indptr = np.zeros(len(src_gids) + 1, dtype=int)
+        indptr[1:] = np.cumsum(n_targets)
+        weights = None if self.weights is None else self.weights[mask]
+        delays = None if self.delays is None else self.delays[mask]
+        return _GidPairs(src_gids, indptr, self.indices[mask],
+                         weights=weights, delays=delays)
+
+
+def _flatten_event_times(event_times):
+    """Concatenate event trains.
+
+    Parameters
+    ----------
+    event_times : list of list of float
+        The event times of each event train.
+
+    Returns
+    -------
+    values : array of float, shape (n_events,)
+        The event times of all event trains, one train after the other.
+    n_events : array of int, shape (n_trains,)
+        The number of events of each event train.
+    """
+    n_events = np.array([len(times) for times in event_times], dtype=int)
+    values = np.fromiter(it.chain.from_iterable(event_times), dtype=float,
+                         count=n_events.sum())
+    return values, n_events
+
+
+class _DriveEvents(Sequence):
+    """Event times of the event trains of a drive in ragged array format.
+
+    Instances behave like a read-only nested list of the format:
+    [[[event_time, ...], ...], ...], i.e., n_trials x n_trains x n_events,
+    with an event train for each drive cell (see Network._get_drive_trains).
+
+    Parameters
+    ----------
+    values : array of float, shape (n_events,)
+        The event times of all trials and event trains.
+    indptr : array of int, shape (n_trials * n_trains + 1,)
+        The event times of train idx of trial trial_idx are
+        values[indptr[row]:indptr[row + 1]], with
+        row = trial_idx * n_trains + idx.
+    n_trials : int
+        The number of trials.
+    """
+
+    def __init__(self, values=(), indptr=(0,), n_trials=0):
+        self.values = np.asarray(values, dtype=float)
+        self.indptr = np.asarray(indptr, dtype=int)
+        self.n_trials = n_trials
+        self.n_trains = 0
+        if n_trials > 0:
+            self.n_trains = (len(self.indptr) - 1) // n_trials
+
+    @classmethod
+    def from_trials(cls, trials):
+        """Create from the values and number of events of each trial.
+
+        Parameters
+        ----------
+        trials : list of tuple
+            The event times of all event trains and the number of events of
+            each event train of each trial (see _flatten_event_times).
+        """
+        indptr = np.zeros(sum(len(trial[1]) for trial in trials) + 1,
+                          dtype=int)
+        values = np.zeros(0)
+        if len(trials) > 0:
+            indptr[1:] = np.cumsum(np.concatenate([trial[1] for trial in
+                                                   trials]))
+            values = np.concatenate([trial[0] for trial in trials])
+        return cls(values, indptr, len(trials))
+
+    @classmethod
+    def from_lists(cls, event_times):
+        """Create from a nested list (n_trials x n_trains x n_events)."""
+        return cls.from_trials([_flatten_event_times(trial_event_times) for
+                                trial_event_times in event_times])
+
+    def _get_train(self, trial_idx, idx):
+        """Event times of a train of a trial, as a view of values."""
+        row = trial_idx * self.n_trains + idx
+        return self.values[self.indptr[row]:self.indptr[row + 1]]
+
+    def _n_events(self):
+        """Number of events of each train, shape (n_trials, n_trains)."""
+        return np.diff(self.indptr).reshape(self.n_trials, self.n_trains)
+
+    def __getitem__(self, trial_idx):
+        if isinstance(trial_idx, slice):
+            return [self[idx] for idx in range(self.n_trials)[trial_idx]]
+        if not -self.n_trials <= trial_idx < self.n_trials:
+            raise IndexError('trial index out of range')
+        trial_idx %= self.n_trials
+        return [self._get_train(trial_idx, idx).tolist() for idx in
+                range(self.n_trains)]
+
+    def __len__(self):
+        return self.n_trials
+
+    def __eq__(self, other):
+        if isinstance(other, _DriveEvents):
+            return (self.n_trials == other.n_trials and
+                    np.array_equal(self.indptr, other.indptr) and
+                    np.array_equal(self.values, other.values))
+        return list(self) == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(list(self))
+
+
 class _NetworkDrive(dict):
     """A class for containing the parameters of external drives
 
@@ -1407,7 +2118,7 @@ class _NetworkDrive(dict):
     location : str
         Target location of synapses ('distal' or 'proximal').
     type : str
-        Examples: 'evoked', 'gaussian', 'poisson', 'bursty'
+        Examples: 'evoked', 'gaussian', 'poisson', 'bursty', 'replay'
     events : list of lists
         List of spike time lists. First index is of length n_trials. Second
         index is over the 'artificial' cells associated with this drive.
@@ -1441,6 +2152,8 @@ class _NetworkDrive(dict):
             entr += f"\ncell-specific: {self['cell_specific']}"
             entr += "\ndynamic parameters:"
             for key, val in self['dynamics'].items():
+                if isinstance(val, _DriveEvents):
+                    val = f'{len(val)} recorded trials'
                 entr += f"\n\t{key}: {val}"
         if len(self['events']) > 0:
             plurl = 's' if len(self['events']) > 1 else ''
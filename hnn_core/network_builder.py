@@ -6,7 +6,10 @@
 
 import os
 import os.path as op
-from copy import deepcopy
+import hashlib
+import pickle
+import shutil
+from heapq import heapify, heappop, heappush
 
 import numpy as np
 from neuron import h
@@ -16,7 +19,8 @@ from neuron import __version__
 if int(__version__[0]) >= 8:
     h.nrnunit_use_legacy(1)
 
-from .cell import _ArtificialCell
+from .cell import (_ArtificialCell, _CellTemplate, _get_gaussian_connection,
+                   _get_nseg)
 from .params import _long_name, _short_name
 from .extracellular import _ExtracellularArrayBuilder
 from .network import pick_connection
@@ -25,6 +29,10 @@ from .network import pick_connection
 _PC = None
 _CVODE = None
 
+# the steady states of the cell types after a burn-in, keyed by the
+# configuration of the cells and the burn-in (see _get_steady_states)
+_STEADY_STATES = dict()
+
 # We need to maintain a reference to the last
 # NetworkBuilder instance that ran pc.gid_clear(). Even if
 # pc is global, if pc.gid_clear() is called within a new
@@ -32,15 +40,48 @@ _CVODE = None
 _LAST_NETWORK = None
 
 
-def _simulate_single_trial(net, tstop, dt, trial_idx):
+def _simulate_single_trial(net, tstop, dt, trial_idx, reuse_network=False,
+                           multisplit=False, n_threads=1):
     """Simulate one trial including building the network
 
     This is used by both backends. MPIBackend calls this in mpi_child.py, once
-    for each trial (blocking), and JoblibBackend calls this for each trial
-    (non-blocking)
+    for each trial (blocking), and JoblibBackend calls this for each block of
+    trials assigned to a job.
+
+    Parameters
+    ----------
+    net : Network object
+        The Network object specifying how cells are connected.
+    tstop : float
+        The simulation stop time (ms).
+    dt : float
+        The integration time step of h.CVode (ms)
+    trial_idx : int
+        Index number of the trial being simulated.
+    reuse_network : bool
+        If True and the NEURON model last built in this process was built from
+        ``net``, the model is kept and only the event times of the drives and
+        the recordings are reset for ``trial_idx``. Otherwise, the network is
+        built from scratch. Only trials of a single simulation should share
+        a build, as changes made to ``net`` afterwards are not picked up.
+        Default: False.
+    multisplit : bool
+        If True, pyramidal cells may be split across MPI ranks. See
+        NetworkBuilder. Default: False.
+    n_threads : int
+        The number of threads over which the cells of each process are
+        distributed. See NetworkBuilder. Default: 1.
     """
 
-    neuron_net = NetworkBuilder(net, trial_idx=trial_idx)
+    if (reuse_network and _LAST_NETWORK is not None and
+            _LAST_NETWORK.net is net and
+            _LAST_NETWORK._n_threads == n_threads):
+        neuron_net = _LAST_NETWORK
+        neuron_net._reset_trial(trial_idx)
+    else:
+        neuron_net = NetworkBuilder(net, trial_idx=trial_idx,
+                                    multisplit=multisplit,
+                                    n_threads=n_threads)
 
     global _PC, _CVODE
 
@@ -58,6 +99,20 @@ def _simulate_single_trial(net, tstop, dt, trial_idx):
     h.celsius = net._params['celsius']  # 37.0 - set temperature
 
     times = h.Vector().record(h._ref_t)
+    # the sections may be recorded at a lower rate and precision, i.e., at
+    # the multiples of plan.dt before tstop
+    plan = net._recording_plan
+    sec_dtype, sec_stride, n_sec_samples = np.float64, 1, None
+    if plan is not None:
+        sec_dtype = np.dtype(plan.dtype)
+        if plan.dt is not None:
+            n_sec_samples = int(np.ceil(tstop / plan.dt - 1e-6))
+            if neuron_net._n_threads > 1:
+                # each step was recorded (see NetworkBuilder._record_cell)
+                sec_stride = int(round(plan.dt / dt))
+
+    def _sec_to_numpy(vec):
+        return vec.as_numpy()[::sec_stride][:n_sec_samples].astype(sec_dtype)
 
     # sets the default max solver step in ms (purposefully large)
     _PC.set_maxstep(10)
@@ -65,40 +120,88 @@ def _simulate_single_trial(net, tstop, dt, trial_idx):
     # initialize cells to -65 mV, after all the NetCon
     # delays have been specified
     h.finitialize()
+    if net._steady_states is not None:
+        neuron_net._restore_steady_states()
+
+    # the trial continues from its latest checkpoint, if any
+    checkpoint = net._checkpoint
+    recordings = [times] + neuron_net._get_recordings()
+    is_resumed = False
+    if checkpoint is not None:
+        is_resumed = neuron_net._restore_checkpoint(checkpoint['dir'],
+                                                    recordings)
 
     def simulation_time():
         print(f'Trial {trial_idx + 1}: {round(h.t, 2)} ms...')
 
-    if rank == 0:
-        for tt in range(0, int(h.tstop), 10):
-            _CVODE.event(tt, simulation_time)
-
     h.fcurrent()
+    if net._steady_states is not None and not is_resumed:
+        # record the restored rather than the initialized states at t=0
+        h.frecord_init()
 
     # initialization complete, but wait for all procs to start the solver
     _PC.barrier()
 
-    # actual simulation - run the solver
-    _PC.psolve(h.tstop)
+    def run_solver(t_stop):
+        # the events printing the progress are scheduled until t_stop only,
+        # as their callbacks cannot be saved with a checkpoint
+        if rank == 0:
+            for tt in range(0, int(h.tstop), 10):
+                if h.t <= tt < t_stop - h.dt / 2:
+                    _CVODE.event(tt, simulation_time)
+
+        if neuron_net._step_extracellular:
+            # the extracellular potentials are gathered after each step
+            while h.t < t_stop - h.dt / 2:
+                _PC.psolve(h.t + h.dt)
+                for nrn_arr in neuron_net._nrn_rec_arrays.values():
+                    nrn_arr._gather_nrn_voltages()
+        elif h.t < t_stop - h.dt / 2:
+            _PC.psolve(t_stop)
+
+    # actual simulation - run the solver, saving checkpoints at the
+    # multiples of checkpoint['every'] and at tstop
+    if checkpoint is not None:
+        every = checkpoint['every']
+        if every is not None:
+            t_checkpoint = (np.floor(h.t / every + 1e-6) + 1) * every
+            while t_checkpoint < h.tstop - h.dt / 2:
+                run_solver(t_checkpoint)
+                neuron_net._save_checkpoint(checkpoint['dir'], recordings)
+                t_checkpoint += every
+        run_solver(h.tstop)
+        neuron_net._save_checkpoint(checkpoint['dir'], recordings)
+    else:
+        run_solver(h.tstop)
 
     _PC.barrier()
 
     # these calls aggregate data across procs/nodes
     neuron_net.aggregate_data(n_samples=times.size())
 
-    # now convert data from Neuron into Python
+    # now copy data from Neuron into contiguous NumPy arrays, which are
+    # pickled as raw buffers rather than element by element like lists. NB
+    # as_numpy() shares the memory of the h.Vector, which is reused by the
+    # next trial
     vsec_py = dict()
     for gid, vsec_dict in neuron_net._vsec.items():
         vsec_py[gid] = dict()
         for sec_name, vsec in vsec_dict.items():
-            vsec_py[gid][sec_name] = vsec.to_python()
+            vsec_py[gid][sec_name] = _sec_to_numpy(vsec)
 
     isec_py = dict()
     for gid, isec_dict in neuron_net._isec.items():
         isec_py[gid] = dict()
         for sec_name, isec in isec_dict.items():
             isec_py[gid][sec_name] = {
-                key: isec.to_python() for key, isec in isec.items()}
+                key: _sec_to_numpy(isec) for key, isec in isec.items()}
+
+    varsec_py = dict()
+    for gid, varsec_dict in neuron_net._varsec.items():
+        varsec_py[gid] = dict()
+        for sec_name, varsec in varsec_dict.items():
+            varsec_py[gid][sec_name] = {
+                key: _sec_to_numpy(var) for key, var in varsec.items()}
 
     dpl_data = np.c_[
         neuron_net._nrn_dipoles['L2_pyramidal'].as_numpy() +
@@ -114,18 +217,255 @@ def _simulate_single_trial(net, tstop, dt, trial_idx):
         rec_times_py.update({arr_name: nrn_arr._get_nrn_times()})
 
     data = {'dpl_data': dpl_data,
-            'spike_times': neuron_net._all_spike_times.to_python(),
-            'spike_gids': neuron_net._all_spike_gids.to_python(),
+            'spike_times': neuron_net._all_spike_times.as_numpy().copy(),
+            'spike_gids': neuron_net._all_spike_gids.as_numpy().copy(),
             'gid_ranges': net.gid_ranges,
             'vsec': vsec_py,
             'isec': isec_py,
+            'varsec': varsec_py,
             'rec_data': rec_arr_py,
             'rec_times': rec_times_py,
-            'times': times.to_python()}
+            'times': times.as_numpy().copy()}
+    data['sec_times'] = data['times']
+    if n_sec_samples is not None:
+        data['sec_times'] = np.arange(n_sec_samples) * plan.dt
 
     return data
 
 
+def _create_cell_template(cell_type, cell):
+    """Create the template of the cells of a cell type."""
+    sec_name_apical = None
+    if cell_type in ('L2_pyramidal', 'L5_pyramidal'):
+        sec_name_apical = 'apical_trunk'
+    return _CellTemplate(cell, sec_name_apical=sec_name_apical)
+
+
+def _init_cell_voltages(cell):
+    """Set the membrane potentials of a cell closer to baseline."""
+    seclist = h.SectionList()
+    # the soma may be on another rank if the cell is split
+    seclist.wholetree(sec=list(cell._nrn_sections.values())[0])
+    for sect in seclist:
+        for seg in sect:
+            if cell.name == 'L2Pyr':
+                seg.v = -71.46
+            elif cell.name == 'L5Pyr':
+                if sect.name() == 'L5Pyr_apical_1':
+                    seg.v = -71.32
+                elif sect.name() == 'L5Pyr_apical_2':
+                    seg.v = -69.08
+                elif sect.name() == 'L5Pyr_apical_tuft':
+                    seg.v = -67.30
+                else:
+                    seg.v = -72.
+            elif cell.name == 'L2Basket':
+                seg.v = -64.9737
+            elif cell.name == 'L5Basket':
+                seg.v = -64.9737
+
+
+def _get_state_names(seg):
+    """Get the names of the state variables of a segment.
+
+    These are the membrane potential, the STATE variables of the density
+    mechanisms and the ion concentrations.
+    """
+    state_names = ['v']
+    name = h.ref('')
+    for mech in seg:
+        if mech.is_ion():
+            ion = mech.name()[:-len('_ion')]
+            state_names += [f'{ion}i', f'{ion}o']
+            continue
+        mech_standard = h.MechanismStandard(mech.name(), 3)
+        for var_idx in range(int(mech_standard.count())):
+            # NB array variables are not supported
+            if mech_standard.name(name, var_idx) == 1:
+                state_names.append(name[0])
+    return state_names
+
+
+def _get_steady_states(net, burn_in, dt):
+    """Get the steady state of the cells of each cell type.
+
+    A cell of each cell type is simulated in isolation, i.e., without
+    synaptic inputs and drives, for burn_in ms, starting from the membrane
+    potentials set by NetworkBuilder.state_init. The tonic bias of a cell
+    type is applied during the burn-in if it is active at the start of the
+    trials. The resulting states are cached for the configuration of the
+    cell types and biases, so that the burn-in is run once in a process.
+
+    Parameters
+    ----------
+    net : Network object
+        The Network object specifying the cell types.
+    burn_in : float
+        The duration of the burn-in (ms).
+    dt : float
+        The integration time step (ms).
+
+    Returns
+    -------
+    steady_states : dict of dict
+        The states of each cell type after the burn-in, keyed by section name
+        and name of the state variable (e.g., 'v' or 'm_hh2'), as arrays of
+        the values of the segments of the section.
+    """
+    global _LAST_NETWORK
+
+    celsius = net._params['celsius']
+    # the amplitudes of the tonic biases active at the start of the trials,
+    # which last until the end of the trials if their tstop is None
+    biases = {cell_type: bias['amplitude'] for cell_type, bias in
+              net.external_biases.get('tonic', dict()).items() if
+              bias['t0'] <= 0 and (bias['tstop'] is None or
+                                   bias['tstop'] > 0)}
+    key = hashlib.sha1(pickle.dumps(
+        (net.cell_types, biases, celsius, float(burn_in),
+         float(dt)))).hexdigest()
+    if key in _STEADY_STATES:
+        return _STEADY_STATES[key]
+
+    load_custom_mechanisms()
+    # all sections in this process are simulated, so the cells of the
+    # network last built are removed beforehand
+    if _LAST_NETWORK is not None:
+        _LAST_NETWORK._clear_neuron_objects()
+        _LAST_NETWORK = None
+
+    cells = dict()
+    for cell_type, cell in net.cell_types.items():
+        cells[cell_type] = _create_cell_template(cell_type, cell).build_cell(
+            net.gid_ranges[cell_type][0], net.pos_dict[cell_type][0])
+        _init_cell_voltages(cells[cell_type])
+        if cell_type in biases:
+            cells[cell_type].create_tonic_bias(biases[cell_type], t0=0.,
+                                               tstop=burn_in + dt)
+
+    h.dt = dt
+    h.celsius = celsius
+    h.finitialize()
+    while h.t < burn_in - dt / 2:
+        h.fadvance()
+
+    steady_states = dict()
+    for cell_type, cell in cells.items():
+        steady_states[cell_type] = dict()
+        for sec_name, sec in cell._nrn_sections.items():
+            steady_states[cell_type][sec_name] = {
+                state_name: np.array([getattr(seg, state_name) for seg in
+                                      sec])
+                for state_name in _get_state_names(sec(0.5))}
+    _STEADY_STATES[key] = steady_states
+    return steady_states
+
+
+def _find_checkpoint(trial_dir, tstop):
+    """Find the latest complete checkpoint of a trial until tstop.
+
+    Parameters
+    ----------
+    trial_dir : str
+        The directory of the checkpoints of the trial.
+    tstop : float
+        The simulation stop time (ms).
+
+    Returns
+    -------
+    checkpoint_fname : str | None
+        The directory of the checkpoint, or None if there is none.
+    info : dict | None
+        The time of the checkpoint (key 't'), and the number of MPI processes
+        ('n_hosts') and threads ('n_threads') that saved it.
+    """
+    checkpoint_fname, checkpoint_info = None, None
+    if not op.isdir(trial_dir):
+        return checkpoint_fname, checkpoint_info
+    for dir_name in os.listdir(trial_dir):
+        # the info is written once all ranks saved their state
+        info_fname = op.join(trial_dir, dir_name, 'info.pkl')
+        if not op.exists(info_fname):
+            continue
+        with open(info_fname, 'rb') as info_file:
+            info = pickle.load(info_file)
+        if info['t'] > tstop + 1e-6:
+            continue
+        if checkpoint_info is None or info['t'] > checkpoint_info['t']:
+            checkpoint_fname = op.join(trial_dir, dir_name)
+            checkpoint_info = info
+    return checkpoint_fname, checkpoint_info
+
+
+def _get_cell_cost(cell, sec_names=None):
+    """Estimate the relative cost of simulating a cell.
+
+    The cost is the number of segments weighted by the number of mechanisms
+    (plus the passive cable) inserted in each section.
+
+    Parameters
+    ----------
+    cell : instance of Cell
+        The cell template of a cell type.
+    sec_names : list of str | None
+        If not None, the cost of only these sections is estimated.
+
+    Returns
+    -------
+    cost : int
+        The estimated cost of the cell.
+    """
+    if sec_names is None:
+        sec_names = list(cell.sections)
+    cost = 0
+    for sec_name in sec_names:
+        section = cell.sections[sec_name]
+        cost += _get_nseg(section.L) * (len(section.mechs) + 1)
+    return cost
+
+
+def _get_cell_pieces(cell):
+    """Split a cell into pieces that can be simulated on different ranks.
+
+    Cells are split at the distal end of the soma if a single section, e.g.,
+    the apical trunk of a pyramidal cell, is attached there. The pieces are
+    joined again by ParallelContext.multisplit().
+
+    Parameters
+    ----------
+    cell : instance of Cell
+        The cell template of a cell type.
+
+    Returns
+    -------
+    pieces : list of tuple
+        The section names of each piece and the (sec_name, loc) of the node
+        at which it is split from the others, or None for a cell that is not
+        split. The first piece holds the soma.
+    """
+    children = dict()
+    for parent_sec, parent_loc, child_sec, _ in (cell.topology or list()):
+        children.setdefault(parent_sec, list()).append(
+            (parent_loc, child_sec))
+    root_secs = [child_sec for parent_loc, child_sec in
+                 children.get('soma', list()) if parent_loc == 1]
+    if len(root_secs) != 1:
+        return [(list(cell.sections), None)]
+
+    distal_secs = set()
+    secs_to_visit = list(root_secs)
+    while len(secs_to_visit) > 0:
+        sec_name = secs_to_visit.pop()
+        distal_secs.add(sec_name)
+        secs_to_visit.extend(child_sec for _, child_sec in
+                             children.get(sec_name, list()))
+    proximal_piece = [sec_name for sec_name in cell.sections if
+                      sec_name not in distal_secs]
+    distal_piece = [sec_name for sec_name in cell.sections if
+                    sec_name in distal_secs]
+    return [(proximal_piece, ('soma', 1.)), (distal_piece, (root_secs[0], 0.))]
+
+
 def _is_loaded_mechanisms():
     # copied from:
     # https://www.neuron.yale.edu/neuron/static/py_doc/modelspec/programmatic/mechtype.html
@@ -230,6 +570,40 @@ def _create_parallel_context(n_cores=None, expose_imem=False):
         _CVODE.use_fast_imem(1)
 
 
+def _create_subworlds(n_subworlds):
+    """Split the MPI ranks into subworlds that simulate different trials.
+
+    Each subworld is a group of consecutive ranks over which the cells of a
+    network are distributed independently of the other subworlds. Once split,
+    the rank and number of hosts of ParallelContext, as well as its collective
+    operations (e.g., spike exchange and allreduce), refer to the subworld.
+    NB this must be called before any network is built in this process,
+    unless the ranks are already split into the same subworlds.
+
+    Parameters
+    ----------
+    n_subworlds : int
+        The number of subworlds. Must divide the number of MPI ranks.
+
+    Returns
+    -------
+    subworld_idx : int
+        The index of the subworld of the current rank.
+    """
+    _create_parallel_context()
+
+    n_hosts_world = int(_PC.nhost_world())
+    if n_hosts_world % n_subworlds != 0:
+        raise ValueError(f'The number of MPI ranks ({n_hosts_world}) must be '
+                         f'divisible by n_subworlds, got {n_subworlds}')
+    subworld_size = n_hosts_world // n_subworlds
+    # persistent MPI processes split the ranks before each simulation
+    if int(_PC.nhost()) != subworld_size:
+        _PC.subworlds(subworld_size)
+
+    return int(_PC.id_world()) // subworld_size
+
+
 class NetworkBuilder(object):
     """The NetworkBuilder class.
 
@@ -240,6 +614,13 @@ class NetworkBuilder(object):
     trial_idx : int (optional)
         Index number of the trial being processed (different event statistics).
         Defaults to 0.
+    multisplit : bool (optional)
+        If True, pyramidal cells may be split into pieces that are simulated
+        on different MPI ranks. This allows using more ranks than there are
+        cells. Defaults to False.
+    n_threads : int (optional)
+        The number of threads over which NEURON distributes the cells of the
+        current rank (see ``ParallelContext.nthread``). Defaults to 1.
 
     Attributes
     ----------
@@ -262,9 +643,11 @@ class NetworkBuilder(object):
     `self.net._params` and the network is ready for another simulation.
     """
 
-    def __init__(self, net, trial_idx=0):
+    def __init__(self, net, trial_idx=0, multisplit=False, n_threads=1):
         self.net = net
         self.trial_idx = trial_idx
+        self._multisplit = multisplit
+        self._n_threads = n_threads
 
         # When computing the network dynamics in parallel, the nodes of the
         # network (real and artificial cells) potentially get distributed
@@ -273,6 +656,13 @@ class NetworkBuilder(object):
         # possible hosts/threads for computations. _gid_list here contains
         # the GIDs of all the nodes assigned to the current host/thread.
         self._gid_list = list()
+        # With multisplit, the section names and split node of the cell
+        # pieces on the current host keyed by the GIDs of the cells that are
+        # split across hosts. The spikes of a split cell are sent by the host
+        # of its soma, i.e., the GIDs in _gid_list that are not in
+        # _split_gids_remote_soma.
+        self._split_cells = dict()
+        self._split_gids_remote_soma = set()
         # Note that GIDs are already defined in Network.gid_ranges
         # All that's left for NetworkBuilder is then to:
         # - _PC.set_gid2node(gid, rank)
@@ -285,14 +675,30 @@ class NetworkBuilder(object):
         # the NEURON hoc objects and the corresonding python references
         # initialized by _ArtificialCell()
         self._drive_cells = list()
+        # NetCons restarting the VecStims of drive cells after a checkpoint
+        # is restored (see _restore_checkpoint)
+        self._restart_netcons = list()
+        # event trains of the drives whose events are created lazily, keyed
+        # by drive name (see _get_drive_cell_events)
+        self._drive_trains = dict()
+        # with net._pattern_stim, the PatternStim delivering the events of
+        # the drive cells connected to the cells on this rank, the gids of
+        # these drive cells, and the event times and gids it plays
+        self._pattern_stim = None
+        self._pattern_gids = list()
+        self._pattern_vecs = None
 
         self.ncs = dict()
         self._nrn_dipoles = dict()
 
         self._vsec = dict()
         self._isec = dict()
+        self._varsec = dict()
         self._nrn_rec_arrays = dict()
         self._nrn_rec_callbacks = list()
+        # whether the extracellular potentials are gathered by stepping the
+        # solver rather than by a callback of CVode.extra_scatter_gather
+        self._step_extracellular = False
 
         # if extracellular electrodes have been included, we need to calculate
         # transmembrane currents at each integration step
@@ -320,16 +726,21 @@ class NetworkBuilder(object):
 
         self._clear_last_network_objects()
 
+        # NB the ParallelContext is shared by all simulations in this process,
+        # and the callbacks of the last network must be removed beforehand
+        if int(_PC.nthread()) != self._n_threads:
+            _PC.nthread(self._n_threads)
+
         self._nrn_dipoles['L5_pyramidal'] = h.Vector()
         self._nrn_dipoles['L2_pyramidal'] = h.Vector()
 
         self._gid_assign()
+        if self._rank == 0 and len(self._rank_loads) > 1:
+            print('Cell load per rank: max %d, mean %.1f (imbalance %.2f)' % (
+                self._rank_loads.max(), self._rank_loads.mean(),
+                self._rank_loads.max() / self._rank_loads.mean()))
 
-        record_vsec = self.net._params['record_vsec']
-        record_isec = self.net._params['record_isec']
-        self._create_cells_and_drives(threshold=self.net._params['threshold'],
-                                      record_vsec=record_vsec,
-                                      record_isec=record_isec)
+        self._create_cells_and_drives(threshold=self.net._params['threshold'])
 
         self.state_init()
 
@@ -343,6 +754,9 @@ class NetworkBuilder(object):
 
         self._record_spikes()
         self._connect_celltypes()
+        self._join_split_cells()
+        if self.net._pattern_stim:
+            self._play_pattern_stim()
 
         if len(self.net.rec_arrays) > 0:
             self._record_extracellular()
@@ -353,6 +767,10 @@ class NetworkBuilder(object):
     def _gid_assign(self, rank=None, n_hosts=None):
         """Assign cell IDs to this node
 
+        Cells are distributed across hosts so that the estimated cost of
+        simulating them is balanced. The resulting load of each host is
+        stored in ``self._rank_loads``.
+
         Parameters
         ----------
         rank : int | None
@@ -367,39 +785,461 @@ class NetworkBuilder(object):
         if n_hosts is None:
             n_hosts = _get_nhosts()
 
-        # round robin assignment of cell gids
-        for gid in range(self._rank, self.net._n_cells, n_hosts):
-            self._gid_list.append(gid)
-
-        for drive in self.net.external_drives.values():
+        # greedy longest-processing-time assignment of cell gids: the most
+        # expensive cells (or cell pieces) are assigned first, each to the
+        # least loaded rank. This is deterministic, so all ranks agree on
+        # the assignment.
+        cell_pieces = dict()
+        work_items = list()
+        for cell_type, cell in self.net.cell_types.items():
+            if self._multisplit:
+                cell_pieces[cell_type] = _get_cell_pieces(cell)
+            else:
+                cell_pieces[cell_type] = [(list(cell.sections), None)]
+            for piece_idx, (sec_names, _) in enumerate(
+                    cell_pieces[cell_type]):
+                cost = _get_cell_cost(cell, sec_names)
+                work_items.extend((-cost, gid, piece_idx) for gid in
+                                  self.net.gid_ranges[cell_type])
+        work_items.sort()
+        rank_loads = [(0, rank_idx) for rank_idx in range(n_hosts)]
+        heapify(rank_loads)
+        self._rank_loads = np.zeros(n_hosts, dtype=int)
+        piece_ranks = dict()
+        for neg_cost, gid, piece_idx in work_items:
+            load, rank_idx = heappop(rank_loads)
+            heappush(rank_loads, (load - neg_cost, rank_idx))
+            self._rank_loads[rank_idx] = load - neg_cost
+            piece_ranks.setdefault(gid, dict())[piece_idx] = rank_idx
+
+        # cells whose pieces all end up on the same rank are not split
+        self._split_cells = dict()
+        self._split_gids_remote_soma = set()
+        local_gids = set()
+        for cell_type in self.net.cell_types:
+            for gid in self.net.gid_ranges[cell_type]:
+                ranks = piece_ranks[gid]
+                if self._rank not in ranks.values():
+                    continue
+                self._gid_list.append(gid)
+                if len(set(ranks.values())) == 1:
+                    local_gids.add(gid)
+                    continue
+                piece_idx = [piece_idx for piece_idx, rank_idx in
+                             ranks.items() if rank_idx == self._rank][0]
+                self._split_cells[gid] = cell_pieces[cell_type][piece_idx]
+                if piece_idx == 0:
+                    local_gids.add(gid)
+                else:
+                    self._split_gids_remote_soma.add(gid)
+        # pc.multisplit() must be called on all ranks if any cell is split
+        self._has_split_cells = any(
+            len(set(ranks.values())) > 1 for ranks in piece_ranks.values())
+
+        # drive cells that never spike are not assigned and hence not
+        # created; the other gids keep their assignment
+        silent_gids = self._get_silent_drive_gids()
+
+        # the drive cells are not created if a PatternStim delivers their
+        # events
+        drives = list()
+        if not self.net._pattern_stim:
+            drives = self.net.external_drives.values()
+        for drive in drives:
             if drive['cell_specific']:
                 # only assign drive gids that have a target cell gid already
                 # assigned to this rank
                 for src_gid in self.net.gid_ranges[drive['name']]:
+                    if src_gid in silent_gids:
+                        continue
                     conn_idxs = pick_connection(self.net, src_gids=src_gid)
                     target_gids = list()
                     for conn_idx in conn_idxs:
                         gid_pairs = self.net.connectivity[
                             conn_idx]['gid_pairs']
                         if src_gid in gid_pairs:
-                            target_gids += (self.net.connectivity[conn_idx]
-                                            ['gid_pairs'][src_gid])
+                            target_gids.extend(gid_pairs[src_gid])
 
-                    for target_gid in set(target_gids):
-                        if (target_gid in self._gid_list and
-                                src_gid not in self._gid_list):
-                            self._gid_list.append(src_gid)
+                    if not local_gids.isdisjoint(target_gids):
+                        self._gid_list.append(src_gid)
             else:
                 # round robin assignment of drive gids
                 src_gids = list(self.net.gid_ranges[drive['name']])
                 for gid_idx in range(self._rank, len(src_gids), n_hosts):
-                    self._gid_list.append(src_gids[gid_idx])
+                    if src_gids[gid_idx] not in silent_gids:
+                        self._gid_list.append(src_gids[gid_idx])
 
         # extremely important to get the gids in the right order
         self._gid_list.sort()
 
-    def _create_cells_and_drives(self, threshold, record_vsec=False,
-                                 record_isec=False):
+    def _get_silent_drive_gids(self):
+        """Return the gids of drive cells without events in any trial.
+
+        The VecStims of these drive cells would never fire, so neither they
+        nor their NetCons affect the simulation. In legacy mode, this
+        includes e.g. the Poisson drive cells of cell types for which no
+        rate constant is defined. With checkpoints, only these drive cells
+        are silent, so that the network is the same for a longer tstop.
+
+        Returns
+        -------
+        silent_gids : set of int
+            The gids of the silent drive cells.
+        """
+        silent_gids = set()
+        for drive in self.net.external_drives.values():
+            events = drive['events']
+            if (self.net._lazy_drive_events is not None or
+                    self.net._checkpoint is not None):
+                # the events are not known yet or depend on tstop, except
+                # that those of Poisson drive cells without rate constant are
+                # always empty
+                if drive['type'] != 'poisson':
+                    continue
+                rate_constant = drive['dynamics']['rate_constant']
+                trains = self._get_drive_trains(drive['name'])
+                for gid, (_, target_type) in zip(
+                        self.net.gid_ranges[drive['name']], trains):
+                    if (target_type != 'any' and
+                            target_type not in rate_constant):
+                        silent_gids.add(gid)
+                continue
+            # drive events must be instantiated for all trials
+            if len(events) == 0:
+                continue
+            n_events = events._n_events().sum(axis=0)
+            for gid_idx, gid in enumerate(self.net.gid_ranges[drive['name']]):
+                if n_events[gid_idx] == 0:
+                    silent_gids.add(gid)
+        return silent_gids
+
+    def _reset_trial(self, trial_idx):
+        """Prepare the built network for simulating another trial.
+
+        Only the event times of the drive cells differ between trials: these
+        are reloaded into the existing VecStims, and the recordings and
+        initial membrane potentials are reset. Cells and NetCons are reused.
+
+        Parameters
+        ----------
+        trial_idx : int
+            Index number of the trial to simulate next.
+        """
+        self.trial_idx = trial_idx
+
+        drive_events = self._get_drive_cell_events(
+            [drive_cell.gid for drive_cell in self._drive_cells])
+        for drive_cell in self._drive_cells:
+            drive_cell.nrn_eventvec.from_python(drive_events[drive_cell.gid])
+        self._restart_netcons = list()
+        if self._pattern_stim is not None:
+            self._play_pattern_stim()
+
+        for cell_type in self._nrn_dipoles:
+            self._nrn_dipoles[cell_type] = h.Vector()
+        self._vsec = dict()
+        self._isec = dict()
+        self._varsec = dict()
+        for spike_vec in (self._spike_times, self._spike_gids,
+                          self._all_spike_times, self._all_spike_gids):
+            spike_vec.resize(0)
+        for nrn_arr in self._nrn_rec_arrays.values():
+            nrn_arr._reset()
+
+        # h.finitialize() does not touch the membrane potential, so restore
+        # the state of a fresh build: NEURON creates sections at -65 mV,
+        # including the zero-area end nodes not visited by state_init()
+        for cell in self._cells:
+            for sec in cell._nrn_sections.values():
+                for seg in sec.allseg():
+                    seg.v = -65.
+        self.state_init()
+
+    def _get_recordings(self):
+        """Get the vectors recording the simulation on this rank.
+
+        Returns
+        -------
+        recordings : list of h.Vector
+            The recordings of spikes, dipoles, sections and extracellular
+            arrays, in the same order for each build of the network.
+        """
+        recordings = [self._spike_times, self._spike_gids]
+        for cell in self._cells:
+            if hasattr(cell, 'dipole'):
+                recordings.append(cell.dipole)
+            recordings.extend(cell.vsec.values())
+            for sec_name in cell.isec:
+                recordings.extend(cell.isec[sec_name].values())
+            for sec_name in cell.varsec:
+                recordings.extend(cell.varsec[sec_name].values())
+        for nrn_arr in self._nrn_rec_arrays.values():
+            recordings += [nrn_arr._nrn_times, nrn_arr._nrn_voltages]
+        return recordings
+
+    def _save_checkpoint(self, checkpoint_dir, recordings):
+        """Save the state of the trial at the current time.
+
+        Each rank writes the state of its model, including the event queue,
+        with h.SaveState, and its recordings so far. Once all ranks are done,
+        rank 0 marks the checkpoint as complete and removes the previous
+        checkpoints of the trial. Each rank also saves a hash of its
+        configuration (see _get_checkpoint_key), which is checked on restore.
+
+        Parameters
+        ----------
+        checkpoint_dir : str
+            The directory of the checkpoints of all trials.
+        recordings : list of h.Vector
+            The recordings to save (see _get_recordings).
+        """
+        trial_dir = op.join(checkpoint_dir, f'trial_{self.trial_idx}')
+        checkpoint_fname = op.join(trial_dir, f't_{h.t:.4f}')
+        if op.exists(op.join(checkpoint_fname, 'info.pkl')):
+            # the trial was resumed from this checkpoint
+            return
+        os.makedirs(checkpoint_fname, exist_ok=True)
+        # the NetCons restarting the VecStims delivered their events when the
+        # trial was resumed, and are not part of the model of a new build
+        self._restart_netcons = list()
+
+        state = h.SaveState()
+        state.save()
+        nrn_file = h.File()
+        nrn_file.wopen(op.join(checkpoint_fname, f'state_{self._rank}.dat'))
+        state.fwrite(nrn_file)
+        nrn_file.close()
+        with open(op.join(checkpoint_fname,
+                          f'recordings_{self._rank}.pkl'), 'wb') as rec_file:
+            pickle.dump(dict(
+                recordings=[vec.as_numpy().copy() for vec in recordings],
+                n_events=[drive_cell.nrn_eventvec.size() for drive_cell in
+                          self._drive_cells],
+                key=self._get_checkpoint_key(h.t, recordings)), rec_file)
+        _PC.barrier()
+
+        if self._rank == 0:
+            info = dict(t=h.t, n_hosts=_get_nhosts(),
+                        n_threads=self._n_threads)
+            info_fname = op.join(checkpoint_fname, 'info.pkl')
+            with open(info_fname + '.tmp', 'wb') as info_file:
+                pickle.dump(info, info_file)
+            os.replace(info_fname + '.tmp', info_fname)
+            # the checkpoints after this one, saved by a simulation with a
+            # longer tstop, are kept
+            for dir_name in os.listdir(trial_dir):
+                dir_fname = op.join(trial_dir, dir_name)
+                if dir_fname == checkpoint_fname:
+                    continue
+                other_info_fname = op.join(dir_fname, 'info.pkl')
+                if op.exists(other_info_fname):
+                    with open(other_info_fname, 'rb') as info_file:
+                        if pickle.load(info_file)['t'] > h.t:
+                            continue
+                shutil.rmtree(dir_fname)
+        _PC.barrier()
+
+    def _get_checkpoint_key(self, t, recordings):
+        """Hash the configuration of the trial that determines its state at t.
+
+        The key changes with the network, the drive events until t (i.e.,
+        their parameters and event_rng), the tonic biases until t, dt, the
+        temperature, the burn-in, the assignment of the gids to this rank and
+        the recordings, but not with tstop.
+
+        Parameters
+        ----------
+        t : float
+            The time of the checkpoint (ms).
+        recordings : list of h.Vector
+            The recordings of the checkpoint (see _get_recordings).
+
+        Returns
+        -------
+        key : str
+            The hash of the configuration on this rank.
+        """
+        net = self.net
+        connectivity = [
+            (conn['src_type'], conn['target_type'], conn['loc'],
+             conn['receptor'], conn['nc_dict'], conn['gid_pairs'].src_gids,
+             conn['gid_pairs'].indptr, conn['gid_pairs'].indices,
+             conn['gid_pairs'].weights, conn['gid_pairs'].delays)
+            for conn in net.connectivity]
+        biases = dict()
+        for bias_name, bias in net.external_biases.items():
+            for cell_type, cell_type_bias in bias.items():
+                t0, tstop = cell_type_bias['t0'], cell_type_bias['tstop']
+                if t0 < t:
+                    tstop = t if tstop is None else min(tstop, t)
+                    biases[(bias_name, cell_type)] = (
+                        cell_type_bias['amplitude'], t0, tstop)
+        event_times = list()
+        for drive_cell in self._drive_cells:
+            times = drive_cell.nrn_eventvec.as_numpy()
+            event_times.append(times[times <= t])
+        return hashlib.sha1(pickle.dumps(
+            (net.cell_types, connectivity, biases, event_times,
+             float(h.dt), float(h.celsius), net._burn_in, self._gid_list,
+             net._params['record_vsec'], net._params['record_isec'],
+             net._recording_plan, len(recordings)))).hexdigest()
+
+    def _restore_checkpoint(self, checkpoint_dir, recordings):
+        """Restore the latest checkpoint of the trial until h.tstop.
+
+        This is called after h.finitialize(). The states, event queue and
+        time of the model are restored, as well as the recordings.
+
+        Parameters
+        ----------
+        checkpoint_dir : str
+            The directory of the checkpoints of all trials.
+        recordings : list of h.Vector
+            The recordings to restore (see _get_recordings).
+
+        Returns
+        -------
+        is_resumed : bool
+            Whether a checkpoint was restored.
+        """
+        checkpoint_fname, info = _find_checkpoint(
+            op.join(checkpoint_dir, f'trial_{self.trial_idx}'), h.tstop)
+        if checkpoint_fname is None:
+            return False
+        if (info['n_hosts'] != _get_nhosts() or
+                info['n_threads'] != self._n_threads):
+            raise ValueError(
+                f"The checkpoint {checkpoint_fname} was saved with "
+                f"{info['n_hosts']} MPI processes and {info['n_threads']} "
+                f"threads, but the simulation runs with {_get_nhosts()} MPI "
+                f"processes and {self._n_threads} threads")
+
+        with open(op.join(checkpoint_fname,
+                          f'recordings_{self._rank}.pkl'), 'rb') as rec_file:
+            saved = pickle.load(rec_file)
+        # all ranks raise if the configuration differs on any of them
+        key = self._get_checkpoint_key(info['t'], recordings)
+        if _PC.allreduce(float(saved['key'] != key), 2):
+            raise ValueError(
+                f'The checkpoint {checkpoint_fname} was saved with a '
+                f'different network, drives, dt, event_rng or recordings '
+                f'than the simulation')
+
+        state = h.SaveState()
+        nrn_file = h.File()
+        nrn_file.ropen(op.join(checkpoint_fname, f'state_{self._rank}.dat'))
+        state.fread(nrn_file)
+        nrn_file.close()
+        state.restore()
+
+        for vec, values in zip(recordings, saved['recordings']):
+            vec.from_python(values)
+
+        # the VecStims refer to their event vectors by memory address, which
+        # is restored as well
+        for drive_cell, n_events in zip(self._drive_cells, saved['n_events']):
+            drive_cell.nrn_vecstim.play(drive_cell.nrn_eventvec)
+            # a VecStim that delivered all its events until the checkpoint
+            # has ended, and is restarted at the events after them (with a
+            # longer tstop than at the checkpoint)
+            if drive_cell.nrn_eventvec.size() > n_events:
+                nrn_netcon = h.NetCon(None, drive_cell.nrn_vecstim)
+                nrn_netcon.weight[0] = n_events
+                nrn_netcon.event(h.t)
+                self._restart_netcons.append(nrn_netcon)
+        return True
+
+    def _get_drive_trains(self, drive_name):
+        """Get the event trains of a drive (see Network._get_drive_trains)"""
+        if drive_name not in self._drive_trains:
+            self._drive_trains[drive_name] = self.net._get_drive_trains(
+                drive_name)
+        return self._drive_trains[drive_name]
+
+    def _get_drive_cell_events(self, gids):
+        """Get the event times of drive cells for the current trial.
+
+        If the drive events were not instantiated for all trials upfront (see
+        Network._instantiate_drives), they are created here, only for the
+        given drive cells.
+
+        Parameters
+        ----------
+        gids : list of int
+            The gids of the drive cells.
+
+        Returns
+        -------
+        drive_events : dict
+            The event times of each drive cell, keyed by gid, as arrays.
+        """
+        drive_gids = dict()
+        for gid in gids:
+            drive_name = self.net.gid_to_type(gid)
+            drive_gids.setdefault(drive_name, list()).append(gid)
+
+        lazy = self.net._lazy_drive_events
+        drive_events = dict()
+        for drive_name, gids in drive_gids.items():
+            gid_idxs = [gid - self.net.gid_ranges[drive_name][0]
+                        for gid in gids]
+            if lazy is None:
+                events = self.net.external_drives[drive_name]['events']
+                event_times = [events._get_train(self.trial_idx, gid_idx)
+                               for gid_idx in gid_idxs]
+            else:
+                trains = self._get_drive_trains(drive_name)
+                values, n_events = self.net._get_drive_events(
+                    drive_name, [trains[gid_idx] for gid_idx in gid_idxs],
+                    self.trial_idx, tstop=lazy['tstop'],
+                    event_rng=lazy['event_rng'])
+                event_times = np.split(values, np.cumsum(n_events)[:-1])
+            drive_events.update(zip(gids, event_times))
+        return drive_events
+
+    def _get_pattern_events(self, gids):
+        """Get the events of drive cells as time-sorted times and gids."""
+        drive_events = self._get_drive_cell_events(gids)
+        times = np.concatenate([np.zeros(0)] +
+                               [drive_events[gid] for gid in gids])
+        event_gids = np.repeat(gids, [len(drive_events[gid]) for gid in
+                                      gids]).astype(float)
+        order = np.argsort(times, kind='stable')
+        return times[order], event_gids[order]
+
+    def _play_pattern_stim(self):
+        """Deliver the events of the current trial with a PatternStim.
+
+        A single PatternStim delivers the events of all drive cells connected
+        to the cells on this rank, as if the drive cells existed, to the
+        NetCons created by _PC.gid_connect for their gids.
+        """
+        if self._pattern_stim is None:
+            self._pattern_stim = h.PatternStim()
+        # NB the vectors are played from the memory they have when play() is
+        # called, so this is called again for each trial
+        self._pattern_vecs = [h.Vector(vec) for vec in
+                              self._get_pattern_events(self._pattern_gids)]
+        self._pattern_stim.play(*self._pattern_vecs)
+
+    def _record_pattern_spikes(self):
+        """Record the events delivered by PatternStims as drive spikes.
+
+        NEURON does not record the events delivered by a PatternStim, so the
+        events of the drive cells that would have been created are added to
+        the spikes of the ranks, to each rank those of an equal share of the
+        drive cells.
+        """
+        silent_gids = self._get_silent_drive_gids()
+        drive_gids = [gid for drive_name in self.net.external_drives for gid
+                      in self.net.gid_ranges[drive_name] if gid not in
+                      silent_gids]
+        times, gids = self._get_pattern_events(
+            drive_gids[self._rank::_get_nhosts()])
+        self._spike_times.append(h.Vector(times))
+        self._spike_gids.append(h.Vector(gids))
+
+    def _create_cells_and_drives(self, threshold):
         """Parallel create cells AND external drives
 
         NB: _Cell.__init__ calls h.Section -> non-picklable!
@@ -410,7 +1250,15 @@ class NetworkBuilder(object):
         """
 
         for gid in self._gid_list:
-            _PC.set_gid2node(gid, self._rank)
+            if gid not in self._split_gids_remote_soma:
+                _PC.set_gid2node(gid, self._rank)
+
+        # each cell type is built once in NEURON; the other cells of the
+        # type reuse its precomputed values
+        cell_templates = dict()
+        drive_events = self._get_drive_cell_events(
+            [gid for gid in self._gid_list if
+             self.net.gid_to_type(gid) not in self.net.cell_types])
 
         # loop through ALL gids
         # have to loop over self._gid_list, since this is what we got
@@ -419,37 +1267,88 @@ class NetworkBuilder(object):
             src_type = self.net.gid_to_type(gid)
             gid_idx = gid - self.net.gid_ranges[src_type][0]
             if src_type in self.net.cell_types:
-                # copy cell object from template cell type in Network
-                cell = self.net.cell_types[src_type].copy()
-                cell.gid = gid
-                cell.pos = self.net.pos_dict[src_type][gid_idx]
-
-                # instantiate NEURON object
-                if src_type in ('L2_pyramidal', 'L5_pyramidal'):
-                    cell.build(sec_name_apical='apical_trunk')
-                else:
-                    cell.build()
+                if src_type not in cell_templates:
+                    cell_templates[src_type] = _create_cell_template(
+                        src_type, self.net.cell_types[src_type])
+
+                # instantiate NEURON object (or the piece of it on this
+                # rank if the cell is split)
+                sec_names = None
+                if gid in self._split_cells:
+                    sec_names = self._split_cells[gid][0]
+                cell = cell_templates[src_type].build_cell(
+                    gid, self.net.pos_dict[src_type][gid_idx],
+                    define_shape=False, sec_names=sec_names)
+                self._cells.append(cell)
+                # the soma of a split cell may be on another rank
+                is_remote_soma = gid in self._split_gids_remote_soma
                 # add tonic biases
                 if ('tonic' in self.net.external_biases and
-                        src_type in self.net.external_biases['tonic']):
+                        src_type in self.net.external_biases['tonic'] and
+                        not is_remote_soma):
                     cell.create_tonic_bias(**self.net.external_biases
                                            ['tonic'][src_type])
-                cell.record(record_vsec, record_isec)
+                self._record_cell(cell, src_type)
+                if is_remote_soma:
+                    continue
 
                 # this call could belong in init of a _Cell (with threshold)?
                 nrn_netcon = cell.setup_source_netcon(threshold)
                 assert cell.gid in self._gid_list
                 _PC.cell(cell.gid, nrn_netcon)
-                self._cells.append(cell)
 
             # external driving inputs are special types of artificial-cells
             else:
-                event_times = self.net.external_drives[
-                    src_type]['events'][self.trial_idx][gid_idx]
-                drive_cell = _ArtificialCell(event_times, threshold, gid=gid)
+                drive_cell = _ArtificialCell(drive_events[gid], threshold,
+                                             gid=gid)
                 _PC.cell(drive_cell.gid, drive_cell.nrn_netcon)
                 self._drive_cells.append(drive_cell)
 
+        # deferred from _CellTemplate.build_cell() since it visits all
+        # sections in NEURON
+        h.define_shape()
+
+    def _record_cell(self, cell, cell_type):
+        """Set up the recordings of the sections of a cell.
+
+        The sections are recorded as specified by the record_vsec and
+        record_isec arguments of simulate_dipole, or by a RecordingPlan.
+        """
+        cell.record(self.net._params['record_vsec'],
+                    self.net._params['record_isec'])
+        plan = self.net._recording_plan
+        if plan is not None:
+            sec_names = plan._get_sec_names(cell_type, cell.gid,
+                                            cell.sections.keys())
+            # NB with multiple threads, NEURON samples at an interval with
+            # a jitter of one step, so every step is recorded and sampled
+            # after the simulation instead
+            dt = plan.dt if self._n_threads == 1 else None
+            cell._record_variables(sec_names, plan.variables, dt=dt)
+
+    def _join_split_cells(self):
+        """Join the pieces of split cells across ranks.
+
+        The pieces are joined at their split node, using the gid of the cell
+        as split id. NB this is done once the NetCons are created, and the
+        pointers to NEURON variables are set again afterwards since they do
+        not follow the reorganized tree structure.
+        """
+        if self._has_split_cells:
+            for cell in self._cells:
+                if cell.gid in self._split_cells:
+                    sec_name, loc = self._split_cells[cell.gid][1]
+                    _PC.multisplit(cell._nrn_sections[sec_name](loc),
+                                   cell.gid)
+            _PC.multisplit()
+
+            # the tree structure of the cells changed, so pointers to the
+            # NEURON variables of the sections are set again
+            for cell in self._cells:
+                if len(cell.dipole_pp) > 0:
+                    cell._set_dipole_pointers()
+                self._record_cell(cell, self.net.gid_to_type(cell.gid))
+
     # connections:
     # this NODE is aware of its cells as targets
     # for each syn, return list of source GIDs.
@@ -463,61 +1362,106 @@ class NetworkBuilder(object):
 
         assert len(self._cells) == len(self._gid_list) - len(self._drive_cells)
 
+        # lookup tables indexed by gid: position of every source and index
+        # in self._cells of the targets on current node (-1 elsewhere)
+        gid_pos = np.zeros((net._n_gids, 3))
+        gid_type_idx = np.zeros(net._n_gids, dtype=int)
+        gid_types = list(net.gid_ranges.keys())
+        for type_idx, (gid_type, gid_range) in enumerate(
+                net.gid_ranges.items()):
+            gid_pos[gid_range] = net.pos_dict[gid_type]
+            gid_type_idx[gid_range] = type_idx
+        cell_idxs = np.full(net._n_gids, -1)
+        cell_idxs[[cell.gid for cell in self._cells]] = np.arange(
+            len(self._cells))
+        # drive cells that were not created since they never spike
+        is_silent = np.zeros(net._n_gids, dtype=bool)
+        is_silent[list(self._get_silent_drive_gids())] = True
+        is_drive = np.ones(net._n_gids, dtype=bool)
+        for cell_type in net.cell_types:
+            is_drive[net.gid_ranges[cell_type]] = False
+        pattern_gids = set()
+
         for conn in connectivity:
             loc, receptor = conn['loc'], conn['receptor']
-            nc_dict = deepcopy(conn['nc_dict'])
-            # Gather indices of targets on current node
-            valid_targets = set()
-            for src_gid, target_gids in conn['gid_pairs'].items():
-                filtered_targets = list()
-                for target_gid in target_gids:
-                    if _PC.gid_exists(target_gid):
-                        filtered_targets.append(target_gid)
-                        valid_targets.add(target_gid)
-                conn['gid_pairs'][src_gid] = filtered_targets
-
-            target_filter = dict()
-            for idx in range(len(self._cells)):
-                gid = self._gid_list[idx]
-                if gid in valid_targets:
-                    target_filter[gid] = idx
-
-            # Iterate over src/target pairs and connect cells
-            for src_gid, target_gids in conn['gid_pairs'].items():
-                for target_gid in target_gids:
-                    src_type = self.net.gid_to_type(src_gid)
-                    target_type = self.net.gid_to_type(target_gid)
-                    target_cell = self._cells[target_filter[target_gid]]
-                    connection_name = f'{_short_name(src_type)}_'\
-                                      f'{_short_name(target_type)}_{receptor}'
-                    if connection_name not in self.ncs:
-                        self.ncs[connection_name] = list()
-                    pos_idx = src_gid - net.gid_ranges[_long_name(src_type)][0]
-                    # NB pos_dict for this drive must include ALL cell types!
-                    nc_dict['pos_src'] = net.pos_dict[
-                        _long_name(src_type)][pos_idx]
-
-                    # get synapse locations
-                    syn_keys = list()
-                    # Targeting group of sections like proximal or distal
-                    if loc in target_cell.sect_loc:
-                        for sect in target_cell.sect_loc[loc]:
-                            syn_keys.append(f'{sect}_{receptor}')
-                    # Targeting individual section like soma or apical_tuft
-                    else:
-                        syn_keys = [f'{loc}_{receptor}']
-
-                    for syn_key in syn_keys:
-                        nc = target_cell.parconnect_from_src(
-                            src_gid, deepcopy(nc_dict),
-                            target_cell._nrn_synapses[syn_key],
-                            net._inplane_distance)
-                        self.ncs[connection_name].append(nc)
+            nc_dict = conn['nc_dict']
+            # src/target pairs in the order of gid_pairs, restricted to
+            # the targets on current node
+            gid_pairs = conn['gid_pairs']
+            pair_src_gids = gid_pairs._pair_src_gids()
+            is_local = ((cell_idxs[gid_pairs.indices] >= 0) &
+                        ~is_silent[pair_src_gids])
+            src_gids = pair_src_gids[is_local]
+            target_gids = gid_pairs.indices[is_local]
+            if len(src_gids) == 0:
+                continue
+
+            weights, delays = _get_gaussian_connection(
+                gid_pos[src_gids], gid_pos[target_gids], nc_dict,
+                inplane_distance=net._inplane_distance)
+            # per-pair values stored with the connection take precedence
+            if gid_pairs.weights is not None:
+                weights = gid_pairs.weights[is_local]
+            if gid_pairs.delays is not None:
+                delays = gid_pairs.delays[is_local]
+
+            # NetCons with zero weight, e.g., those added in legacy mode to
+            # keep the gid layout, do not change the synaptic states
+            is_nonzero = weights != 0.
+            src_gids, target_gids = src_gids[is_nonzero], target_gids[
+                is_nonzero]
+            weights, delays = weights[is_nonzero], delays[is_nonzero]
+            pattern_gids.update(src_gids[is_drive[src_gids]].tolist())
+
+            # get synapse locations
+            target_sect_loc = net.cell_types[conn['target_type']].sect_loc
+            # Targeting group of sections like proximal or distal
+            if loc in target_sect_loc:
+                syn_keys = [f'{sect}_{receptor}' for sect in
+                            target_sect_loc[loc]]
+            # Targeting individual section like soma or apical_tuft
+            else:
+                syn_keys = [f'{loc}_{receptor}']
+
+            connection_names = list()
+            for gid_type in gid_types:
+                connection_names.append(
+                    f'{_short_name(gid_type)}_'
+                    f'{_short_name(conn["target_type"])}_{receptor}')
+
+            for src_gid, target_gid, weight, delay in zip(
+                    src_gids.tolist(), target_gids.tolist(), weights.tolist(),
+                    delays.tolist()):
+                connection_name = connection_names[gid_type_idx[src_gid]]
+                if connection_name not in self.ncs:
+                    self.ncs[connection_name] = list()
+                target_cell = self._cells[cell_idxs[target_gid]]
+                for syn_key in syn_keys:
+                    # the synapse is on a piece of a split cell on another
+                    # rank
+                    if syn_key not in target_cell._nrn_synapses:
+                        continue
+                    nc = _PC.gid_connect(
+                        src_gid, target_cell._nrn_synapses[syn_key])
+                    nc.threshold = nc_dict['threshold']
+                    nc.weight[0] = weight
+                    nc.delay = delay
+                    self.ncs[connection_name].append(nc)
+
+        if net._pattern_stim:
+            self._pattern_gids = sorted(pattern_gids)
 
     def _record_extracellular(self):
+        # the callback of CVode.extra_scatter_gather is not allowed with
+        # multiple threads, and NEURON keeps refusing threads in a process
+        # once it has been used. So it is only used with MPI, where gathering
+        # after each step would cost a spike exchange at each step.
+        self._step_extracellular = (self._n_threads > 1 or
+                                    _get_nhosts() == 1)
+        cvode = None if self._step_extracellular else _CVODE
         for arr_name, arr in self.net.rec_arrays.items():
             nrn_arr = _ExtracellularArrayBuilder(arr)
-            nrn_arr._build(cvode=_CVODE)
+            nrn_arr._build(cvode=cvode)
             self._nrn_rec_arrays.update({arr_name: nrn_arr})
 
     def _record_spikes(self):
@@ -562,8 +1506,10 @@ class NetworkBuilder(object):
                 nrn_dpl = self._nrn_dipoles[_long_name(cell.name)]
                 nrn_dpl.add(cell.dipole)
 
-            self._vsec[cell.gid] = cell.vsec
-            self._isec[cell.gid] = cell.isec
+            # copies since the pieces of split cells are merged below
+            self._vsec[cell.gid] = dict(cell.vsec)
+            self._isec[cell.gid] = dict(cell.isec)
+            self._varsec[cell.gid] = dict(cell.varsec)
 
         # reduce across threads
         for nrn_dpl in self._nrn_dipoles.values():
@@ -574,6 +1520,20 @@ class NetworkBuilder(object):
         # aggregate the currents and voltages independently on each proc
         vsec_list = _PC.py_gather(self._vsec, 0)
         isec_list = _PC.py_gather(self._isec, 0)
+        varsec_list = _PC.py_gather(self._varsec, 0)
+
+        if self._pattern_stim is not None:
+            self._record_pattern_spikes()
+
+        # the threads record their spikes in turn, and the drive spikes are
+        # appended with a PatternStim, so sort them by time and gid as they
+        # would be recorded by a single thread
+        if self._n_threads > 1 or self._pattern_stim is not None:
+            spike_times = self._spike_times.to_python()
+            spike_gids = self._spike_gids.to_python()
+            order = np.lexsort((spike_gids, spike_times))
+            self._spike_times.from_python(np.array(spike_times)[order])
+            self._spike_gids.from_python(np.array(spike_gids)[order])
 
         # combine spiking data from each proc
         spike_times_list = _PC.py_gather(self._spike_times, 0)
@@ -586,35 +1546,51 @@ class NetworkBuilder(object):
             for spike_vec in spike_gids_list:
                 self._all_spike_gids.append(spike_vec)
             for vsec in vsec_list:
-                self._vsec.update(vsec)
+                for gid, vsec_gid in vsec.items():
+                    self._vsec.setdefault(gid, dict()).update(vsec_gid)
             for isec in isec_list:
-                self._isec.update(isec)
+                for gid, isec_gid in isec.items():
+                    self._isec.setdefault(gid, dict()).update(isec_gid)
+            for varsec in varsec_list:
+                for gid, varsec_gid in varsec.items():
+                    self._varsec.setdefault(gid, dict()).update(varsec_gid)
 
         _PC.barrier()  # get all nodes to this place before continuing
 
     def state_init(self):
         """Initializes the state closer to baseline."""
 
+        if self.net._steady_states is not None:
+            self._restore_steady_states(state_names=['v'])
+            return
+
+        for cell in self._cells:
+            _init_cell_voltages(cell)
+
+    def _restore_steady_states(self, state_names=None):
+        """Set the states of the cells to the steady states of their types.
+
+        The membrane potentials are set before h.finitialize(), which
+        initializes the states of the mechanisms (and the dipoles) from them,
+        and the other states are restored afterwards (see
+        _get_steady_states).
+
+        Parameters
+        ----------
+        state_names : list of str | None
+            The names of the states to restore. If None, all states are
+            restored.
+        """
         for cell in self._cells:
-            seclist = h.SectionList()
-            seclist.wholetree(sec=cell._nrn_sections['soma'])
-            for sect in seclist:
-                for seg in sect:
-                    if cell.name == 'L2Pyr':
-                        seg.v = -71.46
-                    elif cell.name == 'L5Pyr':
-                        if sect.name() == 'L5Pyr_apical_1':
-                            seg.v = -71.32
-                        elif sect.name() == 'L5Pyr_apical_2':
-                            seg.v = -69.08
-                        elif sect.name() == 'L5Pyr_apical_tuft':
-                            seg.v = -67.30
-                        else:
-                            seg.v = -72.
-                    elif cell.name == 'L2Basket':
-                        seg.v = -64.9737
-                    elif cell.name == 'L5Basket':
-                        seg.v = -64.9737
+            cell_states = self.net._steady_states[
+                self.net.gid_to_type(cell.gid)]
+            # only the sections on this rank if the cell is split
+            for sec_name, sec in cell._nrn_sections.items():
+                sec_states = cell_states[sec_name]
+                for state_name in (state_names or sec_states):
+                    for seg, value in zip(sec,
+                                          sec_states[state_name].tolist()):
+                        setattr(seg, state_name, value)
 
     def _clear_neuron_objects(self):
         """Clear up NEURON internal gid and reference information.
@@ -648,6 +1624,10 @@ class NetworkBuilder(object):
         self._gid_list = list()
         self._cells = list()
         self._drive_cells = list()
+        self._restart_netcons = list()
+        self._pattern_stim = None
+        self._pattern_gids = list()
+        self._pattern_vecs = None
 
         # NB needed if multiple simulations are run in same python proc.
         # removes callbacks used to gather transmembrane currents
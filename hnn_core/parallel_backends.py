@@ -8,20 +8,35 @@ import sys
 import re
 import multiprocessing
 import shlex
+import shutil
+import struct
+import tempfile
+import weakref
+import zlib
 import pickle
-import base64
 from warnings import warn
 from subprocess import Popen, PIPE, TimeoutExpired
-import binascii
 from queue import Queue, Empty
 from threading import Thread, Event
 
+import numpy as np
+
 from .cell_response import CellResponse
 from .dipole import Dipole
-from .network_builder import _simulate_single_trial
+from .network_builder import (_simulate_single_trial, _get_cell_pieces,
+                              NetworkBuilder)
+from .externals.mne import _validate_type
 
 _BACKEND = None
 
+# files exchanged with mpi_child.py in a temporary directory
+_NET_FNAME = 'net.bin'
+_DATA_FNAME = 'data.bin'
+# magic bytes, number of frames and whether the frames are compressed
+_FRAMES_HEADER = struct.Struct('<4sQ?')
+_FRAMES_MAGIC = b'HNNF'
+_FRAME_LENGTH = struct.Struct('<Q')
+
 
 def _thread_handler(event, out, queue):
     while not event.is_set():
@@ -31,28 +46,109 @@ def _thread_handler(event, out, queue):
         queue.put(line)
 
 
+def _simulate_trial_block(net, tstop, dt, trial_idxs, n_threads=1,
+                          postproc=False, reduce=None):
+    """Simulate a block of trials, building the NEURON model only once
+
+    The model built for the first trial of the block is reused by all
+    following trials, which only differ in the event times of the drives.
+    If ``reduce`` is not None, the data of each trial is replaced by its
+    output (see _reduce_trial_data).
+    """
+    sim_data = list()
+    for trial_idx in trial_idxs:
+        reuse_network = trial_idx != trial_idxs[0]
+        trial_data = _simulate_single_trial(net, tstop, dt, trial_idx,
+                                            reuse_network=reuse_network,
+                                            n_threads=n_threads)
+        if reduce is not None:
+            trial_data = _reduce_trial_data(trial_data, net, postproc, reduce)
+        sim_data.append(trial_data)
+    return sim_data
+
+
+def _simulate_forked_block(net, tstop, dt, trial_idxs, data_fname,
+                           postproc=False, reduce=None):
+    """Simulate a block of trials in a forked process
+
+    All trials reuse the NEURON model that was built before forking. The data
+    is written to ``data_fname`` (see _write_frames).
+    """
+    sim_data = list()
+    for trial_idx in trial_idxs:
+        trial_data = _simulate_single_trial(net, tstop, dt, trial_idx,
+                                            reuse_network=True)
+        if reduce is not None:
+            trial_data = _reduce_trial_data(trial_data, net, postproc, reduce)
+        sim_data.append(trial_data)
+    _write_frames(data_fname, sim_data)
+
+
+def _get_trial_dipole(trial_data, net, postproc):
+    """Create the Dipole of a trial from its simulated data"""
+    dpl = Dipole(times=trial_data['times'], data=trial_data['dpl_data'])
+
+    N_pyr_x = net._params['N_pyr_x']
+    N_pyr_y = net._params['N_pyr_y']
+    # trials starting from the steady states continue the baseline at the
+    # end of the burn-in
+    t0 = 0. if net._burn_in is None else net._burn_in
+    dpl._baseline_renormalize(N_pyr_x, N_pyr_y, t0=t0)  # XXX cf. #270
+    dpl._convert_fAm_to_nAm()  # always applied, cf. #264
+    if postproc:
+        window_len = net._params['dipole_smooth_win']  # specified in ms
+        fctr = net._params['dipole_scalefctr']
+        if window_len > 0:  # param files set this to zero for no smoothing
+            dpl.smooth(window_len=window_len)
+        if fctr > 0:
+            dpl.scale(fctr)
+    return dpl
+
+
+def _append_trial_response(cell_response, trial_data, gid_ranges):
+    """Append the spikes and section traces of a trial to a CellResponse"""
+    cell_response._spike_times.append(trial_data['spike_times'].tolist())
+    cell_response._spike_gids.append(trial_data['spike_gids'].tolist())
+    cell_response.update_types(gid_ranges)
+    cell_response._vsec.append(trial_data['vsec'])
+    cell_response._isec.append(trial_data['isec'])
+    cell_response._varsec.append(trial_data['varsec'])
+
+
+def _reduce_trial_data(trial_data, net, postproc, reduce):
+    """Reduce the data of a trial with a reducer
+
+    Called in the worker simulating the trial so that only the output of
+    ``reduce`` has to be sent back (see simulate_dipole).
+    """
+    dpl = _get_trial_dipole(trial_data, net, postproc)
+    cell_response = CellResponse(times=trial_data['sec_times'],
+                                 cell_type_names=list(net.cell_types.keys()))
+    _append_trial_response(cell_response, trial_data, net.gid_ranges)
+    return reduce(dpl, cell_response, net)
+
+
 def _gather_trial_data(sim_data, net, n_trials, postproc):
     """Arrange data by trial
 
     To be called after simulate(). Returns list of Dipoles, one for each trial,
-    and saves spiking info in net (instance of Network).
+    and saves spiking info in net (instance of Network). The arrays of the
+    simulated data are used as is, except for the spikes, which CellResponse
+    holds as lists.
     """
     dpls = list()
 
     # Create array of equally sampled time points for simulating currents
     cell_type_names = list(net.cell_types.keys())
-    cell_response = CellResponse(times=sim_data[0]['times'],
+    cell_response = CellResponse(times=sim_data[0]['sec_times'],
                                  cell_type_names=cell_type_names)
     net.cell_response = cell_response
 
     for idx in range(n_trials):
 
         # cell response
-        net.cell_response._spike_times.append(sim_data[idx]['spike_times'])
-        net.cell_response._spike_gids.append(sim_data[idx]['spike_gids'])
-        net.cell_response.update_types(net.gid_ranges)
-        net.cell_response._vsec.append(sim_data[idx]['vsec'])
-        net.cell_response._isec.append(sim_data[idx]['isec'])
+        _append_trial_response(net.cell_response, sim_data[idx],
+                               net.gid_ranges)
 
         # extracellular array
         for arr_name, arr in net.rec_arrays.items():
@@ -61,25 +157,19 @@ def _gather_trial_data(sim_data, net, n_trials, postproc):
             arr._times = sim_data[idx]['rec_times'][arr_name]
 
         # dipole
-        dpl = Dipole(times=sim_data[idx]['times'],
-                     data=sim_data[idx]['dpl_data'])
-
-        N_pyr_x = net._params['N_pyr_x']
-        N_pyr_y = net._params['N_pyr_y']
-        dpl._baseline_renormalize(N_pyr_x, N_pyr_y)  # XXX cf. #270
-        dpl._convert_fAm_to_nAm()  # always applied, cf. #264
-        if postproc:
-            window_len = net._params['dipole_smooth_win']  # specified in ms
-            fctr = net._params['dipole_scalefctr']
-            if window_len > 0:  # param files set this to zero for no smoothing
-                dpl.smooth(window_len=window_len)
-            if fctr > 0:
-                dpl.scale(fctr)
-        dpls.append(dpl)
+        dpls.append(_get_trial_dipole(sim_data[idx], net, postproc))
 
     return dpls
 
 
+def _check_n_threads(n_threads):
+    """Check the number of NEURON threads requested for each process."""
+    _validate_type(n_threads, 'int', 'n_threads')
+    if n_threads < 1:
+        raise ValueError(f'n_threads must be at least 1, got {n_threads}')
+    return n_threads
+
+
 def _get_mpi_env():
     """Set some MPI environment variables."""
     my_env = os.environ.copy()
@@ -92,31 +182,132 @@ def _get_mpi_env():
     return my_env
 
 
-def run_subprocess(command, obj, timeout, proc_queue=None, *args, **kwargs):
+def _write_frames(fname, obj, compress=False):
+    """Write an object to a binary file as length-prefixed frames.
+
+    The object is pickled with protocol 5, such that large contiguous buffers
+    (e.g., of NumPy arrays) are written out-of-band rather than copied into
+    the pickle. After a header, the file holds the length and bytes of each
+    frame: first the pickle, then each of its buffers.
+
+    Parameters
+    ----------
+    fname : str
+        The name of the file to write.
+    obj : object
+        The object to write.
+    compress : bool
+        If True, each frame is compressed with zlib. Default: False.
+
+    Returns
+    -------
+    n_bytes : int
+        The size of the file in bytes.
+    """
+    buffers = list()
+    pickled = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    frames = [pickled] + [buffer.raw() for buffer in buffers]
+    with open(fname, 'wb') as f:
+        f.write(_FRAMES_HEADER.pack(_FRAMES_MAGIC, len(frames), compress))
+        for frame in frames:
+            if compress:
+                frame = zlib.compress(frame, 1)
+            f.write(_FRAME_LENGTH.pack(len(frame)))
+            f.write(frame)
+        return f.tell()
+
+
+def _read_frames(fname):
+    """Read an object written by _write_frames.
+
+    The out-of-band buffers are read into separate bytearrays, which the
+    unpickled object (e.g., NumPy arrays) uses without copying them.
+
+    Parameters
+    ----------
+    fname : str
+        The name of the file to read.
+
+    Returns
+    -------
+    obj : object
+        The object.
+    """
+    with open(fname, 'rb') as f:
+        header = f.read(_FRAMES_HEADER.size)
+        if len(header) < _FRAMES_HEADER.size or \
+                header[:len(_FRAMES_MAGIC)] != _FRAMES_MAGIC:
+            raise ValueError(f'{fname} does not contain framed data')
+        _, n_frames, compress = _FRAMES_HEADER.unpack(header)
+
+        frames = list()
+        for _ in range(n_frames):
+            length = f.read(_FRAME_LENGTH.size)
+            if len(length) < _FRAME_LENGTH.size:
+                raise ValueError(f'{fname} is truncated')
+            frame = bytearray(_FRAME_LENGTH.unpack(length)[0])
+            if f.readinto(frame) != len(frame):
+                raise ValueError(f'{fname} is truncated')
+            if compress:
+                frame = bytearray(zlib.decompress(frame))
+            frames.append(frame)
+
+    return pickle.loads(frames[0], buffers=frames[1:])
+
+
+def run_subprocess(command, obj, timeout, proc_queue=None, *args,
+                   compress=False, transport_dir=None, **kwargs):
     """Run process and communicate with it.
+
+    The object and the data returned by the child process are exchanged as
+    files in a temporary directory (see _write_frames), whose name is written
+    to stdin of the child process.
+
     Parameters
     ----------
     command : list of str | str
         Command to run as subprocess (see subprocess.Popen documentation).
     obj : object
-        The object to write to stdin after starting child process
-        with MPI command.
+        The object to send after starting child process with MPI command.
     timeout : float
         The number of seconds to wait for a process without output.
-    *args, **kwargs : arguments
+    *args : arguments
+        Additional arguments to pass to subprocess.Popen.
+    compress : bool
+        If True, the object is compressed. Default: False.
+    transport_dir : str | None
+        The directory in which the temporary directory is created. It must
+        be accessible to the child process. If None, the default directory
+        for temporary files is used (see tempfile.gettempdir).
+    **kwargs : arguments
         Additional arguments to pass to subprocess.Popen.
     Returns
     -------
     child_data : object
         The data returned by the child process.
     """
-    proc_data_bytes = b''
     # each loop while waiting will involve two Queue.get() timeouts, each
     # 0.01s. This caclulation will error on the side of a longer timeout
     # than is specified because more is done each loop that just Queue.get()
     timeout_cycles = timeout / 0.02
 
-    pickled_obj = base64.b64encode(pickle.dumps(obj))
+    transport_dir = tempfile.mkdtemp(prefix='hnn_core_', dir=transport_dir)
+    try:
+        _write_frames(os.path.join(transport_dir, _NET_FNAME), obj,
+                      compress=compress)
+        proc, child_data = _communicate(
+            command, transport_dir, timeout_cycles, proc_queue, *args,
+            **kwargs)
+    finally:
+        shutil.rmtree(transport_dir, ignore_errors=True)
+
+    return proc, child_data
+
+
+def _communicate(command, transport_dir, timeout_cycles, proc_queue, *args,
+                 **kwargs):
+    """Run the child process of run_subprocess until it returns its data."""
+    data_len = 0
 
     # non-blocking adapted from https://stackoverflow.com/questions/375427/non-blocking-read-on-a-subprocess-pipe-in-python#4896288  # noqa: E501
     out_q = Queue()
@@ -157,7 +348,7 @@ def run_subprocess(command, obj, timeout, proc_queue=None, *args, **kwargs):
                 else:
                     count_since_last_output += 1
                 # look for data in stderr and print child stdout
-                data_len, proc_data_bytes = _get_data_from_child_err(err_q)
+                data_len = _get_data_from_child_err(err_q)
                 if data_len > 0:
                     data_received = True
                     _write_child_exit_signal(proc.stdin)
@@ -169,11 +360,12 @@ def run_subprocess(command, obj, timeout, proc_queue=None, *args, **kwargs):
                     break
 
             if not sent_network:
-                # Send network object to child so it can start
+                # Send the directory with the network object to child so it
+                # can start
                 try:
-                    _write_net(proc.stdin, pickled_obj)
+                    _write_transport_dir(proc.stdin, transport_dir)
                 except BrokenPipeError:
-                    # child failed during _write_net(). get the
+                    # child failed during _write_transport_dir(). get the
                     # output and break out of loop on the next
                     # iteration
                     warn("Received BrokenPipeError exception. "
@@ -233,7 +425,8 @@ def run_subprocess(command, obj, timeout, proc_queue=None, *args, **kwargs):
         raise RuntimeError("MPI simulation failed. Return code: %d" %
                            proc.returncode)
 
-    child_data = _process_child_data(proc_data_bytes, data_len)
+    child_data = _process_child_data(
+        os.path.join(transport_dir, _DATA_FNAME), data_len)
 
     # clean up the queue
     try:
@@ -244,40 +437,34 @@ def run_subprocess(command, obj, timeout, proc_queue=None, *args, **kwargs):
     return proc, child_data
 
 
-def _process_child_data(data_bytes, data_len):
+def _process_child_data(data_fname, data_len):
     """Process the data returned by child process.
 
     Parameters
     ----------
-    data_bytes : str
-        The data bytes
+    data_fname : str
+        The name of the file written by the child process.
+    data_len : int
+        The size of the file in bytes reported by the child process.
 
     Returns
     -------
     data_unpickled : object
         The unpickled data.
     """
-    if not data_len == len(data_bytes):
+    n_bytes = 0
+    if os.path.exists(data_fname):
+        n_bytes = os.path.getsize(data_fname)
+
+    if not data_len == n_bytes:
         # This is indicative of a failure. For debugging purposes.
         warn("Length of received data unexpected. Expecting %d bytes, "
-             "got %d" % (data_len, len(data_bytes)))
+             "got %d" % (data_len, n_bytes))
 
-    if len(data_bytes) == 0:
+    if n_bytes == 0:
         raise RuntimeError("MPI simulation didn't return any data")
 
-    # decode base64 byte string
-    try:
-        data_pickled = base64.b64decode(data_bytes, validate=True)
-    except binascii.Error:
-        # This is here for future debugging purposes. Unit tests can't
-        # reproduce an incorrectly padded string, but this has been an
-        # issue before
-        raise ValueError("Incorrect padding for data length %d bytes" %
-                         len(data_len) + " (mod 4 = %d)" %
-                         (len(data_len) % 4))
-
-    # unpickle the data
-    return pickle.loads(data_pickled)
+    return _read_frames(data_fname)
 
 
 def _echo_child_output(out_q):
@@ -297,7 +484,6 @@ def _echo_child_output(out_q):
 def _get_data_from_child_err(err_q):
     err = ''
     data_length = 0
-    data_bytes = b''
 
     while True:
         try:
@@ -305,22 +491,15 @@ def _get_data_from_child_err(err_q):
         except Empty:
             break
 
-    # check for data signal
-    extracted_data = _extract_data(err, 'data')
-    if len(extracted_data) > 0:
-        # _extract_data only returns data when signals on
-        # both sides were seen
-
-        err = err.replace('@start_of_data@', '')
-        err = err.replace(extracted_data, '')
+    # check for the signal that the data file was written
+    if re.search(r'@end_of_data:\d+@', err) is not None:
         data_length = _extract_data_length(err, 'data')
         err = err.replace('@end_of_data:%d@\n' % data_length, '')
-        data_bytes = extracted_data.encode()
 
     # print the rest of the child's stderr to our stdout
     sys.stdout.write(err)
 
-    return data_length, data_bytes
+    return data_length
 
 
 def _has_mpi4py():
@@ -386,23 +565,6 @@ def _extract_data_length(data_str, object_name):
         raise ValueError("Couldn't find data length in string")
 
 
-def _extract_data(data_str, object_name):
-    start_idx = 0
-    end_idx = 0
-    start_match = re.search('@start_of_%s@' % object_name, data_str)
-    if start_match is not None:
-        start_idx = start_match.end()
-    else:
-        # need start signal
-        return ''
-
-    end_match = re.search('@end_of_%s:' % object_name + r'\d+@', data_str)
-    if end_match is not None:
-        end_idx = end_match.start()
-
-    return data_str[start_idx:end_idx]
-
-
 # Next 3 functions are from HNN. Will move here. They require psutil
 def _kill_procs(procs):
     """Tries to terminate processes in a list before sending kill signal"""
@@ -469,11 +631,9 @@ def kill_proc_name(proc_name):
     return killed_procs
 
 
-def _write_net(stream, pickled_net):
+def _write_transport_dir(stream, transport_dir):
     stream.flush()
-    stream.write('@start_of_net@')
-    stream.write(pickled_net.decode())
-    stream.write('@end_of_net:%d@\n' % len(pickled_net))
+    stream.write('@transport_dir:%s@\n' % transport_dir)
     stream.flush()
 
 
@@ -483,6 +643,158 @@ def _write_child_exit_signal(stream):
     stream.flush()
 
 
+class _MPIWorkerPool(object):
+    """MPI processes that simulate one network after another.
+
+    Unlike run_subprocess, which starts mpi_child.py for a single simulation,
+    the processes keep NEURON and the mechanisms loaded until close() sends
+    them the exit signal.
+
+    Parameters
+    ----------
+    command : list of str | str
+        Command to run as subprocess (see subprocess.Popen documentation).
+    *args : arguments
+        Additional arguments to pass to subprocess.Popen.
+    transport_dir : str | None
+        The directory in which the temporary directory of the exchanged files
+        is created (see run_subprocess).
+    **kwargs : arguments
+        Additional arguments to pass to subprocess.Popen.
+
+    Attributes
+    ----------
+    proc : subprocess.Popen
+        The handle of the MPI processes.
+    transport_dir : str
+        The temporary directory of the files exchanged with the processes.
+    """
+    def __init__(self, command, *args, transport_dir=None, **kwargs):
+        self.transport_dir = tempfile.mkdtemp(prefix='hnn_core_',
+                                              dir=transport_dir)
+        self.proc = Popen(command, stdin=PIPE, stdout=PIPE, stderr=PIPE,
+                          *args, **kwargs)
+
+        self._out_q = Queue()
+        self._err_q = Queue()
+        self._event = Event()
+        self._threads = [
+            Thread(target=_thread_handler, args=(self._event, out, queue))
+            for out, queue in ((self.proc.stdout, self._out_q),
+                               (self.proc.stderr, self._err_q))]
+        for thread in self._threads:
+            thread.start()
+
+    def is_alive(self):
+        """Whether the processes are running."""
+        return self.proc.poll() is None
+
+    def simulate(self, obj, timeout, proc_queue=None, compress=False):
+        """Send an object to the processes and wait for their data.
+
+        Parameters
+        ----------
+        obj : object
+            The object to send to the processes.
+        timeout : float
+            The number of seconds to wait for the processes without output.
+        proc_queue : threading.Queue | None
+            The queue holding the handle of the processes while they
+            simulate, used by MPIBackend.terminate().
+        compress : bool
+            If True, the object is compressed. Default: False.
+
+        Returns
+        -------
+        child_data : object
+            The data returned by the processes.
+        """
+        # see run_subprocess
+        timeout_cycles = timeout / 0.02
+
+        data_fname = os.path.join(self.transport_dir, _DATA_FNAME)
+        if os.path.exists(data_fname):
+            os.remove(data_fname)
+        _write_frames(os.path.join(self.transport_dir, _NET_FNAME), obj,
+                      compress=compress)
+
+        if proc_queue is not None:
+            proc_queue.put(self.proc)
+
+        data_len = 0
+        count_since_last_output = 0
+        try:
+            _write_transport_dir(self.proc.stdin, self.transport_dir)
+            while True:
+                if _echo_child_output(self._out_q):
+                    count_since_last_output = 0
+                else:
+                    count_since_last_output += 1
+                data_len = _get_data_from_child_err(self._err_q)
+                if data_len > 0:
+                    break
+                if not self.is_alive():
+                    warn("Child process failed unexpectedly")
+                    break
+                if count_since_last_output > timeout_cycles:
+                    warn("Timeout exceeded while waiting for child process "
+                         "output. Terminating...")
+                    kill_proc_name('nrniv')
+                    break
+        except BrokenPipeError:
+            warn("Received BrokenPipeError exception. "
+                 "Child process failed unexpectedly")
+        except KeyboardInterrupt:
+            warn("Received KeyboardInterrupt. Stopping simulation process...")
+            kill_proc_name('nrniv')
+        finally:
+            # clean up the queue
+            if proc_queue is not None:
+                try:
+                    proc_queue.get_nowait()
+                except Empty:
+                    pass
+
+        if data_len == 0:
+            self.close()
+            raise RuntimeError("MPI simulation failed. Return code: %d" %
+                               self.proc.returncode)
+
+        return _process_child_data(data_fname, data_len)
+
+    def close(self, timeout=5):
+        """Send the exit signal and wait for the processes to terminate.
+
+        Parameters
+        ----------
+        timeout : float
+            The number of seconds to wait before killing the processes.
+        """
+        if self.is_alive():
+            try:
+                _write_child_exit_signal(self.proc.stdin)
+            except BrokenPipeError:
+                pass
+            try:
+                self.proc.wait(timeout)
+            except TimeoutExpired:
+                warn("Could not stop MPI processes. Killing PID %d" %
+                     self.proc.pid)
+                self.proc.kill()
+                self.proc.wait()
+
+        # the threads stop reading once the pipes are closed
+        self._event.set()
+        for thread in self._threads:
+            thread.join()
+        _echo_child_output(self._out_q)
+        _get_data_from_child_err(self._err_q)
+        for stream in (self.proc.stdin, self.proc.stdout, self.proc.stderr):
+            stream.close()
+
+        shutil.rmtree(self.transport_dir, ignore_errors=True)
+
+
 class JoblibBackend(object):
     """The JoblibBackend class.
 
@@ -491,14 +803,37 @@ class JoblibBackend(object):
     n_jobs : int | None
         The number of jobs to start in parallel. If None, then 1 trial will be
         started without parallelism
+    n_threads : int
+        The number of threads over which NEURON distributes the cells within
+        each job (see ``ParallelContext.nthread`` in NEURON). This speeds up
+        single trials on multiple cores without MPI. Default: 1.
+    fork : bool
+        If True, the NEURON model is built once in this process, which then
+        forks one process per job instead of using joblib. The jobs share
+        the model and the network copy-on-write rather than receiving a
+        pickled copy of the network and building the model again, and return
+        their data through shared memory. Only supported on Linux and with
+        ``n_threads=1``. Default: False.
 
     Attributes
     ----------
     n_jobs : int
         The number of jobs to start in parallel
+    n_threads : int
+        The number of threads used by each job
+    fork : bool
+        Whether the jobs are forked from this process.
     """
-    def __init__(self, n_jobs=1):
+    def __init__(self, n_jobs=1, n_threads=1, fork=False):
         self.n_jobs = n_jobs
+        self.n_threads = _check_n_threads(n_threads)
+        if fork and not sys.platform.startswith('linux'):
+            warn('fork is only supported on Linux. Using joblib instead.')
+            fork = False
+        if fork and self.n_threads > 1:
+            raise ValueError(f'fork=True cannot be used with multiple '
+                             f'threads, got n_threads={self.n_threads}')
+        self.fork = fork
 
     def _parallel_func(self, func):
         if self.n_jobs != 1:
@@ -529,7 +864,8 @@ class JoblibBackend(object):
 
         _BACKEND = self._old_backend
 
-    def simulate(self, net, tstop, dt, n_trials, postproc=False):
+    def simulate(self, net, tstop, dt, n_trials, postproc=False,
+                 reduce=None):
         """Simulate the HNN model
 
         Parameters
@@ -545,24 +881,99 @@ class JoblibBackend(object):
             The integration time step of h.CVode (ms)
         postproc : bool
             If False, no postprocessing applied to the dipole
+        reduce : callable | None
+            If not None, the function applied to the results of each trial by
+            the job simulating it (see simulate_dipole).
 
         Returns
         -------
-        dpl: list of Dipole
-            The Dipole results from each simulation trial
+        dpl: list of Dipole | list
+            The Dipole results from each simulation trial, or the outputs of
+            ``reduce`` if it is not None.
         """
 
         print(f"Joblib will run {n_trials} trial(s) in parallel by "
               f"distributing trials over {self.n_jobs} jobs.")
-        parallel, myfunc = self._parallel_func(_simulate_single_trial)
-        sim_data = parallel(myfunc(net, tstop, dt, trial_idx) for
-                            trial_idx in range(n_trials))
+        if self.fork:
+            parallel, myfunc = list, _simulate_trial_block
+        else:
+            parallel, myfunc = self._parallel_func(_simulate_trial_block)
+
+        # each job simulates a contiguous block of trials so that the NEURON
+        # model is built once per job rather than once per trial
+        n_jobs = self.n_jobs
+        if self.fork:
+            # same convention as joblib, which is not needed to fork
+            if n_jobs is None:
+                n_jobs = 1
+            elif n_jobs < 0:
+                n_jobs = max(multiprocessing.cpu_count() + 1 + n_jobs, 1)
+        elif n_jobs != 1:
+            from joblib import effective_n_jobs
+            n_jobs = effective_n_jobs(n_jobs)
+        n_blocks = min(n_trials, n_jobs)
+        trial_blocks = [block.tolist() for block in
+                        np.array_split(np.arange(n_trials), n_blocks)]
+        if self.fork and n_blocks > 1:
+            sim_data = self._simulate_forked(net, tstop, dt, trial_blocks,
+                                             postproc=postproc, reduce=reduce)
+        else:
+            sim_data = parallel(myfunc(net, tstop, dt, trial_idxs,
+                                       n_threads=self.n_threads,
+                                       postproc=postproc, reduce=reduce) for
+                                trial_idxs in trial_blocks)
+        sim_data = [trial_data for block_data in sim_data
+                    for trial_data in block_data]
+        if reduce is not None:
+            return sim_data
 
         dpls = _gather_trial_data(sim_data, net=net, n_trials=n_trials,
                                   postproc=postproc)
 
         return dpls
 
+    def _simulate_forked(self, net, tstop, dt, trial_blocks, postproc=False,
+                         reduce=None):
+        """Simulate each block of trials in a process forked after building
+
+        The data of each process is written to a file in /dev/shm, i.e., in
+        shared memory, if available.
+        """
+        # the forked processes reuse this model for all their trials
+        NetworkBuilder(net, trial_idx=trial_blocks[0][0])
+
+        context = multiprocessing.get_context('fork')
+        shm_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+        transport_dir = tempfile.mkdtemp(prefix='hnn_core_', dir=shm_dir)
+        procs = list()
+        try:
+            for block_idx, trial_idxs in enumerate(trial_blocks):
+                data_fname = os.path.join(transport_dir, f'{block_idx}.bin')
+                proc = context.Process(
+                    target=_simulate_forked_block,
+                    args=(net, tstop, dt, trial_idxs, data_fname, postproc,
+                          reduce))
+                proc.start()
+                procs.append(proc)
+
+            sim_data = list()
+            for block_idx, (proc, trial_idxs) in enumerate(
+                    zip(procs, trial_blocks)):
+                proc.join()
+                if proc.exitcode != 0:
+                    raise RuntimeError(f'Simulation of trials {trial_idxs} '
+                                       f'failed. Exit code: {proc.exitcode}')
+                sim_data.append(_read_frames(
+                    os.path.join(transport_dir, f'{block_idx}.bin')))
+        finally:
+            for proc in procs:
+                if proc.is_alive():
+                    proc.terminate()
+                    proc.join()
+            shutil.rmtree(transport_dir, ignore_errors=True)
+
+        return sim_data
+
 
 class MPIBackend(object):
     """The MPIBackend class.
@@ -576,6 +987,44 @@ class MPIBackend(object):
     mpi_cmd : str
         The name of the mpi launcher executable. Will use 'mpiexec'
         (openmpi) by default.
+    multisplit : bool
+        If True, pyramidal cells may be split into pieces that are
+        integrated on different MPI processes, such that more processes
+        than cells can be used (see ``ParallelContext.multisplit`` in
+        NEURON). Default: False.
+    n_threads : int
+        The number of threads over which NEURON distributes the cells within
+        each MPI process (see ``ParallelContext.nthread`` in NEURON).
+        Default: 1.
+    n_subworlds : int
+        The number of groups into which the MPI processes are split (see
+        ``ParallelContext.subworlds`` in NEURON). Each group simulates a
+        block of the trials in parallel to the others, with the cells
+        distributed over its ``n_procs // n_subworlds`` processes. This
+        limits the cost of spike exchange when using many processes for
+        many trials. Must divide ``n_procs``. Default: 1.
+    compress : bool
+        If True, the network sent to the MPI processes and the simulated data
+        sent back are compressed. This reduces the size of the temporary
+        files holding them at the cost of compression time, e.g., for large
+        recordings of voltages or extracellular potentials. Default: False.
+    persistent : bool
+        If True, the MPI processes are started when entering the context of
+        the backend and run all simulations until the context exits, rather
+        than being started for each simulation. This avoids the time spent
+        launching MPI and loading NEURON for each of many short simulations,
+        e.g., when optimizing parameters. If ``simulate`` is called outside
+        of the context, the processes are started by the first simulation and
+        stopped once the backend is garbage collected or Python exits.
+        Default: False.
+    transport_dir : str | path-like | None
+        The directory in which the network and the simulated data are
+        exchanged with the MPI processes, through files in a temporary
+        subdirectory. It must be accessible to rank 0 of the MPI processes,
+        e.g., on a shared file system if rank 0 runs on another host. If None,
+        the default directory for temporary files is used, given by the
+        ``TMPDIR`` environment variable (see ``tempfile.gettempdir``).
+        Default: None.
 
     Attributes
     ----------
@@ -586,6 +1035,18 @@ class MPIBackend(object):
         with the JoblibBackend
     mpi_cmd : list of str
         The mpi command with number of procs and options to be passed to Popen
+    multisplit : bool
+        Whether pyramidal cells may be split across MPI processes.
+    n_threads : int
+        The number of threads used by each MPI process.
+    n_subworlds : int
+        The number of groups of MPI processes simulating trials in parallel.
+    compress : bool
+        Whether the data exchanged with the MPI processes is compressed.
+    persistent : bool
+        Whether the MPI processes run all simulations within the context.
+    transport_dir : str | None
+        The directory of the files exchanged with the MPI processes.
     expected_data_length : int
         Used to check consistency between data that was sent and what
         MPIBackend received.
@@ -594,10 +1055,25 @@ class MPIBackend(object):
         There will be a valid process handle present the queue when a MPI
         åsimulation is running.
     """
-    def __init__(self, n_procs=None, mpi_cmd='mpiexec'):
+    def __init__(self, n_procs=None, mpi_cmd='mpiexec', multisplit=False,
+                 n_threads=1, n_subworlds=1, compress=False,
+                 persistent=False, transport_dir=None):
         self.expected_data_length = 0
+        self.multisplit = multisplit
+        self.n_threads = _check_n_threads(n_threads)
+        _validate_type(n_subworlds, 'int', 'n_subworlds')
+        self.n_subworlds = n_subworlds
+        self.compress = compress
+        self.persistent = persistent
+        _validate_type(transport_dir, (str, 'path-like', None),
+                       'transport_dir')
+        if transport_dir is not None:
+            transport_dir = os.path.abspath(str(transport_dir))
+        self.transport_dir = transport_dir
         self.proc = None
         self.proc_queue = Queue()
+        self._pool = None
+        self._pool_finalizer = None
 
         n_logical_cores = multiprocessing.cpu_count()
         if n_procs is None:
@@ -631,6 +1107,12 @@ class MPIBackend(object):
             warn(f'{packages} not installed. Will run on single processor')
             self.n_procs = 1
 
+        if self.n_procs > 1 and (self.n_subworlds < 1 or
+                                 self.n_procs % self.n_subworlds != 0):
+            raise ValueError(f'n_procs must be divisible by n_subworlds, got '
+                             f'n_procs={self.n_procs} and '
+                             f'n_subworlds={self.n_subworlds}')
+
         self.mpi_cmd = mpi_cmd
 
         if hyperthreading:
@@ -659,6 +1141,9 @@ class MPIBackend(object):
         self._old_backend = _BACKEND
         _BACKEND = self
 
+        if self.persistent and self.n_procs > 1:
+            self._start_pool()
+
         return self
 
     def __exit__(self, type, value, traceback):
@@ -666,11 +1151,30 @@ class MPIBackend(object):
 
         _BACKEND = self._old_backend
 
+        if self._pool is not None:
+            self._pool_finalizer()
+            self._pool = None
+
         # always kill nrniv processes for good measure
         if self.n_procs > 1:
             kill_proc_name('nrniv')
 
-    def simulate(self, net, tstop, dt, n_trials, postproc=False):
+    def _start_pool(self):
+        """Start the persistent MPI processes unless they are running."""
+        if self._pool is None or not self._pool.is_alive():
+            if self._pool is not None:
+                self._pool_finalizer()
+            self._pool = _MPIWorkerPool(
+                self.mpi_cmd, transport_dir=self.transport_dir,
+                env=_get_mpi_env(), cwd=os.getcwd(), universal_newlines=True)
+            self.proc = self._pool.proc
+            # the processes are closed when leaving the context, or else
+            # when the backend is garbage collected or Python exits, e.g.,
+            # if simulate() was called outside of the context
+            self._pool_finalizer = weakref.finalize(self, self._pool.close)
+
+    def simulate(self, net, tstop, dt, n_trials, postproc=False,
+                 reduce=None):
         """Simulate the HNN model in parallel on all cores
 
         Parameters
@@ -686,39 +1190,75 @@ class MPIBackend(object):
             Number of trials to simulate.
         postproc : bool
             If False, no postprocessing applied to the dipole
+        reduce : callable | None
+            If not None, the function applied to the results of each trial by
+            rank 0 of the MPI processes simulating it (see simulate_dipole).
+            It is pickled by reference, so it must be importable by the MPI
+            processes, e.g., a function defined at the top level of a module.
 
         Returns
         -------
-        dpl : list of Dipole
-            The Dipole results from each simulation trial
+        dpl : list of Dipole | list
+            The Dipole results from each simulation trial, or the outputs of
+            ``reduce`` if it is not None.
         """
 
         # just use the joblib backend for a single core
         if self.n_procs == 1:
             print("MPIBackend is set to use 1 core: tranferring the "
                   "simulation to JoblibBackend....")
-            return JoblibBackend(n_jobs=1).simulate(net, tstop=tstop,
-                                                    dt=dt,
-                                                    n_trials=n_trials,
-                                                    postproc=postproc)
-
-        if self.n_procs > net._n_cells:
+            return JoblibBackend(
+                n_jobs=1, n_threads=self.n_threads).simulate(
+                    net, tstop=tstop, dt=dt, n_trials=n_trials,
+                    postproc=postproc, reduce=reduce)
+
+        # with multisplit, each piece of a cell can go to a different process
+        n_cells, cells_str = net._n_cells, 'network neurons'
+        if self.multisplit:
+            n_cells = sum(
+                len(_get_cell_pieces(cell)) * len(net.gid_ranges[cell_type])
+                for cell_type, cell in net.cell_types.items())
+            cells_str = 'pieces of network neurons'
+        # with subworlds, the cells are distributed within each subworld
+        n_procs_subworld = self.n_procs // self.n_subworlds
+        procs_str = f'n_procs={self.n_procs}'
+        if self.n_subworlds > 1:
+            procs_str += f', i.e., {n_procs_subworld} per subworld'
+        if n_procs_subworld > n_cells:
             raise ValueError(f'More MPI processes were assigned than there '
                              f'are cells in the network. Please decrease '
-                             f'the number of parallel processes (got n_procs='
-                             f'{self.n_procs}) over which you will '
-                             f'distribute the {net._n_cells} network neurons.')
-
-        print(f"MPI will run {n_trials} trial(s) sequentially by "
-              f"distributing network neurons over {self.n_procs} processes.")
-
-        env = _get_mpi_env()
+                             f'the number of parallel processes (got '
+                             f'{procs_str}) over which you will '
+                             f'distribute the {n_cells} {cells_str}.')
+
+        if self.n_subworlds > 1:
+            print(f"MPI will run {n_trials} trial(s) in {self.n_subworlds} "
+                  f"groups in parallel by distributing network neurons over "
+                  f"the {n_procs_subworld} processes of each group.")
+        else:
+            print(f"MPI will run {n_trials} trial(s) sequentially by "
+                  f"distributing network neurons over {self.n_procs} "
+                  f"processes.")
+
+        obj = [net, tstop, dt, n_trials, self.multisplit, self.n_threads,
+               self.n_subworlds, self.compress, postproc, reduce]
+        if self.persistent:
+            # the processes are restarted if a previous simulation failed
+            self._start_pool()
+            sim_data = self._pool.simulate(
+                obj, timeout=30, proc_queue=self.proc_queue,
+                compress=self.compress)
+        else:
+            env = _get_mpi_env()
 
-        self.proc, sim_data = run_subprocess(
-            command=self.mpi_cmd, obj=[net, tstop, dt, n_trials], timeout=30,
-            proc_queue=self.proc_queue, env=env, cwd=os.getcwd(),
-            universal_newlines=True)
+            self.proc, sim_data = run_subprocess(
+                command=self.mpi_cmd, obj=obj, timeout=30,
+                proc_queue=self.proc_queue, compress=self.compress,
+                transport_dir=self.transport_dir, env=env, cwd=os.getcwd(),
+                universal_newlines=True)
 
+        if reduce is not None:
+            return sim_data
         dpls = _gather_trial_data(sim_data, net, n_trials, postproc)
         return dpls
 
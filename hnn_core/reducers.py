@@ -0,0 +1,82 @@
+"""Functions reducing the results of a trial to summary features."""
+
+import numpy as np
+
+from .externals.mne import _check_option, _validate_type
+
+# frequency bands (Hz) of the 'band_power' reducer
+_BANDS = {'theta': (4., 8.), 'alpha': (8., 13.), 'beta': (13., 30.),
+          'gamma': (30., 80.)}
+
+
+def _spike_rates(dpl, cell_response, net):
+    """Mean spike rate (Hz) of each cell type"""
+    return cell_response.mean_rates(tstart=0., tstop=float(dpl.times[-1]),
+                                    gid_ranges=net.gid_ranges,
+                                    mean_type='all')
+
+
+def _dipole_peak(dpl, cell_response, net):
+    """Latency (ms) and amplitude (nAm) of the largest aggregate dipole"""
+    data = dpl.data['agg']
+    peak_idx = np.argmax(np.abs(data))
+    return {'latency': float(dpl.times[peak_idx]),
+            'amplitude': float(data[peak_idx])}
+
+
+def _band_power(dpl, cell_response, net):
+    """Mean power (nAm^2/Hz) of the aggregate dipole in each band of _BANDS"""
+    from scipy.signal import periodogram
+
+    freqs, psd = periodogram(dpl.data['agg'], dpl.sfreq, window='hamming')
+    band_power = dict()
+    for band, (fmin, fmax) in _BANDS.items():
+        mask = (freqs >= fmin) & (freqs < fmax)
+        band_power[band] = float(np.mean(psd[mask])) if mask.any() else np.nan
+    return band_power
+
+
+_REDUCERS = {'spike_rates': _spike_rates,
+             'dipole_peak': _dipole_peak,
+             'band_power': _band_power}
+
+
+def register_reducer(name, reduce, overwrite=False):
+    """Register a function that reduces a trial to summary features.
+
+    Registered reducers can be passed by name to
+    :func:`~hnn_core.simulate_dipole`. The built-in reducers are
+    ``'spike_rates'`` (mean spike rate of each cell type in Hz),
+    ``'dipole_peak'`` (latency in ms and amplitude in nAm of the largest
+    absolute value of the aggregate dipole) and ``'band_power'`` (mean power
+    of the aggregate dipole in the theta, alpha, beta and gamma bands, or NaN
+    if the frequency resolution of the simulation is too coarse).
+
+    Parameters
+    ----------
+    name : str
+        The name of the reducer.
+    reduce : callable
+        Function with the signature ``reduce(dpl, cell_response, net)``,
+        where ``dpl`` is the Dipole and ``cell_response`` the CellResponse of
+        a single trial simulated from the Network ``net``.
+    overwrite : bool
+        If True, a reducer registered with the same name is replaced.
+        Default: False.
+    """
+    _validate_type(name, str, 'name')
+    _validate_type(reduce, 'callable', 'reduce')
+    if name in _REDUCERS and not overwrite:
+        raise ValueError(f'A reducer named {name} is already registered. '
+                         f'Use overwrite=True to replace it.')
+    _REDUCERS[name] = reduce
+
+
+def _get_reducer(reduce):
+    """Get the function of a reducer given by name or as a function"""
+    _validate_type(reduce, (str, 'callable', None), 'reduce',
+                   'str, callable or None')
+    if isinstance(reduce, str):
+        _check_option('reduce', reduce, list(_REDUCERS))
+        reduce = _REDUCERS[reduce]
+    return reduce
@@ -121,3 +121,27 @@ def run_hnn_core_fixture():
 
         return dpls, net
     return _run_hnn_core_fixture
+
+
+@pytest.fixture(scope='module')
+def small_network_fixture():
+    def _small_network_fixture(add_drives_from_params=True,
+                               early_drives=True, **params_update):
+        """Create a network of 3 x 3 pyramidal cells (per layer).
+
+        If early_drives is True, the evoked drives start within 20 ms. The
+        params_update override the default parameters.
+        """
+        hnn_core_root = op.dirname(hnn_core.__file__)
+        params_fname = op.join(hnn_core_root, 'param', 'default.json')
+        params = read_params(params_fname)
+        params.update({'N_pyr_x': 3,
+                       'N_pyr_y': 3})
+        if early_drives:
+            params.update({'t_evprox_1': 5,
+                           't_evdist_1': 10,
+                           't_evprox_2': 20})
+        params.update(params_update)
+        return jones_2009_model(params,
+                                add_drives_from_params=add_drives_from_params)
+    return _small_network_fixture
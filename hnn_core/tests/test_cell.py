@@ -5,7 +5,8 @@ import numpy as np
 import matplotlib
 
 from hnn_core.network_builder import load_custom_mechanisms
-from hnn_core.cell import _ArtificialCell, Cell, Section
+from hnn_core.cell import _ArtificialCell, _CellTemplate, Cell, Section
+from hnn_core.cells_default import pyramidal
 
 matplotlib.use('agg')
 
@@ -104,6 +105,49 @@ def test_cell():
     assert cell.sections[sec_name].Ra == new_Ra
 
 
+def test_cell_template():
+    """Test building cells of one type from a template."""
+    load_custom_mechanisms()
+    cell_type = pyramidal(cell_name='L5Pyr')
+    template = _CellTemplate(cell_type, sec_name_apical='apical_trunk')
+    cell_first = template.build_cell(0, (0., 0., 0.))
+    assert template.seg_values is not None
+    assert template.dipole_ri is not None
+    cell_stamped = template.build_cell(1, (10., 20., 0.))
+    cell_built = cell_type.copy()
+    cell_built.pos = (10., 20., 0.)
+    cell_built.build(sec_name_apical='apical_trunk')
+
+    assert cell_first.gid == 0 and cell_stamped.gid == 1
+    assert cell_stamped.pos == cell_built.pos
+    assert cell_stamped._nrn_sections is not cell_first._nrn_sections
+    assert len(cell_stamped.dipole_pp) == len(cell_built.dipole_pp)
+    for sec_name, sec in cell_built._nrn_sections.items():
+        sec_stamped = cell_stamped._nrn_sections[sec_name]
+        assert sec_stamped.nseg == sec.nseg
+        assert sec_stamped.x3d(0) == sec.x3d(0)
+        for seg, seg_stamped in zip(sec, sec_stamped):
+            assert seg_stamped.gbar_ar == seg.gbar_ar
+            assert seg_stamped.dipole.ri == seg.dipole.ri
+            assert seg_stamped.dipole.ztan == seg.dipole.ztan
+    for dpp, dpp_stamped in zip(cell_built.dipole_pp,
+                                cell_stamped.dipole_pp):
+        assert dpp_stamped.ri == dpp.ri
+        assert dpp_stamped.ztan == dpp.ztan
+
+    # the piece of a cell, e.g., for multisplit, from a new template
+    sec_names = ['apical_trunk', 'apical_1', 'apical_2', 'apical_tuft',
+                 'apical_oblique']
+    template = _CellTemplate(cell_type, sec_name_apical='apical_trunk')
+    cell_piece = template.build_cell(2, (10., 20., 0.), sec_names=sec_names)
+    assert list(cell_piece._nrn_sections) == sec_names
+    assert len(cell_piece.dipole_pp) == len(sec_names)
+    seg_stamped = cell_piece._nrn_sections['apical_tuft'](0.5)
+    seg = cell_built._nrn_sections['apical_tuft'](0.5)
+    assert seg_stamped.gbar_ar == seg.gbar_ar
+    assert seg_stamped.dipole.ri == seg.dipole.ri
+
+
 def test_artificial_cell():
     """Test artificial cell object."""
     load_custom_mechanisms()
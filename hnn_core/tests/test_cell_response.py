@@ -1,12 +1,16 @@
 # Authors: Mainak Jas <mainakjas@gmail.com>
 
 from glob import glob
+import os.path as op
 
 import matplotlib.pyplot as plt
 import pytest
 import numpy as np
+from numpy.testing import assert_allclose
 
-from hnn_core import CellResponse, read_spikes
+import hnn_core
+from hnn_core import (CellResponse, RecordingPlan, read_spikes, read_params,
+                      jones_2009_model, simulate_dipole, JoblibBackend)
 
 
 def test_cell_response(tmpdir):
@@ -32,7 +36,7 @@ def test_cell_response(tmpdir):
     # reset clears all recorded variables, but leaves simulation time intact
     assert len(cell_response.times) == len(sim_times)
     sim_attributes = ['_spike_times', '_spike_gids', '_spike_types',
-                      '_vsec', '_isec']
+                      '_vsec', '_isec', '_varsec']
     net_attributes = ['_times', '_cell_type_names']  # `Network.__init__`
     # creates these check that we always know which response attributes are
     # simulated see #291 for discussion; objective is to keep cell_response
@@ -163,3 +167,97 @@ def test_cell_response(tmpdir):
         cell_response = read_spikes(tmpdir.join('spk_*.txt'),
                                     gid_ranges=gid_ranges)
     plt.close('all')
+
+
+def test_recording_plan():
+    """Test recording selected cells, sections and variables."""
+    hnn_core_root = op.dirname(hnn_core.__file__)
+    params_fname = op.join(hnn_core_root, 'param', 'default.json')
+    params = read_params(params_fname)
+    params.update({'N_pyr_x': 3,
+                   'N_pyr_y': 3,
+                   't_evprox_1': 5,
+                   't_evdist_1': 10,
+                   't_evprox_2': 20})
+    net = jones_2009_model(params, add_drives_from_params=True)
+    tstop, dt = 20., 0.025
+
+    with pytest.raises(TypeError, match='cell_types must be'):
+        RecordingPlan(cell_types=1)
+    with pytest.raises(ValueError, match="Invalid value for the 'sections'"):
+        RecordingPlan(sections='dend')
+    with pytest.raises(ValueError, match='dt must be positive'):
+        RecordingPlan(dt=0.)
+    with pytest.raises(ValueError, match="Invalid value for the 'dtype'"):
+        RecordingPlan(dtype='float16')
+    with pytest.raises(ValueError, match="Invalid value for the "
+                       "'cell_types'"):
+        simulate_dipole(net, tstop=tstop, n_trials=1,
+                        recording=RecordingPlan(cell_types='L6_pyramidal'))
+    with pytest.raises(ValueError, match='gid 200 is not the gid of a cell'):
+        simulate_dipole(net, tstop=tstop, n_trials=1,
+                        recording=RecordingPlan(gids=200))
+    with pytest.raises(ValueError, match='must be a multiple of the '
+                       'integration time step'):
+        simulate_dipole(net, tstop=tstop, n_trials=1,
+                        recording=RecordingPlan(dt=0.03))
+    with pytest.raises(ValueError, match='cannot be used together'):
+        simulate_dipole(net, tstop=tstop, n_trials=1, record_vsec='soma',
+                        recording=RecordingPlan())
+
+    simulate_dipole(net, tstop=tstop, dt=dt, n_trials=1, record_vsec='all')
+    vsec = net.cell_response.vsec[0]
+    # the variables recorded at each integration step
+    simulate_dipole(net, tstop=tstop, dt=dt, n_trials=1,
+                    recording=RecordingPlan(cell_types='L5_pyramidal',
+                                            sections='soma',
+                                            variables=['cai', 'm_hh2']))
+    varsec = net.cell_response.varsec[0]
+
+    gids = list(net.gid_ranges['L5_pyramidal'][:2]) + \
+        list(net.gid_ranges['L2_basket'])
+    plan = RecordingPlan(cell_types=['L5_pyramidal', 'L2_basket'], gids=gids,
+                         sections=['soma', 'apical_1'],
+                         variables=['v', 'i_syn', 'cai', 'm_hh2'], dt=0.1,
+                         dtype='float32')
+    assert 'L5_pyramidal, L2_basket' in repr(plan)
+    # threads sample the same steps as NEURON for a single thread
+    for n_threads in (1, 2):
+        with JoblibBackend(n_threads=n_threads):
+            simulate_dipole(net, tstop=tstop, dt=dt, n_trials=1,
+                            recording=plan)
+        cell_response = net.cell_response
+        n_times = int(round(tstop / 0.1))
+        assert_allclose(cell_response.times, np.arange(n_times) * 0.1)
+        for gid in net.gid_ranges['L5_pyramidal']:
+            vsec_gid = cell_response.vsec[0][gid]
+            if gid not in gids:
+                assert vsec_gid == dict()
+                continue
+            assert set(vsec_gid) == {'soma', 'apical_1'}
+            assert vsec_gid['soma'].dtype == np.float32
+            assert_allclose(vsec_gid['soma'], vsec[gid]['soma'][::4][:-1],
+                            rtol=1e-6)
+            assert set(cell_response.isec[0][gid]['soma']) == \
+                {'soma_gabaa', 'soma_gabab'}
+            assert set(cell_response.varsec[0][gid]['soma']) == \
+                {'cai', 'm_hh2'}
+            for var in ('cai', 'm_hh2'):
+                assert_allclose(cell_response.varsec[0][gid]['soma'][var],
+                                varsec[gid]['soma'][var][::4][:n_times],
+                                rtol=1e-6)
+        # each cell records its own variables
+        gid, other_gid = gids[:2]
+        assert not np.allclose(cell_response.varsec[0][gid]['soma']['m_hh2'],
+                               cell_response.varsec[0][other_gid]['soma'][
+                                   'm_hh2'])
+        # basket cells have no calcium channels
+        gid = net.gid_ranges['L2_basket'][0]
+        assert set(cell_response.vsec[0][gid]) == {'soma'}
+        assert set(cell_response.varsec[0][gid]['soma']) == {'m_hh2'}
+        assert cell_response.vsec[0][net.gid_ranges['L2_pyramidal'][0]] == \
+            dict()
+
+    plan = RecordingPlan(variables='cia')
+    with pytest.raises(ValueError, match='cia is not the name of a NEURON'):
+        simulate_dipole(net, tstop=tstop, n_trials=1, recording=plan)
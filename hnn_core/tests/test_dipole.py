@@ -4,7 +4,7 @@ from urllib.request import urlretrieve
 import matplotlib
 import matplotlib.pyplot as plt
 import numpy as np
-from numpy.testing import assert_allclose
+from numpy.testing import assert_allclose, assert_array_equal
 import pytest
 
 import hnn_core
@@ -181,8 +181,21 @@ def test_cell_response_backends(run_hnn_core_fixture):
         trial_idx][gid]['apical_1']) == n_times
     assert len(mpi_net.cell_response.isec[
                trial_idx][gid]['soma']['soma_gabaa']) == n_times
-    assert mpi_net.cell_response.vsec == joblib_net.cell_response.vsec
-    assert mpi_net.cell_response.isec == joblib_net.cell_response.isec
+    # the recordings are arrays that are identical across backends
+    for mpi_vsec, joblib_vsec in zip(mpi_net.cell_response.vsec,
+                                     joblib_net.cell_response.vsec):
+        assert mpi_vsec.keys() == joblib_vsec.keys()
+        for gid_vsec in mpi_vsec:
+            for sec_name, sec_vsec in mpi_vsec[gid_vsec].items():
+                assert_array_equal(sec_vsec, joblib_vsec[gid_vsec][sec_name])
+    for mpi_isec, joblib_isec in zip(mpi_net.cell_response.isec,
+                                     joblib_net.cell_response.isec):
+        assert mpi_isec.keys() == joblib_isec.keys()
+        for gid_isec in mpi_isec:
+            for sec_name, sec_isec in mpi_isec[gid_isec].items():
+                for syn_name, syn_isec in sec_isec.items():
+                    assert_array_equal(
+                        syn_isec, joblib_isec[gid_isec][sec_name][syn_name])
 
     # Test if spike time falls within depolarization window above v_thresh
     v_thresh = 0.0
@@ -3,16 +3,20 @@
 
 import pytest
 import os.path as op
+from copy import deepcopy
 
 import numpy as np
+from numpy.testing import assert_allclose
 
 import hnn_core
-from hnn_core import Params, Network, read_params
+from hnn_core import Params, Network, read_params, CellResponse
 from hnn_core.drives import (drive_event_times, _get_prng, _create_extpois,
-                             _create_bursty_input)
+                             _create_bursty_input, _philox4x32,
+                             _drive_events_philox)
 from hnn_core.params import create_pext
-from hnn_core.network import pick_connection
-from hnn_core.network_models import jones_2009_model
+from hnn_core.network import pick_connection, _DriveEvents
+from hnn_core.network_models import (jones_2009_model,
+                                     add_erp_drives_to_jones_model)
 from hnn_core import simulate_dipole
 
 
@@ -451,3 +455,131 @@ def test_drive_random_state():
     net._instantiate_drives(tstop=170.)
     assert (net.external_drives['evprox1']['events'] ==
             net.external_drives['evprox2']['events'])
+
+
+def _get_philox_lists(*args, **kwargs):
+    """Event times of _drive_events_philox as a list of lists."""
+    return _DriveEvents.from_trials([_drive_events_philox(*args, **kwargs)])[0]
+
+
+def test_drive_philox():
+    """Test drive event times drawn from counter-based random streams."""
+    # known-answer tests of Random123 for Philox4x32-10
+    words = _philox4x32(np.zeros((1, 4)), (0, 0))
+    assert [f'{word:08x}' for word in words[0]] == [
+        '6627e8d5', 'e169c58d', 'bc57ac4c', '9b00dbd8']
+    words = _philox4x32([[0x243f6a88, 0x85a308d3, 0x13198a2e, 0x03707344]],
+                        (0xa4093822, 0x299f31d0))
+    assert [f'{word:08x}' for word in words[0]] == [
+        'd16cfe09', '94fdcceb', '5001e420', '24126ea1']
+
+    # the streams do not depend on the order of generation
+    dynamics = dict(tstart=10., tstop=150., rate_constant=40.)
+    gids, trial_idxs = np.arange(50), np.repeat([0, 1], 25)
+    event_times = _get_philox_lists('poisson', dynamics, 170.,
+                                    ['any'] * 50, gids, trial_idxs,
+                                    event_seed=3)
+    event_times_rev = _get_philox_lists('poisson', dynamics, 170.,
+                                        ['any'] * 50, gids[::-1],
+                                        trial_idxs[::-1], event_seed=3)
+    assert event_times == event_times_rev[::-1]
+    n_events = [len(times) for times in event_times]
+    assert 3 < np.mean(n_events) < 8  # 5.6 on average
+    all_times = np.concatenate(event_times)
+    assert np.all(all_times > 10.) and np.all(all_times < 150.)
+    assert all(np.all(np.diff(times) > 0) for times in event_times)
+    assert event_times != _get_philox_lists(
+        'poisson', dynamics, 170., ['any'] * 50, gids, trial_idxs,
+        event_seed=4)
+    # no rate constant, no events (as in legacy mode)
+    assert _get_philox_lists(
+        'poisson', dict(dynamics, rate_constant={'L2_basket': 40.}), 170.,
+        ['L5_basket'], [0], [0]) == [[]]
+    with pytest.raises(ValueError, match='Rate must be > 0'):
+        _get_philox_lists('poisson', dict(dynamics, rate_constant=0.),
+                          170., ['any'], [0], [0])
+
+    event_times = _get_philox_lists(
+        'evoked', dict(mu=50., sigma=4., numspikes=3), 170.,
+        ['any'] * 1000, np.arange(1000), np.zeros(1000))
+    all_times = np.concatenate(event_times)
+    assert all_times.size == 3000
+    assert abs(all_times.mean() - 50.) < 0.5
+    assert abs(all_times.std() - 4.) < 0.5
+
+    # the start of bursts is shared by the drive cells of a trial
+    dynamics = dict(tstart=20., tstart_std=5., tstop=170., burst_rate=10.,
+                    burst_std=0., numspikes=2, spike_isi=10.)
+    event_times = _get_philox_lists('bursty', dynamics, 170.,
+                                    ['any'] * 4, [0, 1, 0, 1],
+                                    [0, 0, 1, 1])
+    assert event_times[0] == event_times[1]
+    assert event_times[0] != event_times[2]
+    assert len(event_times[0]) == 4  # two doublets
+    assert_allclose(np.diff(event_times[0])[::2], 10.)
+
+    # simulation of a network
+    net = jones_2009_model()
+    add_erp_drives_to_jones_model(net)
+    net._instantiate_drives(tstop=170., n_trials=2, event_rng='philox')
+    events = net.external_drives['evdist1']['events']
+    assert len(events) == 2
+    assert len(events[0]) == len(net.gid_ranges['evdist1'])
+    assert events[0] != events[1]
+    events_legacy = deepcopy(events)
+    net._instantiate_drives(tstop=170., n_trials=2)
+    assert net.external_drives['evdist1']['events'] != events_legacy
+    with pytest.raises(ValueError, match="Invalid value for the 'event_rng'"):
+        net._instantiate_drives(tstop=170., event_rng='foo')
+
+
+def test_add_replay_drive():
+    """Test adding a drive replaying the spikes of a CellResponse."""
+    cell_response = CellResponse(
+        spike_times=[[12., 5., 30., 250.], [7.]],
+        spike_gids=[[25, 3, 3, 25], [40]],
+        spike_types=[['L5_pyramidal', 'L2_pyramidal', 'L2_pyramidal',
+                      'L5_pyramidal'], ['L5_pyramidal']])
+    net = jones_2009_model()
+    weights_ampa = {'L2_basket': 0.01, 'L5_pyramidal': 0.01}
+    net.add_replay_drive('replay', cell_response, location='proximal',
+                         weights_ampa=weights_ampa)
+    drive = net.external_drives['replay']
+    assert drive['type'] == 'replay'
+    assert drive['n_drive_cells'] == len(net.gid_ranges['replay']) == 3
+    assert not drive['cell_specific']
+    assert_allclose(drive['dynamics']['gids'], [3, 25, 40])
+    assert '2 recorded trials' in repr(drive)
+
+    # a drive cell per recorded cell, replaying its spikes in the
+    # simulation interval
+    net._instantiate_drives(tstop=170., n_trials=2)
+    assert drive['events'] == [[[5., 30.], [12.], []], [[], [], [7.]]]
+    net._instantiate_drives(tstop=170., n_trials=2, event_rng='philox',
+                            lazy=True)
+    trains = net._get_drive_trains('replay')
+    values, n_events = net._get_drive_events('replay', trains[1:], 0,
+                                             tstop=300.)
+    assert_allclose(values, [12., 250.])
+    assert_allclose(n_events, [2, 0])
+    with pytest.raises(ValueError, match='Cannot simulate 3 trials with '
+                                         'the replay drive replay'):
+        net._instantiate_drives(tstop=170., n_trials=3)
+
+    net.add_replay_drive('replay_l5', cell_response, location='distal',
+                         cell_types='L5_pyramidal',
+                         weights_ampa=weights_ampa)
+    assert_allclose(net.external_drives['replay_l5']['dynamics']['gids'],
+                    [25, 40])
+
+    with pytest.raises(TypeError, match='cell_response must be an instance'):
+        net.add_replay_drive('replay_2', [[5.]], location='distal')
+    with pytest.raises(ValueError, match="Invalid value for the "
+                                         "'cell_types' parameter"):
+        net.add_replay_drive('replay_2', cell_response, location='distal',
+                             cell_types='L2_basket')
+    with pytest.raises(ValueError, match='at least one trial'):
+        net.add_replay_drive('replay_2', CellResponse(), location='distal')
+    with pytest.raises(ValueError, match='No spikes of'):
+        net.add_replay_drive('replay_2', CellResponse([[]], [[]], [[]]),
+                             location='distal')
@@ -3,16 +3,20 @@ import io
 from contextlib import redirect_stdout, redirect_stderr
 from queue import Queue
 
+import numpy as np
+from numpy.testing import assert_array_equal
 import pytest
 
 import hnn_core
 from hnn_core import read_params, Network, jones_2009_model
-from hnn_core.mpi_child import (MPISimulation, _str_to_net, _pickle_data)
+from hnn_core.mpi_child import MPISimulation, _read_transport_dir
 from hnn_core.parallel_backends import (_gather_trial_data,
                                         _process_child_data,
                                         _echo_child_output,
                                         _get_data_from_child_err,
-                                        _extract_data, _extract_data_length)
+                                        _extract_data_length,
+                                        _write_frames, _read_frames,
+                                        _write_transport_dir, _DATA_FNAME)
 
 
 def test_get_data_from_child_err():
@@ -42,24 +46,6 @@ def test_echo_child_output():
     assert output == test_string
 
 
-def test_extract_data():
-    """Test _extract_data for extraction between signals"""
-
-    # no ending
-    test_string = "@start_of_data@start of data"
-    output = _extract_data(test_string, 'data')
-    assert output == ''
-
-    # valid end, but no start to data
-    test_string = "end of data@end_of_data:11@"
-    output = _extract_data(test_string, 'data')
-    assert output == ''
-
-    test_string = "@start_of_data@all data@end_of_data:8@"
-    output = _extract_data(test_string, 'data')
-    assert output == 'all data'
-
-
 def test_extract_data_length():
     """Test _extract_data_length for data length in signal"""
 
@@ -73,8 +59,8 @@ def test_extract_data_length():
     assert output == 8
 
 
-def test_str_to_net():
-    """Test reading the network via a string"""
+def test_frames(tmp_path):
+    """Test writing and reading objects as framed pickles"""
 
     hnn_core_root = op.dirname(hnn_core.__file__)
 
@@ -83,28 +69,48 @@ def test_str_to_net():
     params = read_params(params_fname)
     net = jones_2009_model(params, add_drives_from_params=True)
 
-    pickled_net = _pickle_data(net)
-
-    input_str = '@start_of_net@' + pickled_net.decode() + \
-        '@end_of_net:%d@\n' % (len(pickled_net))
-
-    received_net = _str_to_net(input_str)
+    fname = str(tmp_path / 'net.bin')
+    n_bytes = _write_frames(fname, [net, 170.])
+    assert n_bytes == op.getsize(fname)
+    received_net, tstop = _read_frames(fname)
     assert isinstance(received_net, Network)
-
-    # muck with the data size in the signal
-    input_str = '@start_of_net@' + pickled_net.decode() + \
-        '@end_of_net:%d@\n' % (len(pickled_net) + 1)
-
-    expected_string = "Got incorrect network size: %d bytes " % \
-        len(pickled_net) + "expected length: %d" % \
-        (len(pickled_net) + 1)
-
-    # process input from queue
-    with pytest.raises(ValueError, match=expected_string):
-        _str_to_net(input_str)
-
-
-def test_child_run():
+    assert tstop == 170.
+
+    # arrays are written out-of-band and can be compressed
+    data = {'vsec': np.arange(10000.), 'spike_gids': [1, 2]}
+    n_bytes = _write_frames(fname, data)
+    assert n_bytes > data['vsec'].nbytes
+    received_data = _read_frames(fname)
+    assert_array_equal(received_data['vsec'], data['vsec'])
+    assert received_data['vsec'].flags.writeable
+    assert received_data['spike_gids'] == data['spike_gids']
+    assert _write_frames(fname, data, compress=True) < n_bytes
+    assert_array_equal(_read_frames(fname)['vsec'], data['vsec'])
+
+    # truncated and foreign files are detected
+    with open(fname, 'rb') as f:
+        frames = f.read()
+    with open(fname, 'wb') as f:
+        f.write(frames[:-1])
+    with pytest.raises(ValueError, match='is truncated'):
+        _read_frames(fname)
+    with open(fname, 'wb') as f:
+        f.write(b'@start_of_net@')
+    with pytest.raises(ValueError, match='does not contain framed data'):
+        _read_frames(fname)
+
+    # the directory of the files is sent on stdin
+    with io.StringIO() as buf:
+        _write_transport_dir(buf, str(tmp_path))
+        buf.seek(0)
+        assert _read_transport_dir(buf) == str(tmp_path)
+    # or the signal that no more simulations follow
+    assert _read_transport_dir(io.StringIO('@data_received@\n')) is None
+    with pytest.raises(EOFError, match='Did not receive'):
+        _read_transport_dir(io.StringIO('\n'))
+
+
+def test_child_run(tmp_path):
     """Test running the child process without MPI"""
 
     hnn_core_root = op.dirname(hnn_core.__file__)
@@ -129,45 +135,48 @@ def test_child_run():
             stdout = buf.getvalue()
         assert "Trial 1: 0.03 ms..." in stdout
 
+        mpi_sim.transport_dir = str(tmp_path)
         with io.StringIO() as buf_err, redirect_stderr(buf_err):
-            mpi_sim._write_data_stderr(sim_data)
+            mpi_sim._write_data(sim_data, compress=True)
             stderr_str = buf_err.getvalue()
-        assert "@start_of_data@" in stderr_str
         assert "@end_of_data:" in stderr_str
 
         # write data to queue
         err_q = Queue()
         err_q.put(stderr_str)
 
-        # use _read_stderr to get data_len (but not the data this time)
-        data_len, data = _get_data_from_child_err(err_q)
-        sim_data = _process_child_data(data, data_len)
+        # use _read_stderr to get data_len, then read the data from file
+        with io.StringIO() as buf, redirect_stdout(buf):
+            data_len = _get_data_from_child_err(err_q)
+            assert buf.getvalue() == ''
+        sim_data = _process_child_data(str(tmp_path / _DATA_FNAME),
+                                       data_len)
         n_trials = 1
         postproc = False
         dpls = _gather_trial_data(sim_data, net_reduced, n_trials, postproc)
         assert len(dpls) == 1
 
 
-def test_empty_data():
-    """Test that an empty string raises RuntimeError"""
-    data_bytes = b''
+def test_empty_data(tmp_path):
+    """Test that missing data raises RuntimeError"""
     with pytest.raises(RuntimeError,
                        match="MPI simulation didn't return any data"):
-        _process_child_data(data_bytes, len(data_bytes))
+        _process_child_data(str(tmp_path / _DATA_FNAME), 0)
 
 
-def test_data_len_mismatch():
-    """Test that padded data can be unpickled with warning for length """
+def test_data_len_mismatch(tmp_path):
+    """Test that data can be unpickled with warning for length """
 
-    pickled_bytes = _pickle_data({})
+    data_fname = str(tmp_path / _DATA_FNAME)
+    n_bytes = _write_frames(data_fname, {})
 
-    expected_len = len(pickled_bytes) + 1
+    expected_len = n_bytes + 1
 
     with pytest.warns(UserWarning) as record:
-        _process_child_data(pickled_bytes, expected_len)
+        _process_child_data(data_fname, expected_len)
 
     expected_string = "Length of received data unexpected. " + \
-        "Expecting %d bytes, got %d" % (expected_len, len(pickled_bytes))
+        "Expecting %d bytes, got %d" % (expected_len, n_bytes)
 
     assert len(record) == 1
     assert record[0].message.args[0] == expected_string
@@ -12,7 +12,10 @@ from hnn_core import read_params, CellResponse, Network
 from hnn_core import jones_2009_model, law_2021_model, calcium_model
 from hnn_core.network_models import add_erp_drives_to_jones_model
 from hnn_core.network_builder import NetworkBuilder
-from hnn_core.network import pick_connection
+from hnn_core.network import (pick_connection, _connection_probability,
+                              _DriveEvents, _GidPairs)
+from hnn_core.cell import _get_gaussian_connection
+from hnn_core.check import _check_gids
 
 hnn_core_root = op.dirname(hnn_core.__file__)
 params_fname = op.join(hnn_core_root, 'param', 'default.json')
@@ -260,11 +263,25 @@ def test_network():
     n_gaus_sources = net._n_cells
     n_bursty_sources = (net.external_drives['bursty1']['n_drive_cells'] +
                         net.external_drives['bursty2']['n_drive_cells'])
+    # drive cells without events in any trial (e.g., Poisson drive cells of
+    # cell types without a rate constant in legacy mode) are not created
+    silent_gids = list()
+    for drive_name, drive in net.external_drives.items():
+        for gid_idx, gid in enumerate(net.gid_ranges[drive_name]):
+            if all(len(events[gid_idx]) == 0 for events in drive['events']):
+                silent_gids.append(gid)
+    assert len(silent_gids) > 0
+    assert not set(silent_gids) & set(network_builder._gid_list)
     # test that expected number of external driving events are created
     assert len(network_builder._drive_cells) == (n_evoked_sources +
                                                  n_pois_sources +
                                                  n_gaus_sources +
-                                                 n_bursty_sources)
+                                                 n_bursty_sources -
+                                                 len(silent_gids))
+    # NetCons with zero weight are not created
+    for ncs in network_builder.ncs.values():
+        for nc in ncs:
+            assert nc.weight[0] != 0.
     assert len(network_builder._gid_list) ==\
         len(network_builder._drive_cells) + net._n_cells
     # first 'evoked drive' comes after real cells and bursty drive cells
@@ -281,6 +298,23 @@ def test_network():
     assert len(network_builder.ncs['L2Pyr_L2Pyr_nmda']) == n_connections
     nc = network_builder.ncs['L2Pyr_L2Pyr_nmda'][0]
     assert nc.threshold == params['threshold']
+    # weights and delays computed for all pairs at once match the pairwise
+    # gaussian of the first pair (src 0 -> target 1, 3 synapses each)
+    conn = pick_connection(net, src_gids='L2_pyramidal',
+                           target_gids='L2_pyramidal', receptor='nmda')[0]
+    weight, delay = _get_gaussian_connection(
+        net.pos_dict['L2_pyramidal'][0], net.pos_dict['L2_pyramidal'][1],
+        net.connectivity[conn]['nc_dict'],
+        inplane_distance=net._inplane_distance)
+    assert nc.weight[0] == weight
+    assert nc.delay == delay
+    nc = network_builder.ncs['L2Pyr_L2Pyr_nmda'][3]
+    weight, delay = _get_gaussian_connection(
+        net.pos_dict['L2_pyramidal'][0], net.pos_dict['L2_pyramidal'][2],
+        net.connectivity[conn]['nc_dict'],
+        inplane_distance=net._inplane_distance)
+    assert nc.weight[0] == weight
+    assert nc.delay == delay
 
     # Check bursty drives which use cell_specific=False
     assert 'bursty1_L2Pyr_ampa' in network_builder.ncs
@@ -398,11 +432,118 @@ def test_network():
          t_gids in net.connectivity[-1]['gid_pairs'].values()])
     assert n_connections_new == np.round(n_connections * 0.5).astype(int)
     assert net.connectivity[-1]['probability'] == 0.5
+
+    # gid_pairs are stored as CSR arrays behind a read-only dict-like view
+    gid_pairs = net.connectivity[-1]['gid_pairs']
+    assert gid_pairs.indptr[-1] == len(gid_pairs.indices) == n_connections_new
+    assert all(len(gid_pairs[src_gid]) > 0 for src_gid in gid_pairs)
+    assert gid_pairs == {
+        src_gid: gid_pairs.indices[
+            gid_pairs.indptr[row]:gid_pairs.indptr[row + 1]].tolist()
+        for row, src_gid in enumerate(gid_pairs.src_gids)}
+    assert deepcopy(gid_pairs) == gid_pairs
+    assert 1000 not in gid_pairs
+    with pytest.raises(TypeError, match='does not support item assignment'):
+        gid_pairs[35] = [36]
+    src_gid = gid_pairs.src_gids[0]
+    with pytest.raises(ValueError, match='read-only'):
+        gid_pairs[src_gid][0] = 0
+    with pytest.raises(AttributeError, match='append'):
+        gid_pairs[src_gid].append(0)
+    with pytest.raises(ValueError, match='one value for each of the'):
+        gid_pairs.weights = np.ones(len(gid_pairs.indices) + 1)
+    with pytest.raises(ValueError, match='one value for each of the'):
+        _GidPairs(gid_pairs.src_gids, gid_pairs.indptr, gid_pairs.indices,
+                  delays=[1.])
+    gid_pairs = net.connectivity[-2]['gid_pairs']
+    assert gid_pairs == {35: [35, 36], 36: [35, 36]}
+
+    # Pruning several connections in one call matches separate calls
+    conn_idxs = pick_connection(net, src_gids='L2_pyramidal',
+                                target_gids='L5_pyramidal')
+    conns = [deepcopy(net.connectivity[idx]) for idx in conn_idxs]
+    conns_bulk = deepcopy(conns)
+    probabilities = [0.5] * (len(conns) - 1) + [0.2]
+    for conn, probability in zip(conns, probabilities):
+        _connection_probability(conn, probability, conn_seed=3)
+    _connection_probability(conns_bulk, probabilities, conn_seed=3)
+    for conn, conn_bulk in zip(conns, conns_bulk):
+        assert conn['gid_pairs'] == conn_bulk['gid_pairs']
+    assert len(conns_bulk[-1]['gid_pairs'].indices) == np.round(
+        len(net.connectivity[conn_idxs[-1]]['gid_pairs'].indices) * 0.2)
+    with pytest.raises(ValueError, match='one value for each connection'):
+        _connection_probability(conns_bulk, [0.5], conn_seed=3)
+
+    # A drive prunes the connections of its receptors together, such that
+    # they keep the same pairs
+    net_drive = jones_2009_model()
+    net_drive.add_evoked_drive(
+        'evdist_prob', mu=5., sigma=1., numspikes=1, location='distal',
+        weights_ampa={'L5_pyramidal': 0.1}, weights_nmda={'L5_pyramidal': 0.1},
+        synaptic_delays={'L5_pyramidal': 0.1}, probability=0.5)
+    conn_idxs = pick_connection(net_drive, src_gids='evdist_prob',
+                                target_gids='L5_pyramidal')
+    conn_ampa, conn_nmda = [net_drive.connectivity[idx] for idx in conn_idxs]
+    assert conn_ampa['receptor'] == 'ampa'
+    assert conn_nmda['receptor'] == 'nmda'
+    assert conn_ampa['gid_pairs'] == conn_nmda['gid_pairs']
+    assert len(conn_ampa['gid_pairs']) == np.round(
+        len(net_drive.gid_ranges['L5_pyramidal']) * 0.5)
+    assert conn_ampa['probability'] == conn_nmda['probability'] == 0.5
     with pytest.raises(ValueError, match='probability must be'):
         kwargs = kwargs_default.copy()
         kwargs['probability'] = -1.0
         net.add_connection(**kwargs)
 
+    # Check distance_cutoff only keeps pairs within the cutoff
+    kwargs = kwargs_default.copy()
+    kwargs.update(src_gids='L2_pyramidal', target_gids='L2_pyramidal',
+                  lamtha=1.5, distance_cutoff=2)
+    net.add_connection(**kwargs)
+    gid_pairs = net.connectivity[-1]['gid_pairs']
+    assert net.connectivity[-1]['distance_cutoff'] == 2
+    pos = np.array(net.pos_dict['L2_pyramidal'])
+    start = net.gid_ranges['L2_pyramidal'][0]
+    dists = np.linalg.norm(pos[:, None, :2] - pos[None, :, :2], axis=-1)
+    expected = {src_idx + start: (np.flatnonzero(
+        dists[src_idx] <= 2 * 1.5 * net._inplane_distance) + start).tolist()
+        for src_idx in range(len(pos))}
+    assert gid_pairs == expected
+    assert len(gid_pairs.indices) < len(pos) ** 2
+    # with probability < 1, the cutoff removes pairs from the same subset
+    kwargs.update(probability=0.5, conn_seed=1)
+    net.add_connection(**kwargs)
+    kwargs.update(distance_cutoff=None)
+    net.add_connection(**kwargs)
+    for src_gid, target_gids in net.connectivity[-1]['gid_pairs'].items():
+        assert list(net.connectivity[-2]['gid_pairs'].get(
+            src_gid, list())) == [
+            target_gid for target_gid in target_gids if
+            target_gid in expected[src_gid]]
+    # the pairs within the cutoff are created directly if all src gids have
+    # the same targets, and are otherwise selected from all pairs
+    target_gids = list(net.gid_ranges['L2_pyramidal'])
+    for allow_autapses in (True, False):
+        kwargs.update(distance_cutoff=1, allow_autapses=allow_autapses)
+        net.add_connection(**kwargs)
+        net.add_connection(**dict(kwargs, target_gids=[
+            target_gids for _ in net.gid_ranges['L2_pyramidal']]))
+        assert net.connectivity[-1]['gid_pairs'] == \
+            net.connectivity[-2]['gid_pairs']
+    src_gid = net.gid_ranges['L2_pyramidal'][0]
+    assert (src_gid in net.connectivity[-4]['gid_pairs'][src_gid]) != \
+        (src_gid in net.connectivity[-2]['gid_pairs'][src_gid])
+    kwargs.update(allow_autapses=True)
+    n_conns = len(net.connectivity)
+    for cutoff in (0, -1.):
+        with pytest.raises(ValueError, match='distance_cutoff must be'):
+            kwargs.update(distance_cutoff=cutoff)
+            net.add_connection(**kwargs)
+    with pytest.raises(TypeError, match='distance_cutoff must be'):
+        kwargs.update(distance_cutoff='1')
+        net.add_connection(**kwargs)
+    assert len(net.connectivity) == n_conns
+
     # Make sure warning raised if section targeted doesn't contain synapse
     match = ('Invalid value for')
     with pytest.raises(ValueError, match=match):
@@ -515,17 +656,126 @@ def test_network():
             kwargs[arg] = string_arg
             pick_connection(**kwargs)
 
+    # The lookup of pick_connection follows changes to net.connectivity
+    conn_idxs = pick_connection(net, src_gids='L2_basket')
+    net.connectivity = [conn for conn_idx, conn in
+                        enumerate(net.connectivity) if
+                        conn_idx not in conn_idxs]
+    assert pick_connection(net, src_gids='L2_basket') == list()
+    conn_idxs = pick_connection(net, src_gids='L5_basket')
+    del net.connectivity[conn_idxs[0]]
+    assert len(pick_connection(net, src_gids='L5_basket')) == \
+        len(conn_idxs) - 1
+    conn_idxs = pick_connection(net, receptor='gabab')
+    other_idx = [conn_idx for conn_idx in range(len(net.connectivity)) if
+                 conn_idx not in conn_idxs][0]
+    net.connectivity[conn_idxs[0]], net.connectivity[other_idx] = \
+        net.connectivity[other_idx], net.connectivity[conn_idxs[0]]
+    assert pick_connection(net, receptor='gabab') == sorted(
+        [other_idx] + conn_idxs[1:])
+    # and to the fields of connections edited in place
+    conn_idx = pick_connection(net, receptor='gabaa')[0]
+    net.connectivity[conn_idx]['receptor'] = 'gabab'
+    assert conn_idx not in pick_connection(net, receptor='gabaa')
+    assert conn_idx in pick_connection(net, receptor='gabab')
+    net.connectivity[conn_idx]['loc'] = 'proximal'
+    assert conn_idx in pick_connection(net, loc='proximal', receptor='gabab')
+    target_gid = net.connectivity[conn_idx]['target_gids'][0]
+    net.connectivity[conn_idx]['target_gids'].remove(target_gid)
+    assert conn_idx not in pick_connection(net, target_gids=target_gid,
+                                           loc='proximal')
+
     # Test removing connections from net.connectivity
     # Needs to be updated if number of drives change in preceeding tests
+    n_drive_conns = len(pick_connection(net, src_gids=list(
+        net.external_drives.keys())))
     net.clear_connectivity()
-    assert len(net.connectivity) == 50
+    assert len(net.connectivity) == n_drive_conns == 50
+    assert pick_connection(net, src_gids='L2_pyramidal') == list()
+    for conn_idx in pick_connection(net, src_gids='evprox1'):
+        assert net.connectivity[conn_idx]['src_type'] == 'evprox1'
     net.clear_drives()
     assert len(net.connectivity) == 0
+    assert pick_connection(net, receptor='ampa') == list()
 
     with pytest.warns(UserWarning, match='No connections'):
         simulate_dipole(net, tstop=10)
 
 
+def test_distance_cutoff_dipole():
+    """Test that the connections dropped by a cutoff barely change dipoles"""
+    hnn_core_root = op.dirname(hnn_core.__file__)
+    params_fname = op.join(hnn_core_root, 'param', 'default.json')
+    params = read_params(params_fname)
+    params.update({'N_pyr_x': 5, 'N_pyr_y': 5})
+    net = jones_2009_model(params, add_drives_from_params=True)
+    dpl = simulate_dipole(net.copy(), tstop=80., n_trials=1)[0]
+
+    # the dropped connections have weights below exp(-1.5 ** 2) ~ 0.1 of
+    # the weights of their connection
+    distance_cutoff = 1.5
+    net_cutoff = net.copy()
+    net_cutoff.clear_connectivity()
+    n_pairs = n_pairs_cutoff = 0
+    for conn in net.connectivity:
+        if conn['src_type'] in net.external_drives:
+            continue
+        gid_pairs = conn['gid_pairs']
+        allow_autapses = bool(np.any(
+            gid_pairs.indices == gid_pairs._pair_src_gids()))
+        net_cutoff.add_connection(
+            conn['src_type'], conn['target_type'], conn['loc'],
+            conn['receptor'], conn['nc_dict']['A_weight'],
+            conn['nc_dict']['A_delay'], conn['nc_dict']['lamtha'],
+            allow_autapses=allow_autapses, distance_cutoff=distance_cutoff)
+        gid_pairs_cutoff = net_cutoff.connectivity[-1]['gid_pairs']
+        assert set(zip(gid_pairs_cutoff._pair_src_gids(),
+                       gid_pairs_cutoff.indices)) <= \
+            set(zip(gid_pairs._pair_src_gids(), gid_pairs.indices))
+        n_pairs += len(gid_pairs.indices)
+        n_pairs_cutoff += len(gid_pairs_cutoff.indices)
+    assert n_pairs_cutoff < n_pairs
+    dpl_cutoff = simulate_dipole(net_cutoff, tstop=80., n_trials=1)[0]
+    assert_allclose(dpl_cutoff.data['agg'], dpl.data['agg'], rtol=0,
+                    atol=1e-2 * np.abs(dpl.data['agg']).max())
+
+
+def test_drive_events():
+    """Test the ragged array storage of the event times of drives."""
+    event_times = [[[1., 2.], [], [3.]], [[4.], [5., 6., 7.], []]]
+    events = _DriveEvents.from_lists(event_times)
+    assert events.n_trials == 2 and events.n_trains == 3
+    assert_allclose(events.values, [1., 2., 3., 4., 5., 6., 7.])
+    assert events.indptr.tolist() == [0, 2, 2, 3, 4, 7, 7]
+    # list-like access
+    assert len(events) == 2
+    assert events == event_times
+    assert list(events) == event_times
+    assert events[-1] == event_times[1]
+    assert events[:1] == event_times[:1]
+    assert events[1][1] == [5., 6., 7.]
+    with pytest.raises(IndexError, match='trial index out of range'):
+        events[2]
+    assert events == _DriveEvents.from_lists(event_times)
+    assert events != _DriveEvents.from_lists(event_times[:1])
+    assert events._n_events().tolist() == [[2, 0, 1], [1, 3, 0]]
+    # the event times are views of the buffer
+    train = events._get_train(1, 1)
+    assert np.shares_memory(train, events.values)
+    assert_allclose(train, [5., 6., 7.])
+
+    empty = _DriveEvents()
+    assert len(empty) == 0 and empty == list()
+
+    net = jones_2009_model()
+    add_erp_drives_to_jones_model(net)
+    net._instantiate_drives(tstop=170., n_trials=2)
+    events = net.external_drives['evprox1']['events']
+    assert isinstance(events, _DriveEvents)
+    assert events == _DriveEvents.from_lists(deepcopy(list(events)))
+    assert len(events[0]) == len(net.gid_ranges['evprox1'])
+
+
 def test_add_cell_type():
     """Test adding a new cell type."""
     params = read_params(params_fname)
@@ -544,10 +794,32 @@ def test_add_cell_type():
 
     n_new_type = len(net.gid_ranges['new_type'])
     assert n_new_type == len(pos)
+    # gid lookup follows the new range, including its boundaries
+    for gid_type, gid_range in net.gid_ranges.items():
+        assert net.gid_to_type(gid_range[0]) == gid_type
+        assert net.gid_to_type(gid_range[-1]) == gid_type
+    assert net.gid_to_type(net._n_gids) is None
+    assert net.gid_to_type(-1) is None
+    assert _check_gids('new_type', net.gid_ranges, ['new_type'],
+                       'gids') == net.gid_ranges['new_type']
+    with pytest.raises(AssertionError, match='must be of the same type'):
+        _check_gids([net.gid_ranges['new_type'][0], 0], net.gid_ranges,
+                    list(net.gid_ranges), 'gids')
+    with pytest.raises(AssertionError, match=f'gids {net._n_gids} not in'):
+        _check_gids([0, net._n_gids], net.gid_ranges, list(net.gid_ranges),
+                    'gids', same_type=False)
+    with pytest.raises(TypeError, match='gids must be an instance of int'):
+        _check_gids([0, 1.0], net.gid_ranges, list(net.gid_ranges), 'gids')
     net.add_connection('L2_basket', 'new_type', loc='proximal',
                        receptor='gabaa', weight=8e-3, delay=1,
                        lamtha=2)
 
+    # weights and delays stored for each pair override the gaussian
+    gid_pairs = net.connectivity[-1]['gid_pairs']
+    n_pairs = len(gid_pairs.indices)
+    gid_pairs.weights = np.linspace(1e-3, 2e-3, n_pairs)
+    gid_pairs.delays = np.linspace(1., 2., n_pairs)
+
     network_builder = NetworkBuilder(net)
     assert net._n_cells == n_total_cells + len(pos)
     n_basket = len(net.gid_ranges['L2_basket'])
@@ -555,6 +827,10 @@ def test_add_cell_type():
     assert len(network_builder.ncs['L2Basket_new_type_gabaa']) == n_connections
     nc = network_builder.ncs['L2Basket_new_type_gabaa'][0]
     assert nc.syn().tau1 == tau1
+    assert [nc.weight[0] for nc in network_builder.ncs[
+        'L2Basket_new_type_gabaa']] == gid_pairs.weights.tolist()
+    assert [nc.delay for nc in network_builder.ncs[
+        'L2Basket_new_type_gabaa']] == gid_pairs.delays.tolist()
 
 
 def test_tonic_biases():
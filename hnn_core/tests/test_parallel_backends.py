@@ -1,6 +1,8 @@
 import os.path as op
 from os import environ
+import gc
 import io
+import sys
 from contextlib import redirect_stdout
 from multiprocessing import cpu_count
 from threading import Thread, Event
@@ -12,12 +14,18 @@ from numpy import loadtxt
 from numpy.testing import assert_array_equal, assert_allclose, assert_raises
 
 import pytest
+from neuron import h
 
 import hnn_core
-from hnn_core import MPIBackend, jones_2009_model, read_params
+from hnn_core import (MPIBackend, JoblibBackend, CellResponse,
+                      jones_2009_model, read_params, register_reducer)
 from hnn_core.dipole import simulate_dipole
-from hnn_core.parallel_backends import requires_mpi4py, requires_psutil
-from hnn_core.network_builder import NetworkBuilder
+from hnn_core.parallel_backends import (requires_mpi4py, requires_psutil,
+                                        _simulate_trial_block)
+from hnn_core.network_builder import (NetworkBuilder, _get_cell_cost,
+                                      _get_cell_pieces, _get_steady_states,
+                                      _simulate_single_trial)
+from hnn_core.reducers import _REDUCERS
 
 
 def _terminate_mpibackend(event, backend):
@@ -35,6 +43,16 @@ def _terminate_mpibackend(event, backend):
         sleep(0.01)
 
 
+def _assert_traces_equal(traces, traces_other):
+    """Assert that nested dicts of recorded traces are equal"""
+    assert traces.keys() == traces_other.keys()
+    for key, trace in traces.items():
+        if isinstance(trace, dict):
+            _assert_traces_equal(trace, traces_other[key])
+        else:
+            assert_array_equal(trace, traces_other[key])
+
+
 def test_gid_assignment():
     """Test that gids are assigned without overlap across ranks"""
 
@@ -67,7 +85,149 @@ def test_gid_assignment():
         all_gids_instantiated.extend(net_builder._gid_list)
     all_gids_instantiated.sort()
     assert all_gids_instantiated == sorted(set(all_gids_instantiated))
-    assert all_gids == all_gids_instantiated
+    # drive cells without events are not assigned to any rank
+    silent_gids = net_builder._get_silent_drive_gids()
+    assert [gid for gid in all_gids if gid not in silent_gids] == \
+        all_gids_instantiated
+
+
+def test_gid_assignment_load_balance():
+    """Test that cell gids are balanced by their cost across ranks"""
+    net = jones_2009_model(add_drives_from_params=False)
+    costs = {cell_type: _get_cell_cost(cell) for cell_type, cell in
+             net.cell_types.items()}
+    assert costs['L5_pyramidal'] > costs['L2_pyramidal'] > costs['L5_basket']
+
+    n_hosts = 16
+    loads = np.zeros(n_hosts, dtype=int)
+    n_l5_pyr = np.zeros(n_hosts, dtype=int)
+    net_builder = NetworkBuilder(net)
+    for rank in range(n_hosts):
+        net_builder._gid_list = list()
+        net_builder._gid_assign(rank=rank, n_hosts=n_hosts)
+        for gid in net_builder._gid_list:
+            loads[rank] += costs[net.gid_to_type(gid)]
+        n_l5_pyr[rank] = len([gid for gid in net_builder._gid_list if
+                              net.gid_to_type(gid) == 'L5_pyramidal'])
+    # all ranks agree on the loads, which match the assigned gids
+    assert_array_equal(net_builder._rank_loads, loads)
+    # no rank is loaded by more than the most expensive cell above the mean
+    assert loads.max() - loads.mean() <= max(costs.values())
+    assert n_l5_pyr.max() - n_l5_pyr.min() <= 1
+
+    # with multisplit, pyramidal cells are split in two pieces such that
+    # more hosts than cells can be used
+    pieces = _get_cell_pieces(net.cell_types['L5_pyramidal'])
+    assert len(pieces) == 2
+    assert 'soma' in pieces[0][0] and 'apical_tuft' in pieces[1][0]
+    assert len(_get_cell_pieces(net.cell_types['L5_basket'])) == 1
+    net_builder._multisplit = True
+    n_hosts = net._n_cells + 1
+    n_soma_pieces = np.zeros(net._n_cells, dtype=int)
+    for rank in range(n_hosts):
+        net_builder._gid_list = list()
+        net_builder._gid_assign(rank=rank, n_hosts=n_hosts)
+        cell_gids = [gid for gid in net_builder._gid_list if
+                     gid < net._n_cells]
+        assert len(cell_gids) > 0
+        for gid in cell_gids:
+            if gid not in net_builder._split_gids_remote_soma:
+                n_soma_pieces[gid] += 1
+    # the spikes of each cell are sent from a single host
+    assert_array_equal(n_soma_pieces, 1)
+
+
+def test_reuse_network_across_trials(small_network_fixture):
+    """Test that reusing a built network gives the same trials as rebuilding"""
+    net = small_network_fixture()
+    net.add_electrode_array('arr', [(1, 2, 3)])
+    net._params['record_vsec'] = 'soma'
+    net._params['record_isec'] = False
+    tstop, dt = 25., 0.025
+    net._instantiate_drives(tstop=tstop, n_trials=2)
+
+    sim_data = _simulate_trial_block(net, tstop, dt, trial_idxs=[0, 1])
+    trial_data = _simulate_single_trial(net, tstop, dt, trial_idx=1)
+
+    assert_array_equal(sim_data[1]['dpl_data'], trial_data['dpl_data'])
+    assert_array_equal(sim_data[1]['spike_times'], trial_data['spike_times'])
+    assert_array_equal(sim_data[1]['spike_gids'], trial_data['spike_gids'])
+    _assert_traces_equal(sim_data[1]['vsec'], trial_data['vsec'])
+    assert_array_equal(sim_data[1]['rec_data']['arr'],
+                       trial_data['rec_data']['arr'])
+    # the two trials have different drive events
+    assert not np.array_equal(sim_data[0]['spike_times'],
+                              sim_data[1]['spike_times'])
+
+    # the data is returned as contiguous arrays rather than lists
+    gid = net.gid_ranges['L5_pyramidal'][0]
+    for arr in (trial_data['spike_times'], trial_data['times'],
+                trial_data['vsec'][gid]['soma'],
+                trial_data['rec_data']['arr'], trial_data['rec_times']['arr']):
+        assert isinstance(arr, np.ndarray)
+        assert arr.flags.c_contiguous
+    assert trial_data['rec_data']['arr'].shape == (1, len(trial_data['times']))
+
+
+def test_run_threads(small_network_fixture):
+    """Test that distributing cells over threads gives the same trials"""
+    net = small_network_fixture()
+    net.add_electrode_array('arr', [(1, 2, 3)])
+    net._params['record_vsec'] = 'soma'
+    net._params['record_isec'] = 'soma'
+    tstop, dt = 25., 0.025
+    net._instantiate_drives(tstop=tstop, n_trials=2)
+
+    sim_data = _simulate_trial_block(net, tstop, dt, trial_idxs=[0, 1])
+    sim_data_threads = _simulate_trial_block(net, tstop, dt,
+                                             trial_idxs=[0, 1], n_threads=3)
+    for trial_data, trial_data_threads in zip(sim_data, sim_data_threads):
+        assert_array_equal(trial_data['dpl_data'],
+                           trial_data_threads['dpl_data'])
+        # spikes are recorded in the same order as with a single thread
+        assert_array_equal(trial_data['spike_times'],
+                           trial_data_threads['spike_times'])
+        assert_array_equal(trial_data['spike_gids'],
+                           trial_data_threads['spike_gids'])
+        _assert_traces_equal(trial_data['vsec'], trial_data_threads['vsec'])
+        _assert_traces_equal(trial_data['isec'], trial_data_threads['isec'])
+        assert_array_equal(trial_data['rec_data']['arr'],
+                           trial_data_threads['rec_data']['arr'])
+        assert_array_equal(trial_data['times'],
+                           trial_data_threads['rec_times']['arr'])
+
+    with pytest.raises(ValueError, match='n_threads must be at least 1'):
+        JoblibBackend(n_threads=0)
+    with pytest.raises(TypeError, match='n_threads must be an int'):
+        MPIBackend(n_threads=2.)
+
+
+def test_run_joblibbackend_fork(small_network_fixture):
+    """Test that forking after building the network gives the same trials"""
+    net = small_network_fixture()
+    net.add_electrode_array('arr', [(1, 2, 3)])
+    net._params['record_vsec'] = 'soma'
+
+    n_trials = 3
+    dpls = simulate_dipole(net, tstop=20, n_trials=n_trials)
+    spike_times = net.cell_response.spike_times
+    vsec = net.cell_response.vsec
+    rec_data = net.rec_arrays['arr'].voltages
+    # two forked processes simulate one and two trials
+    with JoblibBackend(n_jobs=2, fork=True) as backend:
+        assert backend.fork
+        dpls_fork = simulate_dipole(net, tstop=20, n_trials=n_trials)
+    assert len(dpls_fork) == n_trials
+    for dpl, dpl_fork in zip(dpls, dpls_fork):
+        assert_array_equal(dpl.data['agg'], dpl_fork.data['agg'])
+    assert net.cell_response.spike_times == spike_times
+    for trial_vsec, trial_vsec_fork in zip(vsec, net.cell_response.vsec):
+        _assert_traces_equal(trial_vsec, trial_vsec_fork)
+    assert_array_equal(net.rec_arrays['arr'].voltages, rec_data)
+
+    with pytest.raises(ValueError, match='fork=True cannot be used with '
+                       'multiple threads'):
+        JoblibBackend(n_jobs=2, n_threads=2, fork=True)
 
 
 # The purpose of this incremental mark is to avoid running the full length
@@ -240,6 +400,448 @@ class TestParallelBackends():
                                      'evprox2': 270}
 
 
+@requires_mpi4py
+@requires_psutil
+def test_run_mpibackend_multisplit(small_network_fixture):
+    """Test MPIBackend splitting cells over more processes than cells"""
+    net = small_network_fixture(N_pyr_x=2, N_pyr_y=2, N_trials=1)
+    n_pyr = (len(net.gid_ranges['L2_pyramidal']) +
+             len(net.gid_ranges['L5_pyramidal']))
+
+    # each pyramidal cell is split into two pieces
+    too_many_procs = net._n_cells + n_pyr + 1
+    with pytest.raises(ValueError, match='More MPI processes were '
+                       'assigned than there are cells'):
+        with MPIBackend(n_procs=too_many_procs, multisplit=True):
+            simulate_dipole(net, tstop=20)
+
+    dpls = simulate_dipole(net, tstop=20)
+    spikes = sorted(zip(net.cell_response.spike_times[0],
+                        net.cell_response.spike_gids[0]))
+    with MPIBackend(n_procs=net._n_cells + 1, multisplit=True) as backend:
+        assert backend.n_procs == net._n_cells + 1
+        dpls_multisplit = simulate_dipole(net, tstop=20)
+    # account for rounding error of the parallel solver
+    assert_allclose(dpls[0].data['agg'], dpls_multisplit[0].data['agg'],
+                    rtol=1e-9, atol=1e-12)
+    assert spikes == sorted(zip(net.cell_response.spike_times[0],
+                                net.cell_response.spike_gids[0]))
+
+
+@requires_mpi4py
+@requires_psutil
+def test_run_mpibackend_subworlds(small_network_fixture):
+    """Test MPIBackend simulating trials in parallel on subworlds"""
+    net = small_network_fixture(N_pyr_x=2, N_pyr_y=2)
+
+    with pytest.raises(ValueError, match='n_procs must be divisible by '
+                       'n_subworlds'):
+        MPIBackend(n_procs=3, n_subworlds=2)
+
+    n_trials = 3
+    dpls = simulate_dipole(net, tstop=20, n_trials=n_trials)
+    spike_times = net.cell_response.spike_times
+    spike_gids = net.cell_response.spike_gids
+    # each subworld of a single process simulates one or two trials
+    with MPIBackend(n_procs=2, n_subworlds=2) as backend:
+        assert backend.n_subworlds == 2
+        dpls_subworlds = simulate_dipole(net, tstop=20, n_trials=n_trials)
+    assert len(dpls_subworlds) == n_trials
+    for dpl, dpl_subworlds in zip(dpls, dpls_subworlds):
+        assert_array_equal(dpl.data['agg'], dpl_subworlds.data['agg'])
+    assert net.cell_response.spike_times == spike_times
+    assert net.cell_response.spike_gids == spike_gids
+
+
+@requires_mpi4py
+@requires_psutil
+def test_run_mpibackend_persistent(tmp_path, small_network_fixture):
+    """Test MPIBackend running several simulations on the same processes"""
+    net = small_network_fixture()
+
+    with MPIBackend(n_procs=2):
+        dpls = simulate_dipole(net, tstop=20, n_trials=2)
+
+    # the files are exchanged in a temporary directory of transport_dir
+    transport_dir = tmp_path / 'transport'
+    with pytest.raises(FileNotFoundError):
+        with MPIBackend(n_procs=2, transport_dir=transport_dir):
+            simulate_dipole(net, tstop=20, n_trials=1)
+    transport_dir.mkdir()
+
+    with MPIBackend(n_procs=2, persistent=True,
+                    transport_dir=transport_dir) as backend:
+        assert backend.persistent
+        # the processes are started when entering the context
+        proc = backend.proc
+        assert proc.poll() is None
+        assert op.dirname(backend._pool.transport_dir) == str(transport_dir)
+        for n_trials in (2, 1):
+            dpls_persistent = simulate_dipole(net, tstop=20,
+                                              n_trials=n_trials)
+            assert len(dpls_persistent) == n_trials
+            for dpl, dpl_persistent in zip(dpls, dpls_persistent):
+                assert_array_equal(dpl.data['agg'],
+                                   dpl_persistent.data['agg'])
+            assert backend.proc is proc
+            assert proc.poll() is None
+    # and exit once leaving it
+    assert proc.returncode == 0
+    assert list(transport_dir.iterdir()) == list()
+
+    # outside of the context, the processes are stopped once the backend
+    # is garbage collected
+    backend = MPIBackend(n_procs=2, persistent=True)
+    dpls_persistent = backend.simulate(net, tstop=20, dt=0.025, n_trials=1)
+    assert_array_equal(dpls[0].data['agg'], dpls_persistent[0].data['agg'])
+    proc = backend.proc
+    assert proc.poll() is None
+    del backend
+    gc.collect()
+    assert proc.returncode == 0
+
+
+def _peak_and_n_spikes(dpl, cell_response, net):
+    """Reducer combining a built-in with the trial's cell response"""
+    return {'peak': _REDUCERS['dipole_peak'](dpl, cell_response, net),
+            'n_spikes': len(cell_response.spike_times[0])}
+
+
+@requires_mpi4py
+@requires_psutil
+def test_run_reduce(small_network_fixture):
+    """Test reducing the results of each trial in the workers"""
+    net = small_network_fixture()
+    dpls = simulate_dipole(net, tstop=40, n_trials=2)
+    cell_response = net.cell_response
+    expected = list()
+    for trial_idx, dpl in enumerate(dpls):
+        trial_response = CellResponse(
+            spike_times=[cell_response.spike_times[trial_idx]],
+            spike_gids=[cell_response.spike_gids[trial_idx]],
+            spike_types=[cell_response.spike_types[trial_idx]],
+            times=cell_response.times,
+            cell_type_names=list(net.cell_types.keys()))
+        expected.append(_peak_and_n_spikes(dpl, trial_response, net))
+    assert expected[0]['n_spikes'] > 0
+
+    features = simulate_dipole(net, tstop=40, n_trials=2,
+                               reduce=_peak_and_n_spikes)
+    assert features == expected
+    # the cell response of the previous simulation is kept
+    assert net.cell_response is cell_response
+
+    with JoblibBackend(n_jobs=2):
+        assert simulate_dipole(net, tstop=40, n_trials=2,
+                               reduce=_peak_and_n_spikes) == expected
+    if sys.platform.startswith('linux'):
+        with JoblibBackend(n_jobs=2, fork=True):
+            # closures are not pickled when forking
+            features = simulate_dipole(
+                net, tstop=40, n_trials=2,
+                reduce=lambda dpl, cell_response, net: dpl.data['agg'])
+        for dpl, agg in zip(dpls, features):
+            assert_array_equal(agg, dpl.data['agg'])
+    with MPIBackend(n_procs=2):
+        # functions are pickled by reference, i.e., must be importable
+        features = simulate_dipole(net, tstop=40, n_trials=2,
+                                   reduce=_REDUCERS['dipole_peak'])
+        assert features == [trial['peak'] for trial in expected]
+        features = simulate_dipole(net, tstop=40, n_trials=2,
+                                   reduce='spike_rates')
+    assert len(features) == 2
+    assert set(features[0]) == set(net.cell_types)
+
+    features = simulate_dipole(net, tstop=40, n_trials=1,
+                               reduce='band_power')
+    assert list(features[0]) == ['theta', 'alpha', 'beta', 'gamma']
+    # the frequency resolution of 25 Hz is too coarse for the lower bands
+    assert np.isnan(features[0]['theta']) and np.isnan(features[0]['alpha'])
+    assert features[0]['beta'] > 0 and features[0]['gamma'] > 0
+
+    # user-defined reducers are available by name
+    register_reducer('peak_and_n_spikes', _peak_and_n_spikes)
+    try:
+        features = simulate_dipole(net, tstop=40, n_trials=2,
+                                   reduce='peak_and_n_spikes')
+        assert features == expected
+        with pytest.raises(ValueError, match='is already registered'):
+            register_reducer('peak_and_n_spikes', _peak_and_n_spikes)
+        register_reducer('peak_and_n_spikes', _REDUCERS['dipole_peak'],
+                         overwrite=True)
+    finally:
+        del _REDUCERS['peak_and_n_spikes']
+
+    with pytest.raises(ValueError, match="Invalid value for the 'reduce'"):
+        simulate_dipole(net, tstop=40, n_trials=1, reduce='foo')
+    with pytest.raises(TypeError, match='reduce must be an instance of'):
+        simulate_dipole(net, tstop=40, n_trials=1, reduce=1)
+    with pytest.raises(TypeError, match='reduce must be an instance of'):
+        register_reducer('foo', 'dipole_peak')
+
+
+@requires_mpi4py
+@requires_psutil
+def test_run_lazy_events(small_network_fixture):
+    """Test creating the drive events in the processes simulating trials"""
+    net = small_network_fixture()
+    # as with some legacy parameter files, the drive cells targeting L5
+    # cells never spike
+    net.external_drives['extpois']['dynamics']['rate_constant'] = {
+        'L2_basket': 200., 'L2_pyramidal': 200.}
+
+    def _get_spikes(cell_response):
+        # the order of the spikes depends on the assignment of the gids to
+        # MPI processes, which differs as only the drive cells that never
+        # spike can be left out with lazy events
+        return [sorted(zip(*trial_spikes)) for trial_spikes in
+                zip(cell_response.spike_times, cell_response.spike_gids)]
+
+    for backend in (JoblibBackend(n_jobs=1), MPIBackend(n_procs=2)):
+        for event_rng in ('legacy', 'philox'):
+            with backend:
+                dpls = simulate_dipole(net, tstop=30, n_trials=2,
+                                       event_rng=event_rng)
+                assert len(net.external_drives['extpois']['events']) == 2
+                spikes = _get_spikes(net.cell_response)
+                dpls_lazy = simulate_dipole(net, tstop=30, n_trials=2,
+                                            event_rng=event_rng,
+                                            lazy_events=True)
+            assert net.external_drives['extpois']['events'] == list()
+            assert _get_spikes(net.cell_response) == spikes
+            for dpl, dpl_lazy in zip(dpls, dpls_lazy):
+                assert_array_equal(dpl.data['agg'], dpl_lazy.data['agg'])
+
+    # the drive cells without rate constant are not built
+    net._instantiate_drives(tstop=30, n_trials=1, lazy=True)
+    neuron_net = NetworkBuilder(net)
+    silent_gids = neuron_net._get_silent_drive_gids()
+    gid_range = net.gid_ranges['extpois']
+    trains = net._get_drive_trains('extpois')
+    assert silent_gids == set(
+        gid for gid, (_, target_type) in zip(gid_range, trains) if
+        target_type in ('L5_basket', 'L5_pyramidal'))
+    with pytest.raises(TypeError, match='lazy_events must be an instance of'):
+        simulate_dipole(net, tstop=30, n_trials=1, lazy_events='yes')
+
+
+@requires_mpi4py
+@requires_psutil
+def test_run_pattern_stim(small_network_fixture):
+    """Test delivering the drive events with PatternStims"""
+    net = small_network_fixture()
+
+    def _get_spikes(cell_response):
+        # the drive spikes are recorded in a different order
+        return [sorted(zip(*trial_spikes)) for trial_spikes in
+                zip(cell_response.spike_times, cell_response.spike_gids)]
+
+    for backend in (JoblibBackend(n_jobs=1), JoblibBackend(n_threads=2),
+                    MPIBackend(n_procs=2)):
+        with backend:
+            dpls = simulate_dipole(net, tstop=30, n_trials=2)
+            spikes = _get_spikes(net.cell_response)
+            dpls_pattern = simulate_dipole(net, tstop=30, n_trials=2,
+                                           lazy_events=True,
+                                           pattern_stim=True)
+        assert _get_spikes(net.cell_response) == spikes
+        for dpl, dpl_pattern in zip(dpls, dpls_pattern):
+            assert_array_equal(dpl.data['agg'], dpl_pattern.data['agg'])
+
+    # no drive cells are built, only the connections of those with nonzero
+    # weights
+    net._pattern_stim = True
+    neuron_net = NetworkBuilder(net)
+    assert len(neuron_net._drive_cells) == 0
+    drive_gids = [gid for drive_name in net.external_drives for gid in
+                  net.gid_ranges[drive_name]]
+    assert 0 < len(neuron_net._pattern_gids) < len(drive_gids)
+    assert set(neuron_net._pattern_gids).issubset(drive_gids)
+
+    # replaying the recorded spikes of a network
+    net_replay = small_network_fixture(add_drives_from_params=False)
+    net_replay.add_replay_drive(
+        'replay', net.cell_response, location='distal',
+        cell_types=['L2_pyramidal', 'L5_pyramidal'],
+        weights_ampa={'L2_pyramidal': 0.01, 'L5_pyramidal': 0.01})
+    dpls = simulate_dipole(net_replay, tstop=30, n_trials=2)
+    dpls_pattern = simulate_dipole(net_replay, tstop=30, n_trials=2,
+                                   pattern_stim=True)
+    for dpl, dpl_pattern in zip(dpls, dpls_pattern):
+        assert_array_equal(dpl.data['agg'], dpl_pattern.data['agg'])
+    with pytest.raises(TypeError, match='pattern_stim must be an instance'):
+        simulate_dipole(net, tstop=30, n_trials=1, pattern_stim=1)
+
+
+@requires_mpi4py
+@requires_psutil
+def test_run_burn_in(small_network_fixture):
+    """Test starting trials from the steady states after a burn-in"""
+    net = small_network_fixture(add_drives_from_params=False,
+                                early_drives=False)
+
+    # the burn-in is run once for each configuration of the cell types
+    steady_states = _get_steady_states(net, burn_in=100, dt=0.025)
+    assert _get_steady_states(net, burn_in=100, dt=0.025) is steady_states
+    assert _get_steady_states(net, burn_in=50, dt=0.025) is not steady_states
+    assert list(steady_states) == list(net.cell_types)
+    soma_states = steady_states['L5_pyramidal']['soma']
+    assert {'v', 'm_hh2', 'ca_cad', 'cai'}.issubset(soma_states)
+
+    # the cells continue as if the network was simulated for the burn-in
+    with pytest.warns(UserWarning, match='No external drives loaded'):
+        dpl = simulate_dipole(net, tstop=120, n_trials=1,
+                              record_vsec='soma')[0]
+        vsec = net.cell_response.vsec[0]
+        dpl_burn_in = simulate_dipole(net, tstop=20, n_trials=1,
+                                      record_vsec='soma', burn_in=100)[0]
+    n_samples = len(net.cell_response.times)
+    for gid, vsec_burn_in in net.cell_response.vsec[0].items():
+        assert_allclose(vsec_burn_in['soma'],
+                        vsec[gid]['soma'][-n_samples:], atol=1e-10)
+    # and the baseline of the dipole is renormalized as after the burn-in
+    # (the first sample is recorded before the currents are computed)
+    for layer in ('L2', 'L5', 'agg'):
+        assert_allclose(dpl_burn_in.data[layer][1:],
+                        dpl.data[layer][-n_samples + 1:], rtol=0, atol=1e-8)
+
+    # tonic biases active from the start are applied during the burn-in
+    net_bias = net.copy()
+    net_bias.add_tonic_bias(cell_type='L5_pyramidal', amplitude=0.1)
+    steady_states_bias = _get_steady_states(net_bias, burn_in=100, dt=0.025)
+    assert steady_states_bias is not steady_states
+    assert np.all(steady_states_bias['L5_pyramidal']['soma']['v'] >
+                  steady_states['L5_pyramidal']['soma']['v'])
+    assert_array_equal(steady_states_bias['L2_pyramidal']['soma']['v'],
+                       steady_states['L2_pyramidal']['soma']['v'])
+    with pytest.warns(UserWarning, match='No external drives loaded'):
+        simulate_dipole(net_bias, tstop=120, n_trials=1, record_vsec='soma')
+        vsec = net_bias.cell_response.vsec[0]
+        simulate_dipole(net_bias, tstop=20, n_trials=1, record_vsec='soma',
+                        burn_in=100)
+    for gid, vsec_burn_in in net_bias.cell_response.vsec[0].items():
+        assert_allclose(vsec_burn_in['soma'],
+                        vsec[gid]['soma'][-n_samples:], atol=1e-10)
+
+    net = small_network_fixture(early_drives=False)
+    dpls = simulate_dipole(net, tstop=30, n_trials=1, burn_in=100)
+    with MPIBackend(n_procs=2, multisplit=True):
+        dpls_mpi = simulate_dipole(net, tstop=30, n_trials=1, burn_in=100)
+    assert_allclose(dpls[0].data['agg'], dpls_mpi[0].data['agg'],
+                    rtol=0, atol=1e-12)
+
+    with pytest.raises(ValueError, match='burn_in must be positive'):
+        simulate_dipole(net, tstop=30, n_trials=1, burn_in=0)
+    with pytest.raises(TypeError, match='burn_in must be an instance of'):
+        simulate_dipole(net, tstop=30, n_trials=1, burn_in='long')
+    # the other arguments are validated before the burn-in is run
+    with pytest.raises(ValueError, match="Invalid value for the 'reduce'"):
+        simulate_dipole(net, tstop=30, n_trials=1, burn_in=200, reduce='foo')
+    assert net._burn_in == 100
+
+
+@requires_mpi4py
+@requires_psutil
+def test_run_checkpoint(tmp_path, monkeypatch, small_network_fixture):
+    """Test resuming and extending trials from checkpoints"""
+    net = small_network_fixture(early_drives=False)
+    dpls = simulate_dipole(net, tstop=100, n_trials=2)
+    spike_times = net.cell_response.spike_times
+    spike_gids = net.cell_response.spike_gids
+
+    # only the latest checkpoint of each trial is kept
+    checkpoint_dir = tmp_path / 'checkpoints'
+    dpls_checkpoint = simulate_dipole(net, tstop=100, n_trials=2,
+                                      checkpoint_every=40,
+                                      checkpoint_dir=checkpoint_dir)
+    for trial_idx in range(2):
+        assert_array_equal(dpls_checkpoint[trial_idx].data['agg'],
+                           dpls[trial_idx].data['agg'])
+        trial_dir = checkpoint_dir / f'trial_{trial_idx}'
+        assert [path.name for path in trial_dir.iterdir()] == ['t_100.0000']
+    assert net.cell_response.spike_times == spike_times
+
+    # a crash after the checkpoint at 80 ms is resumed from it
+    save_checkpoint = NetworkBuilder._save_checkpoint
+
+    def crash(neuron_net, checkpoint_dir, recordings):
+        if h.t > 90:
+            raise RuntimeError('crash')
+        save_checkpoint(neuron_net, checkpoint_dir, recordings)
+
+    checkpoint_dir = tmp_path / 'resume'
+    with monkeypatch.context() as m:
+        m.setattr(NetworkBuilder, '_save_checkpoint', crash)
+        with pytest.raises(RuntimeError, match='crash'):
+            simulate_dipole(net, tstop=100, n_trials=1, checkpoint_every=40,
+                            checkpoint_dir=checkpoint_dir)
+    trial_dir = checkpoint_dir / 'trial_0'
+    assert [path.name for path in trial_dir.iterdir()] == ['t_80.0000']
+    dpls_resumed = simulate_dipole(net, tstop=100, n_trials=1,
+                                   checkpoint_dir=checkpoint_dir)
+    assert_array_equal(dpls_resumed[0].data['agg'], dpls[0].data['agg'])
+    assert net.cell_response.spike_times[0] == spike_times[0]
+
+    # a finished simulation continues with a longer tstop; the drive cells
+    # that delivered all their events are restarted at their new events
+    checkpoint_dir = tmp_path / 'extend'
+    simulate_dipole(net, tstop=60, n_trials=2, checkpoint_dir=checkpoint_dir)
+    dpls_extended = simulate_dipole(net, tstop=100, n_trials=2,
+                                    checkpoint_dir=checkpoint_dir)
+    for trial_idx in range(2):
+        assert_array_equal(dpls_extended[trial_idx].data['agg'],
+                           dpls[trial_idx].data['agg'])
+        assert_allclose(net.cell_response.spike_times[trial_idx],
+                        spike_times[trial_idx], rtol=0, atol=1e-10)
+        assert_array_equal(net.cell_response.spike_gids[trial_idx],
+                           spike_gids[trial_idx])
+
+    # a shorter simulation keeps the later checkpoints, which are restored
+    # by a new build
+    simulate_dipole(net, tstop=60, n_trials=1, checkpoint_dir=checkpoint_dir)
+    trial_dir = checkpoint_dir / 'trial_0'
+    assert sorted(path.name for path in trial_dir.iterdir()) == \
+        ['t_100.0000', 't_60.0000']
+    dpls_extended = simulate_dipole(net, tstop=100, n_trials=1,
+                                    checkpoint_dir=checkpoint_dir)
+    assert_array_equal(dpls_extended[0].data['agg'], dpls[0].data['agg'])
+
+    # a different configuration is not resumed
+    with pytest.raises(ValueError, match='saved with a different network'):
+        simulate_dipole(net, tstop=100, dt=0.05, n_trials=1,
+                        checkpoint_dir=checkpoint_dir)
+    net_changed = net.copy()
+    net_changed.add_connection('L2_basket', 'L2_pyramidal', 'soma', 'gabaa',
+                               weight=0.01, delay=1., lamtha=3.)
+    with pytest.raises(ValueError, match='saved with a different network'):
+        simulate_dipole(net_changed, tstop=100, n_trials=1,
+                        checkpoint_dir=checkpoint_dir)
+
+    checkpoint_dir = tmp_path / 'mpi'
+    with MPIBackend(n_procs=2):
+        simulate_dipole(net, tstop=60, n_trials=1,
+                        checkpoint_dir=checkpoint_dir)
+        dpls_mpi = simulate_dipole(net, tstop=100, n_trials=1,
+                                   checkpoint_dir=checkpoint_dir)
+    assert_allclose(dpls_mpi[0].data['agg'], dpls[0].data['agg'],
+                    rtol=0, atol=1e-12)
+    with pytest.raises(ValueError, match='saved with 2 MPI processes'):
+        simulate_dipole(net, tstop=100, n_trials=1,
+                        checkpoint_dir=checkpoint_dir)
+
+    with pytest.raises(ValueError, match='checkpoint_every must be positive'):
+        simulate_dipole(net, tstop=30, n_trials=1, checkpoint_every=0,
+                        checkpoint_dir=checkpoint_dir)
+    with pytest.raises(ValueError, match='checkpoint_dir must be specified'):
+        simulate_dipole(net, tstop=30, n_trials=1, checkpoint_every=10)
+    with pytest.raises(ValueError, match='not supported with pattern_stim'):
+        simulate_dipole(net, tstop=30, n_trials=1, pattern_stim=True,
+                        checkpoint_dir=checkpoint_dir)
+    assert not net._pattern_stim
+    with pytest.raises(TypeError, match='checkpoint_dir must be an instance'):
+        simulate_dipole(net, tstop=30, n_trials=1, checkpoint_dir=1)
+
+
 # there are no dependencies if this unit tests fails; no need to be in
 # class marked incremental
 @requires_mpi4py
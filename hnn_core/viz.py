@@ -907,22 +907,22 @@ def plot_connectivity_matrix(net, conn_idx, ax=None, show_weight=True,
     target_range = np.array(net.gid_ranges[conn['target_type']])
     connectivity_matrix = np.zeros((len(src_range), len(target_range)))
 
-    for src_gid, target_src_pair in conn['gid_pairs'].items():
-        src_idx = np.where(src_range == src_gid)[0][0]
-        target_indeces = np.where(np.in1d(target_range, target_src_pair))[0]
-        for target_idx in target_indeces:
-            src_pos = src_type_pos[src_idx]
-            target_pos = target_type_pos[target_idx]
-
-            # Identical calculation used in Cell.par_connect_from_src()
-            if show_weight:
-                weight, _ = _get_gaussian_connection(
-                    src_pos, target_pos, nc_dict,
-                    inplane_distance=net._inplane_distance)
-            else:
-                weight = 1.0
-
-            connectivity_matrix[src_idx, target_idx] = weight
+    # gid ranges are contiguous so gids map to positions by offset
+    gid_pairs = conn['gid_pairs']
+    src_idxs = gid_pairs._pair_src_gids() - src_range[0]
+    target_idxs = gid_pairs.indices - target_range[0]
+
+    # Identical calculation used in NetworkBuilder._connect_celltypes()
+    if show_weight and gid_pairs.weights is not None:
+        weights = gid_pairs.weights
+    elif show_weight:
+        weights, _ = _get_gaussian_connection(
+            np.array(src_type_pos)[src_idxs],
+            np.array(target_type_pos)[target_idxs], nc_dict,
+            inplane_distance=net._inplane_distance)
+    else:
+        weights = 1.0
+    connectivity_matrix[src_idxs, target_idxs] = weights
 
     im = ax.imshow(connectivity_matrix, cmap=colormap, interpolation='none')
 